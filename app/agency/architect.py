@@ -1,25 +1,39 @@
 # [FUNCTIONAL LEDGER - DO NOT REMOVE]
-# 1. [STATE_INGEST]: Atomic load of project manifest.
+# 1. [STATE_INGEST]: Atomic load of project manifest. History is windowed to a token budget + rolling summary.
 # 2. [TURN_A_CLERK]: Extract JSON buckets.
 # 3. [DOUBLE_LOCK_GATE]: Physics + Permission check.
 # 4. [TURN_B_AUTHOR]: Dedicated Prose turn for 2-paragraph verbatim Brief.
 # 5. [COMMIT_BRIEF]: Immediate Firestore save of the vision BEFORE research.
-# 6. [NATIVE_HOUND]: Native Vertex SDK for URL grounding.
-# 7. [STRIKE_TEAM]: Specialists ingest Brief + Raw Buckets + EXOBrain.
-# 8. [TRANSPORT_EiC]: Strip [RAW_DATA] tags and preserve markdown links.
-# 9. [PERSISTENCE]: Final atomic write of the research results.
+# 6. [NATIVE_HOUND]: Native Vertex SDK for URL grounding.            (background job)
+# 7. [STRIKE_TEAM]: Specialists ingest Brief + Raw Buckets + EXOBrain.  (background job)
+# 8. [TRANSPORT_EiC]: Strip [RAW_DATA] tags and preserve markdown links. (background job)
+# 9. [PERSISTENCE]: Final atomic write of the turn's manifesto. Papers go to the board's `papers` subcollection.
+# 10. [SPECULATIVE_PM]: Non-stream turns start the PM alongside the scribe. The guess stands only if the gate/gap list
+#    and the rendered CURRENT VISION STATE (core idea, target user, spine) are unchanged; quotes/drivers/tensions never
+#    reach the PM prompt, so they cannot invalidate it. The scribe's whisper is returned with every turn, hit or miss.
+# 11. [SINGLE_FLIGHT]: Identical in-flight turns share one pipeline run; manifesto commits are version-checked.
 
 # [BANNED PATTERNS]
 # - NO POST-RESEARCH SAVES ONLY: The Brief must be saved as soon as it exists.
 # - NO MULTI-PART PASSES: Always cast specialist content to str() before Editor.
 # - NO AI-FLUFF IN BRIEF: Author turn is restricted to 2 paragraphs of user intent.
 
-import os, json, logging, asyncio, vertexai
+import os, json, time, logging, asyncio, vertexai
 from fastapi import APIRouter, Form, HTTPException
+from sse_starlette.sse import EventSourceResponse
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from app.agency.factory import get_agent_and_dept
+from app.agency.strike_team import run_strike_team
+from app.agency.jobs import JOBS, get_job
+from app.board_store import save_paper
+from app.state_writer import ManifestWriter
+from app.agency.single_flight import flight_key, follow, lead, land, await_flight
+from app.agency.prompt_assets import ASSETS
+from app.agency.history import HISTORY, context_messages, turn_messages
+from app.agency import scribe
+from app.agency.scribe import SCRIBE
 from langchain_google_vertexai import ChatVertexAI
-from google.cloud import firestore
+from app.db import db
 from vertexai.generative_models import GenerativeModel, Tool
 from app.agency.departments.strategy.schemas import (
     StrategySpatialOutput, BigIdeaContent, OpportunityContent, 
@@ -32,93 +46,206 @@ PROJECT_ID = os.environ.get("GCP_PROJECT", "vibe-agent-final")
 vertexai.init(project=PROJECT_ID, location="us-central1")
 logger = logging.getLogger("uvicorn.error")
 router = APIRouter()
-FRONTEND_ROOT = os.environ.get("FRONTEND_PATH", "../vibe-design-lab")
+SPECULATIVE_PM = os.environ.get("SPECULATIVE_PM", "1") == "1"
+SPECULATION_STATS = {"attempts": 0, "hits": 0, "misses": 0, "saved_ms": 0.0, "wasted_ms": 0.0}
 SCHEMA_MAP = {'the_big_idea': BigIdeaContent, 'the_opportunity': OpportunityContent, 'the_people': PeopleContent, 'the_experience': ExperienceContent, 'the_mvp': MVPContent}
-db = firestore.Client(project=PROJECT_ID)
+
+async def _strike_team_job(project_id, active_manifesto):
+    """[NATIVE_HOUND] -> [STRIKE_TEAM] -> [TRANSPORT_EiC]. Runs on the job pool; returns the paper patch."""
+    model_hound = GenerativeModel("gemini-2.0-flash-001")
+    search_tool = Tool.from_dict({"google_search": {}})
+    roles = ['visionary', 'commercial', 'realist']
+    eli_p = ASSETS.get("PROTOCOL_ELI")
+
+    # Roles fan out concurrently and join before the Editor turn
+    team_results, bounty_bank = await run_strike_team(roles, active_manifesto, eli_p, model_hound, search_tool)
+
+    e_c, _ = await get_agent_and_dept('global_editor')
+    editor_instr = f"{e_c['system_prompt']}\n\nCLEANUP: Strip technical tags like [RAW_DATA] or [WEB_DATA]. Ensure links are markdown. DO NOT STRIP URLs.\n\nOFFICIAL_BRIEF: {active_manifesto['problem_statement']}\n\nVISIONARY: {team_results['visionary']}\n\nCOMMERCIAL: {team_results['commercial']}\n\nREALIST: {team_results['realist']}\n\nSOURCES: {' '.join(list(set(bounty_bank)))}"
+    strike_result = await e_c['llm'].with_structured_output(BigIdeaContent).ainvoke([SystemMessage(content=editor_instr), HumanMessage(content='Assemble final paper.')])
+    await save_paper(project_id, 'the_big_idea', strike_result.dict())
+    return {'patch': {'dept_id': 'the_big_idea', 'content': strike_result.dict()}}
+
+def _stage(name: str, **info):
+    return 'stage', {'stage': name, **info}
+
+async def _timed(aw):
+    return await aw, time.monotonic()
+
+def _vision_prose(active_manifesto):
+    return get_manifesto_display({'mission_manifesto': active_manifesto})
+
+def _pm_messages(agent_config, active_manifesto, physics_open, missing, whisper, window, prompt):
+    v_prose = _vision_prose(active_manifesto)
+    law_msg = f"[LIBRARIAN HUD: {whisper}]\n[MISSION STATUS: {'GREEN' if physics_open else 'RED'}]\n\nMANDATE: If RED, address gaps: {missing}. NEVER say team is starting if status is RED."
+    return [
+        SystemMessage(content=f"IDENTITY: {agent_config['system_prompt']}"),
+        SystemMessage(content=law_msg),
+        SystemMessage(content=f"CURRENT VISION STATE:\n{v_prose}")
+    ] + context_messages(window) + turn_messages(window['turns']) + [HumanMessage(content=prompt)]
+
+async def _design_pipeline(prompt, project_id, specialist_id, chat_history, stream_pm=False):
+    """Runs the ledger in order, yielding (event, payload) at every stage boundary and a closing 'final'."""
+    history_list = json.loads(chat_history) if chat_history else []
+    is_interview = bool(specialist_id and specialist_id != 'null' and specialist_id != '')
+
+    # [STATE_INGEST]: Manifesto field path only; papers and appendices are never read on the hot path
+    proj_doc = await db.collection('cofounder_boards').document(project_id).get(field_paths=[f'vibe_manifest.{REGISTRY.MANIFESTO}', 'manifest_version'])
+    proj_data = proj_doc.to_dict() if proj_doc.exists else {}
+    v_man = proj_data.get('vibe_manifest') or {}
+    active_manifesto = v_man.get(REGISTRY.MANIFESTO) or {}
+    writer = ManifestWriter(db, project_id, active_manifesto, proj_data.get('manifest_version', 0))
+    yield _stage('STATE_INGEST')
+
+    # [HISTORY_WINDOW]: Token-budgeted verbatim tail + rolling summary; verbatim_quotes are always pinned
+    window, scribe_cursor = await asyncio.gather(HISTORY.window(project_id, history_list, active_manifesto.get('verbatim_quotes') or []), SCRIBE.pending(project_id, history_list))
+    window_start = len(history_list) - len(window['turns'])
+    yield _stage('HISTORY_WINDOW', turns=len(window['turns']), folded=window_start, tokens=window['tokens'])
+
+    # [TURN_A_CLERK]: Incremental. Only turns past the scribe cursor are read, merged into the persisted manifesto
+    read_turns = history_list + [{'role': 'user', 'content': prompt}]
+    new_turns = read_turns[max(scribe_cursor, window_start):]
+    scribe_c, _ = await get_agent_and_dept('master_pm')
+    agent_config, _ = await get_agent_and_dept(specialist_id if is_interview else 'master_pm')
+    scribe_res, speculation = None, None
+    if scribe.can_skip(active_manifesto, new_turns):
+        SCRIBE.stats['skipped'] += 1
+        logger.warning(f"[SCRIBE] Skipped: gate is RED and {len(new_turns)} new turn(s) are too short to fill a gap.")
+    else:
+        SCRIBE.stats['calls'] += 1; SCRIBE.stats['turns_read'] += len(new_turns)
+        if SPECULATIVE_PM and not stream_pm:
+            # [SPECULATIVE_PM]: Start the PM on the persisted manifesto's gate while the scribe runs (no permission assumed)
+            spec_missing = scribe.gate_missing(active_manifesto)
+            spec_msgs = _pm_messages(agent_config, active_manifesto, not spec_missing, spec_missing, 'Focus on the discovery.', window, prompt)
+            speculation = {'gate': (not spec_missing, spec_missing, False), 'prose': _vision_prose(active_manifesto), 'started': time.monotonic(), 'task': asyncio.ensure_future(_timed(agent_config['llm'].ainvoke(spec_msgs)))}
+            SPECULATION_STATS['attempts'] += 1
+        earlier = window['summary'] if scribe_cursor < window_start else ''
+        try:
+            scribe_res = await scribe_c['llm'].with_structured_output(ScribeOutput).ainvoke([
+                SystemMessage(content=scribe.SCRIBE_INSTR), HumanMessage(content=scribe.payload(active_manifesto, new_turns, earlier))
+            ])
+        except BaseException:
+            if speculation: speculation['task'].cancel()
+            raise
+
+    if scribe_res:
+        active_manifesto = scribe.merge_extraction(active_manifesto, scribe_res.mission_manifesto.dict())
+    yield _stage('TURN_A_CLERK', skipped=scribe_res is None, new_turns=len(new_turns))
+
+    # [DOUBLE_LOCK_GATE]
+    missing = scribe.gate_missing(active_manifesto)
+    physics_open = len(missing) == 0
+    permission_open = scribe_res.user_confirmed_start if (scribe_res and physics_open) else False
+    hiring_authorized = physics_open and permission_open
+    logger.warning(f"[GATE] Physics: {physics_open} | Permission: {permission_open} | Gaps: {missing}")
+    yield _stage('DOUBLE_LOCK_GATE', physics_open=physics_open, permission_open=permission_open, missing=missing)
+
+    spec_res = None
+    if speculation:
+        gate_ready = time.monotonic()
+        # The speculative prompt carried the pre-scribe vision state: it stands only if the PM would see the same one
+        if speculation['gate'] == (physics_open, missing, hiring_authorized) and speculation['prose'] == _vision_prose(active_manifesto):
+            try:
+                spec_res, spec_done = await speculation['task']
+                # Sequential would have started at gate_ready; the overlap is what speculation bought
+                saved = min(gate_ready, spec_done) - speculation['started']
+                SPECULATION_STATS['hits'] += 1; SPECULATION_STATS['saved_ms'] += round(saved * 1000, 1)
+            except Exception as e:
+                logger.warning(f"[SPECULATIVE_PM] Speculative turn failed ({e}); re-issuing.")
+        if spec_res is None:
+            speculation['task'].cancel()
+            SPECULATION_STATS['misses'] += 1; SPECULATION_STATS['wasted_ms'] += round((gate_ready - speculation['started']) * 1000, 1)
+        yield _stage('SPECULATIVE_PM', hit=spec_res is not None)
+
+    job_id = None
+    if (hiring_authorized or is_interview) and not is_interview:
+        # [TURN_B_AUTHOR]
+        author_res = await scribe_c['llm'].ainvoke([
+            SystemMessage(content=f"You are the Author. Write a 2-paragraph summary of the Founder's Intent based on: {json.dumps(active_manifesto)}. Capture the 'Gumboots' detail. No fluff."),
+            HumanMessage(content="Write Official Brief.")
+        ])
+        active_manifesto['problem_statement'] = author_res.content
+        yield _stage('TURN_B_AUTHOR', problem_statement=author_res.content)
+
+        # [COMMIT_BRIEF]: Save the vision BEFORE the heavy research starts (changed field paths only)
+        active_manifesto = await writer.commit(active_manifesto)
+        logger.warning("[COMMIT] Brief saved to Firestore.")
+        yield _stage('COMMIT_BRIEF')
+
+        # [STRIKE_TEAM]: Research runs as a background job; the PM answers right away
+        job_id, deduplicated = await JOBS.submit(project_id, 'strike_team', _strike_team_job, project_id, dict(active_manifesto))
+        yield _stage('STRIKE_TEAM', job_id=job_id, deduplicated=deduplicated)
+
+    # [PM_TURN]
+    whisper = (scribe_res and scribe_res.whisper) or 'Focus on the discovery.'
+    pm_msgs = _pm_messages(agent_config, active_manifesto, physics_open, missing, whisper, window, prompt)
+
+    if spec_res is not None:
+        user_message = spec_res.content
+    elif stream_pm:
+        # [PM_STREAM]: Forward text deltas as they arrive; multi-part chunks are flattened to text
+        user_message = ''
+        async for chunk in agent_config['llm'].astream(pm_msgs):
+            delta = chunk.content if isinstance(chunk.content, str) else ''.join(p.get('text', '') if isinstance(p, dict) else str(p) for p in chunk.content)
+            if delta:
+                user_message += delta
+                yield 'token', {'text': delta}
+    else:
+        user_message = (await agent_config['llm'].ainvoke(pm_msgs)).content
+    yield _stage('PM_TURN')
+
+    # [PERSISTENCE]: Final result save (changed field paths only). The scribe cursor moves only if the scribe read the
+    # turns, and only AFTER the commit landed: a failed commit must leave those turns unread.
+    active_manifesto = await writer.commit(active_manifesto)
+    if scribe_res is not None: await SCRIBE.advance(project_id, read_turns)
+    write_metrics = writer.metrics
+    logger.warning(f"[MANIFEST_WRITE] {project_id}: {write_metrics['writes']} writes, {write_metrics['fields']} fields, {write_metrics['bytes']}B sent vs {write_metrics['full_bytes']}B full.")
+    yield _stage('PERSISTENCE', **write_metrics)
+
+    yield 'final', {'user_message': user_message, 'suggested_project_name': None, 'manifesto': active_manifesto, 'hiring_authorized': bool(job_id), 'job_id': job_id, 'patch': None, 'whisper': whisper}
+
+async def _coalesced_pipeline(prompt, project_id, specialist_id, chat_history, stream_pm=False):
+    """[SINGLE_FLIGHT]: Duplicate in-flight turns attach to the leader and receive its 'final' event."""
+    key = flight_key(project_id, prompt, specialist_id, chat_history)
+    follower = follow(key)
+    if follower is not None:
+        yield _stage('COALESCED')
+        yield 'final', await await_flight(follower)
+        return
+
+    flight = lead(key)
+    try:
+        async for event, payload in _design_pipeline(prompt, project_id, specialist_id, chat_history, stream_pm):
+            if event == 'final': land(key, flight, payload)
+            yield event, payload
+    except Exception as e:
+        land(key, flight, error=e); raise
+    finally:
+        land(key, flight, error=RuntimeError('Leading design turn ended without a result.'))
 
 @router.post('/generate')
 async def design_invoke(prompt: str = Form(None), layer: str = Form('STRATEGY'), project_id: str = Form(None), specialist_id: str = Form(None), chat_history: str = Form(None), strategy_context: str = Form(None)):
     try:
-        history_list = json.loads(chat_history) if chat_history else []
-        is_interview = bool(specialist_id and specialist_id != 'null' and specialist_id != '')
-        
-        proj_doc = db.collection('cofounder_boards').document(project_id).get()
-        proj_data = proj_doc.to_dict() if proj_doc.exists else {}
-        v_man = proj_data.get('vibe_manifest') or {}
-        active_manifesto = v_man.get(REGISTRY.MANIFESTO) or {}
-
-        # [TURN_A_CLERK]
-        scribe_c, _ = get_agent_and_dept('master_pm')
-        scribe_instr = "You are the Librarian (IQ). Verbatim extract facts: core_idea, target_user, founder_frustration, competitor_belief, business_model, success_sentence. Set user_confirmed_start=True ONLY on explicit permission."
-        
-        scribe_res = scribe_c['llm'].with_structured_output(ScribeOutput).invoke([
-            SystemMessage(content=scribe_instr), HumanMessage(content=json.dumps(history_list + [{'role': 'user', 'content': prompt}]))
-        ])
-        
-        if scribe_res:
-            active_manifesto.update({k: v for k, v in scribe_res.mission_manifesto.dict().items() if v and k != 'problem_statement'})
-
-        # [DOUBLE_LOCK_GATE]
-        req_keys = ['founder_frustration', 'competitor_belief', 'business_model', 'success_sentence']
-        missing = [k.replace('_', ' ') for k in req_keys if len(str(active_manifesto.get(k, ""))) < 15]
-        physics_open = len(missing) == 0
-        permission_open = scribe_res.user_confirmed_start if (scribe_res and physics_open) else False
-        hiring_authorized = physics_open and permission_open
-        logger.warning(f"[GATE] Physics: {physics_open} | Permission: {permission_open} | Gaps: {missing}")
-
-        strike_result = None
-        if (hiring_authorized or is_interview) and not is_interview:
-            # [TURN_B_AUTHOR]
-            author_res = scribe_c['llm'].invoke([
-                SystemMessage(content=f"You are the Author. Write a 2-paragraph summary of the Founder's Intent based on: {json.dumps(active_manifesto)}. Capture the 'Gumboots' detail. No fluff."),
-                HumanMessage(content="Write Official Brief.")
-            ])
-            active_manifesto['problem_statement'] = author_res.content
-            
-            # [COMMIT_BRIEF]: Save the vision BEFORE the heavy research starts
-            v_man[REGISTRY.MANIFESTO] = active_manifesto
-            db.collection('cofounder_boards').document(project_id).set({'vibe_manifest': v_man}, merge=True)
-            logger.warning("[COMMIT] Brief saved to Firestore.")
-
-            # [NATIVE_HOUND]
-            model_hound = GenerativeModel("gemini-2.0-flash-001")
-            search_tool = Tool.from_dict({"google_search": {}})
-            roles = ['visionary', 'commercial', 'realist']
-            team_results, bounty_bank = {}, []
-            eli_p = open(os.path.join(FRONTEND_ROOT, "Brain/EXO_BRAINS/GLOBAL/PROTOCOL_ELI.md")).read()
-
-            for role in roles:
-                s_c, _ = get_agent_and_dept(f'strat_the_big_idea_{role}')
-                h_res = model_hound.generate_content(f"Research 2026 data for: {active_manifesto['problem_statement']}", tools=[search_tool])
-                links = [f"[{c.web.title}]({c.web.uri})" for c in getattr(h_res.candidates[0].grounding_metadata, 'grounding_chunks', []) if c.web]
-                bounty_bank.extend(links)
-                
-                # [STR_CASTING]: Force content to string to avoid multi-part 500 errors
-                p_instr = f"{s_c['system_prompt']}\n\n[ELI]\n{eli_p}\n\nMISSION:\n{active_manifesto['problem_statement']}\n\nGROUND_TRUTH:\n{json.dumps(active_manifesto)}\n\nLINKS:\n{links}\n\nMANDATE: Cite using [Name](URL) format. No [RAW_DATA] tags."
-                p_res = s_c['llm'].invoke([SystemMessage(content=p_instr), HumanMessage(content="Analyze vision. Cite links.")])
-                team_results[role] = str(p_res.content) 
-                logger.warning(f"[SPECIALIST] {role} finished. Research Density: {len(team_results[role])} chars.")
-
-            e_c, _ = get_agent_and_dept('global_editor')
-            editor_instr = f"{e_c['system_prompt']}\n\nCLEANUP: Strip technical tags like [RAW_DATA] or [WEB_DATA]. Ensure links are markdown. DO NOT STRIP URLs.\n\nOFFICIAL_BRIEF: {active_manifesto['problem_statement']}\n\nVISIONARY: {team_results['visionary']}\n\nCOMMERCIAL: {team_results['commercial']}\n\nREALIST: {team_results['realist']}\n\nSOURCES: {' '.join(list(set(bounty_bank)))}"
-            strike_result = e_c['llm'].with_structured_output(BigIdeaContent).invoke([SystemMessage(content=editor_instr), HumanMessage(content='Assemble final paper.')])
-
-        # [PM_TURN]
-        agent_config, _ = get_agent_and_dept(specialist_id if is_interview else 'master_pm')
-        v_prose = get_manifesto_display({'mission_manifesto': active_manifesto})
-        
-        whisper = getattr(scribe_res, 'whisper', 'Focus on the discovery.')
-        law_msg = f"[LIBRARIAN HUD: {whisper}]\n[MISSION STATUS: {'GREEN' if physics_open else 'RED'}]\n\nMANDATE: If RED, address gaps: {missing}. NEVER say team is starting if status is RED."
-        
-        pm_res = agent_config['llm'].invoke([
-            SystemMessage(content=f"IDENTITY: {agent_config['system_prompt']}"),
-            SystemMessage(content=law_msg),
-            SystemMessage(content=f"CURRENT VISION STATE:\n{v_prose}")
-        ] + [(HumanMessage if turn.get('role') == 'user' else AIMessage)(content=turn.get('content', '...')) for turn in history_list] + [HumanMessage(content=prompt)])
-
-        # [PERSISTENCE]: Final result save
-        v_man[REGISTRY.MANIFESTO] = active_manifesto
-        db.collection('cofounder_boards').document(project_id).set({'vibe_manifest': v_man}, merge=True)
-        return {'user_message': pm_res.content, 'suggested_project_name': None, 'manifesto': active_manifesto, 'hiring_authorized': bool(strike_result), 'patch': {'dept_id': 'the_big_idea', 'content': strike_result.dict()} if strike_result else None}
+        async for event, payload in _coalesced_pipeline(prompt, project_id, specialist_id, chat_history):
+            if event == 'final': return payload
     except Exception as e:
         logger.error(f'❌ AGENCY ERROR: {e}'); import traceback; traceback.print_exc(); raise HTTPException(500, str(e))
+
+@router.post('/generate/stream')
+async def design_stream(prompt: str = Form(None), layer: str = Form('STRATEGY'), project_id: str = Form(None), specialist_id: str = Form(None), chat_history: str = Form(None), strategy_context: str = Form(None)):
+    """SSE twin of /generate: 'stage' per ledger boundary, 'token' per PM delta, 'final' with manifesto + patch."""
+    async def events():
+        try:
+            async for event, payload in _coalesced_pipeline(prompt, project_id, specialist_id, chat_history, stream_pm=True):
+                yield {'event': event, 'data': json.dumps(payload)}
+        except Exception as e:
+            logger.error(f'❌ AGENCY STREAM ERROR: {e}'); import traceback; traceback.print_exc()
+            yield {'event': 'error', 'data': json.dumps({'detail': str(e)})}
+    return EventSourceResponse(events())
+
+@router.get('/jobs/{job_id}')
+async def get_design_job(job_id: str):
+    """Status poll for background strike-team jobs."""
+    job = await get_job(job_id)
+    if not job: raise HTTPException(404, f"Job {job_id} not found")
+    return job
@@ -1,19 +1,16 @@
-import os, logging
-from google.cloud import firestore
-from langchain_google_vertexai import ChatVertexAI
+import logging
+from app.agency.roster_mirror import ROSTER
+from app.agency.llm_pool import get_llm
+from app.agency.llm_cache import LLM_CACHE_DEFAULT
+from app.agency.prompt_assets import ASSETS
 
 logger = logging.getLogger("uvicorn.error")
-db = firestore.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
-REGION = "us-central1"
-PROJECT_ID = os.environ.get("GCP_PROJECT", "vibe-agent-final")
 
-def get_agent_and_dept(agent_id: str):
+async def get_agent_and_dept(agent_id: str):
     try:
-        a_doc = db.collection("agency_roster").document(agent_id).get()
-        a_data = a_doc.to_dict() if a_doc.exists else {"model_tier": "FLASH", "system_prompt": "You are a PM.", "dept_id": "HUB"}
-        dept_id = a_data.get("dept_id", "HUB")
-        d_doc = db.collection("department_registry").document(dept_id).get()
-        d_data = d_doc.to_dict() if d_doc.exists else {"lens_profile": "General strategy."}
+        # [ROSTER_MIRROR]: Agent, department and global rules come from process memory
+        await ROSTER.ensure_fresh()
+        a_data, d_data, global_rules = ROSTER.resolve(agent_id)
 
         # MODEL SELECTION (Sandbox Aligned)
         tier = a_data.get("model_tier", "FLASH")
@@ -21,21 +18,20 @@ def get_agent_and_dept(agent_id: str):
         elif tier == "HOUND": model = "gemini-2.0-flash-001"
         else: model = "gemini-2.5-flash"
 
-        llm = ChatVertexAI(model_name=model, project=PROJECT_ID, location=REGION, transport="rest", temperature=0.1)
-        
-        if a_data.get("tools") and "google_search_retrieval" in a_data["tools"]:
-            try:
-                from vertexai.generative_models import Tool
-                search_tool = Tool.from_dict({"google_search": {}})
-                llm = llm.bind_tools([search_tool])
-            except Exception as tool_err:
-                logger.error(f"⚠️ [FACTORY] Grounding Bind Failed: {tool_err}")
+        # [LLM_POOL]: Warm client keyed by (model, temperature, bound tools, response cache opt-in)
+        tools = tuple(t for t in (a_data.get("tools") or []) if t == "google_search_retrieval")
+        cache = a_data.get("llm_cache", LLM_CACHE_DEFAULT)
+        try:
+            llm = get_llm(model, 0.1, tools, cache=cache)
+        except Exception as tool_err:
+            logger.error(f"⚠️ [FACTORY] Grounding Bind Failed: {tool_err}")
+            llm = get_llm(model, 0.1, cache=cache)
 
-        global_doc = db.collection("agency_settings").document("global_config").get()
-        global_rules = global_doc.to_dict().get("rules", "") if global_doc.exists else ""
+        # [PROMPT_ASSETS]: Agents may pull Brain markdown by name (e.g. "PROTOCOL_ELI") into their theory block
+        theory = "\n\n".join([a_data.get('exo_brain', '')] + [ASSETS.get(name) for name in a_data.get('exo_brain_assets') or []])
 
-        full_dna = f"[GLOBAL PROTOCOLS]\n{global_rules}\n\n[THEORY]\n{a_data.get('exo_brain', '')}\n\n[IDENTITY]\n{a_data.get('system_prompt', '')}\n\n[CONSTRAINTS]\n- TARGET: {a_data.get('optimization_target', '')}\n- LOSS: {a_data.get('loss_function', '')}"
+        full_dna = f"[GLOBAL PROTOCOLS]\n{global_rules}\n\n[THEORY]\n{theory}\n\n[IDENTITY]\n{a_data.get('system_prompt', '')}\n\n[CONSTRAINTS]\n- TARGET: {a_data.get('optimization_target', '')}\n- LOSS: {a_data.get('loss_function', '')}"
         return {"llm": llm, "system_prompt": full_dna}, d_data
     except Exception as e:
         logger.error(f"❌ [FACTORY] Error: {e}")
-        return {"llm": ChatVertexAI(model_name="gemini-2.5-flash"), "system_prompt": "Error."}, {"lens_profile": "Error."}
\ No newline at end of file
+        return {"llm": get_llm("gemini-2.5-flash"), "system_prompt": "Error."}, {"lens_profile": "Error."}
\ No newline at end of file
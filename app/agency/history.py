@@ -0,0 +1,122 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [TOKEN_COUNT]: Every turn is costed with a local estimate (HISTORY_CHARS_PER_TOKEN); no network round trip.
+# 2. [VERBATIM_WINDOW]: The newest turns are sent as-is while they fit HISTORY_TOKEN_BUDGET (never fewer than HISTORY_KEEP_TURNS).
+# 3. [ROLLING_SUMMARY]: Older turns are folded ONCE into `cofounder_boards/{id}/memory/history`; later folds only add
+#    the turns that newly left the window. Folding overshoots to HISTORY_FOLD_TARGET so it runs every few turns, not every turn.
+# 4. [PREFIX_HASH]: The summary records a hash of the role + content of the turns it covers; an edited/reset client
+#    history rebuilds it, re-decorated turns (ids, timestamps) do not.
+# 5. [PINNED_QUOTES]: The manifesto's verbatim_quotes ride along with every window, whatever was folded.
+
+# [BANNED PATTERNS]
+# - NO UNBOUNDED PROMPTS: Callers send window turns + summary, never the raw chat_history.
+# - NO PARAPHRASED QUOTES: The summarizer must carry the founder's exact words forward.
+
+import os, json, hashlib, logging
+from collections import OrderedDict
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from app.agency.llm_pool import get_llm
+from app.db import db
+
+logger = logging.getLogger("uvicorn.error")
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", "6"))
+HISTORY_FOLD_TARGET = float(os.environ.get("HISTORY_FOLD_TARGET", "0.6"))
+HISTORY_CHARS_PER_TOKEN = 4
+HISTORY_CACHE_MAX = 512
+SUMMARY_MODEL = "gemini-2.5-flash"
+
+def count_tokens(text: str) -> int:
+    return -(-len(text or "") // HISTORY_CHARS_PER_TOKEN)
+
+def turn_tokens(turn: dict) -> int:
+    return count_tokens(str(turn.get('content', ''))) + 4  # role / framing overhead
+
+def _prefix_hash(turns) -> str:
+    # Role + content only (as scribe._turns_hash): clients may decorate turns with ids/timestamps
+    return hashlib.sha256(json.dumps([[t.get('role'), t.get('content')] for t in turns]).encode("utf-8")).hexdigest()
+
+EMPTY_MEMORY = {"summary": "", "covered": 0, "covered_hash": _prefix_hash([])}
+
+class HistoryManager:
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, keep_turns: int = HISTORY_KEEP_TURNS, fold_target: float = HISTORY_FOLD_TARGET):
+        self.budget, self.keep_turns, self.fold_target = budget, keep_turns, fold_target
+        self._memory = OrderedDict()  # project_id -> memory doc
+        self.stats = {"windows": 0, "folds": 0, "folded_turns": 0, "resets": 0, "fold_errors": 0, "tokens_in": 0, "tokens_sent": 0}
+
+    def _ref(self, project_id):
+        return db.collection("cofounder_boards").document(project_id).collection("memory").document("history")
+
+    async def _load(self, project_id):
+        if project_id in self._memory:
+            self._memory.move_to_end(project_id)
+            return self._memory[project_id]
+        snap = await self._ref(project_id).get()
+        return self._remember(project_id, {**EMPTY_MEMORY, **(snap.to_dict() or {})} if snap.exists else dict(EMPTY_MEMORY))
+
+    def _remember(self, project_id, memory):
+        self._memory[project_id] = memory
+        self._memory.move_to_end(project_id)
+        while len(self._memory) > HISTORY_CACHE_MAX: self._memory.popitem(last=False)
+        return memory
+
+    async def window(self, project_id: str, history: list, pinned_quotes=()) -> dict:
+        """{"summary", "turns", "pinned_quotes", "tokens"}: what a prompt may carry of `history`."""
+        memory = await self._load(project_id) if project_id else dict(EMPTY_MEMORY)
+        if memory["covered"] > len(history) or _prefix_hash(history[:memory["covered"]]) != memory["covered_hash"]:
+            logger.warning(f"[HISTORY] {project_id}: client history no longer extends the summarized prefix; rebuilding.")
+            memory = dict(EMPTY_MEMORY)
+            self.stats["resets"] += 1
+
+        tail = history[memory["covered"]:]
+        costs = [turn_tokens(t) for t in tail]
+        if sum(costs) > self.budget and len(tail) > self.keep_turns:
+            # Fold down to fold_target * budget so the next few turns fit without another summarizer call
+            fold_n, remaining = 0, sum(costs)
+            while len(tail) - fold_n > self.keep_turns and remaining > self.budget * self.fold_target:
+                remaining -= costs[fold_n]; fold_n += 1
+            folded = await self._fold(project_id, memory, history, tail[:fold_n], pinned_quotes)
+            # A failed fold returns the old memory: keep sending the unfolded tail this turn
+            if folded["covered"] > memory["covered"]: tail, costs = tail[fold_n:], costs[fold_n:]
+            memory = folded
+
+        result = {"summary": memory["summary"], "turns": tail, "pinned_quotes": list(pinned_quotes or []), "tokens": sum(costs) + count_tokens(memory["summary"])}
+        self.stats["windows"] += 1
+        self.stats["tokens_in"] += sum(turn_tokens(t) for t in history)
+        self.stats["tokens_sent"] += result["tokens"]
+        return result
+
+    async def _fold(self, project_id, memory, history, turns, pinned_quotes):
+        transcript = "\n".join(f"{t.get('role', 'user').upper()}: {t.get('content', '')}" for t in turns)
+        instr = ("You maintain the running summary of a founder interview. Merge the NEW TURNS into the SUMMARY. "
+                 "Keep every fact, decision, number and open question. Quote the founder's exact words wherever wording matters; "
+                 "never paraphrase a quote. Plain prose, at most 300 words.")
+        try:
+            res = await get_llm(SUMMARY_MODEL, 0.1).ainvoke([
+                SystemMessage(content=instr),
+                HumanMessage(content=f"SUMMARY:\n{memory['summary'] or '(empty)'}\n\nPINNED QUOTES:\n{json.dumps(list(pinned_quotes or []))}\n\nNEW TURNS:\n{transcript}")
+            ])
+        except Exception as e:
+            logger.warning(f"[HISTORY] {project_id}: summarizer failed ({e}); sending the unfolded tail, summary still covers {memory['covered']}.")
+            self.stats["fold_errors"] += 1
+            return memory
+        covered = memory["covered"] + len(turns)
+        memory = {"summary": str(res.content), "covered": covered, "covered_hash": _prefix_hash(history[:covered])}
+        if project_id:
+            await self._ref(project_id).set(memory)
+            self._remember(project_id, memory)
+        self.stats["folds"] += 1
+        self.stats["folded_turns"] += len(turns)
+        logger.warning(f"[HISTORY] {project_id}: folded {len(turns)} turns (summary covers {covered}).")
+        return memory
+
+def context_messages(window: dict) -> list:
+    """System messages carrying what the window folded away (summary) and what it must never lose (quotes)."""
+    msgs = []
+    if window["summary"]: msgs.append(SystemMessage(content=f"[EARLIER CONVERSATION SUMMARY]\n{window['summary']}"))
+    if window["pinned_quotes"]: msgs.append(SystemMessage(content="[FOUNDER VERBATIM QUOTES]\n" + "\n".join(f'- "{q}"' for q in window["pinned_quotes"])))
+    return msgs
+
+def turn_messages(turns: list) -> list:
+    return [(HumanMessage if turn.get('role') == 'user' else AIMessage)(content=turn.get('content', '...')) for turn in turns]
+
+HISTORY = HistoryManager()
@@ -0,0 +1,100 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [PROMPT_KEY]: sha256 of the normalized prompt (lower-cased, whitespace collapsed).
+# 2. [SINGLE_FLIGHT]: Identical in-flight searches share one grounded call (same request AND across requests).
+# 3. [LRU_TTL]: Process tier is a size-bounded LRU; entries expire after HOUND_CACHE_TTL_SECONDS.
+# 4. [PERSISTENT_TIER]: Optional Firestore tier (HOUND_CACHE_PERSIST=1) survives restarts and is shared by instances.
+# 5. [CHUNKS_ONLY]: The cache stores grounding chunks ({title, uri}), never the raw SDK response.
+# 6. [NO_EMPTY]: A search that grounded on nothing is returned but never cached, so a transient empty answer is retried.
+
+import os, re, time, hashlib, logging, asyncio
+from collections import OrderedDict
+from app.db import db
+
+logger = logging.getLogger("uvicorn.error")
+HOUND_CACHE_TTL_SECONDS = float(os.environ.get("HOUND_CACHE_TTL_SECONDS", "21600"))
+HOUND_CACHE_MAX_ENTRIES = int(os.environ.get("HOUND_CACHE_MAX_ENTRIES", "256"))
+HOUND_CACHE_PERSIST = os.environ.get("HOUND_CACHE_PERSIST", "0") == "1"
+HOUND_CACHE_COLLECTION = "hound_cache"
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(re.sub(r"\s+", " ", prompt.strip().lower()).encode("utf-8")).hexdigest()
+
+def as_links(chunks) -> list:
+    return [f"[{c['title']}]({c['uri']})" for c in chunks]
+
+class GroundingCache:
+    def __init__(self, ttl: float = HOUND_CACHE_TTL_SECONDS, max_entries: int = HOUND_CACHE_MAX_ENTRIES, persist: bool = HOUND_CACHE_PERSIST):
+        self.ttl, self.max_entries, self.persist = ttl, max_entries, persist
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "persistent_hits": 0, "empty": 0}
+
+    async def search(self, prompt: str, model_hound, search_tool) -> list:
+        """Returns grounding chunks for the prompt, running at most one grounded call per key."""
+        key = prompt_key(prompt)
+        chunks = self._get(key)
+        if chunks is not None:
+            self.stats["hits"] += 1
+            return chunks
+        if key in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self._inflight[key] = asyncio.ensure_future(self._fill(key, prompt, model_hound, search_tool))
+        try:
+            return await asyncio.shield(self._inflight[key])
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fill(self, key, prompt, model_hound, search_tool):
+        chunks = await self._load_persistent(key)
+        if chunks is not None:
+            self.stats["persistent_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            h_res = await model_hound.generate_content_async(prompt, tools=[search_tool])
+            chunks = [{"title": c.web.title, "uri": c.web.uri} for c in getattr(h_res.candidates[0].grounding_metadata, 'grounding_chunks', []) if c.web]
+            if not chunks:
+                self.stats["empty"] += 1
+                return chunks
+            await self._store_persistent(key, chunks)
+        self._put(key, chunks)
+        return chunks
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return None
+        expires_at, chunks = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return chunks
+
+    def _put(self, key, chunks):
+        self._entries[key] = (time.time() + self.ttl, chunks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load_persistent(self, key):
+        if not self.persist: return None
+        try:
+            doc = await db.collection(HOUND_CACHE_COLLECTION).document(key).get()
+            data = doc.to_dict() if doc.exists else None
+            return data["chunks"] if data and data.get("chunks") and data.get("expires_at", 0) > time.time() else None
+        except Exception as e:
+            logger.error(f"⚠️ [HOUND_CACHE] Persistent read failed: {e}")
+            return None
+
+    async def _store_persistent(self, key, chunks):
+        if not self.persist: return
+        try:
+            await db.collection(HOUND_CACHE_COLLECTION).document(key).set({"chunks": chunks, "expires_at": time.time() + self.ttl})
+        except Exception as e:
+            logger.error(f"⚠️ [HOUND_CACHE] Persistent write failed: {e}")
+
+    def snapshot(self):
+        return {**self.stats, "size": len(self._entries), "inflight": len(self._inflight)}
+
+HOUND = GroundingCache()
@@ -0,0 +1,144 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [JOB_RECORD]: Every job is a `design_jobs/{job_id}` doc: status queued -> running -> done | failed.
+# 2. [PROJECT_LOCK]: `design_job_locks/{project_id}` is created in ONE batch with its job doc; a live lock means the job is
+#    already queued. A lock whose job doc is missing counts as live until its created_at is older than the lease.
+# 3. [BOUNDED_POOL]: JOB_WORKERS asyncio workers drain one queue. Extra jobs wait, they never pile onto the event loop.
+# 4. [RELEASE]: The lock is deleted when the job settles, whatever the outcome.
+# 5. [LEASE]: A non-terminal job carries `expires_at`; the owning instance renews it every JOB_HEARTBEAT_SECONDS while
+#    the job is queued or running. A submit that finds an expired (or lease-less) job marks it failed and takes the lock.
+
+# [BANNED PATTERNS]
+# - NO FIRE-AND-FORGET TASKS: Long work goes through JOBS.submit(), never a bare create_task().
+# - NO DUPLICATE STRIKE TEAMS: A second submit for a locked project returns the existing job_id.
+
+import os, uuid, logging, asyncio, traceback
+from datetime import datetime, timedelta, timezone
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud import firestore
+from app.db import db
+
+logger = logging.getLogger("uvicorn.error")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_COLLECTION = "design_jobs"
+LOCK_COLLECTION = "design_job_locks"
+TERMINAL = ("done", "failed")
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+
+def _lease():
+    return datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)
+
+def _lease_of(created_at):
+    return created_at + timedelta(seconds=JOB_LEASE_SECONDS) if created_at else None
+
+def lease_expired(job: dict) -> bool:
+    expires_at = job.get("expires_at")
+    return expires_at is None or expires_at <= datetime.now(timezone.utc)
+
+class JobRunner:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._heartbeat_task = None
+        self._held = set()  # job_ids this instance must keep leased
+
+    async def submit(self, project_id: str, kind: str, fn, *args):
+        """Queues fn(*args) for the project. Returns (job_id, deduplicated)."""
+        job_id = uuid.uuid4().hex
+        lock_ref = db.collection(LOCK_COLLECTION).document(project_id)
+        job_ref = db.collection(JOB_COLLECTION).document(job_id)
+        lock_doc = {"job_id": job_id, "created_at": firestore.SERVER_TIMESTAMP}
+        job_doc = {"job_id": job_id, "project_id": project_id, "kind": kind, "status": "queued", "created_at": firestore.SERVER_TIMESTAMP, "expires_at": _lease(), "result": None, "error": None}
+        batch = db.batch()
+        batch.create(lock_ref, lock_doc)
+        batch.set(job_ref, job_doc)
+        try:
+            await batch.commit()
+        except AlreadyExists:
+            lock = await lock_ref.get()
+            held = lock.to_dict() or {}
+            job = await get_job(held.get("job_id", ""))
+            if job is None and not lease_expired({"expires_at": _lease_of(held.get("created_at"))}):
+                # The lock's job doc is not visible yet (a writer that predates the joint batch): treat it as live
+                logger.warning(f"[JOBS] {kind} lock for {project_id} has no job doc yet; deduplicating onto {held['job_id']}.")
+                return held["job_id"], True
+            if job and job.get("status") not in TERMINAL:
+                if not lease_expired(job):
+                    logger.warning(f"[JOBS] {kind} already active for {project_id}: {job['job_id']}")
+                    return job["job_id"], True
+                logger.warning(f"[JOBS] {job.get('kind')} {job['job_id']} for {project_id} lost its lease; taking over the lock.")
+                await self._settle(db.collection(JOB_COLLECTION).document(job["job_id"]).update({"status": "failed", "error": "lease expired", "finished_at": firestore.SERVER_TIMESTAMP}))
+            takeover = db.batch()
+            # Only replace the lock we just inspected; a concurrent takeover wins and we dedupe onto it
+            takeover.update(lock_ref, lock_doc, option=db.write_option(last_update_time=lock.update_time))
+            takeover.set(job_ref, job_doc)
+            try:
+                await takeover.commit()
+            except (FailedPrecondition, NotFound):
+                return await self.submit(project_id, kind, fn, *args)
+
+        self._held.add(job_id)
+        self._ensure_workers()
+        await self._queue.put((job_id, project_id, kind, fn, args))
+        logger.warning(f"[JOBS] Queued {kind} {job_id} for {project_id} (depth={self._queue.qsize()}).")
+        return job_id, False
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            if not self._held: continue
+            batch = db.batch()
+            for job_id in list(self._held):
+                batch.update(db.collection(JOB_COLLECTION).document(job_id), {"expires_at": _lease()})
+            await self._settle(batch.commit())
+
+    async def _worker(self):
+        while True:
+            job_id, project_id, kind, fn, args = await self._queue.get()
+            job_ref = db.collection(JOB_COLLECTION).document(job_id)
+            try:
+                await job_ref.update({"status": "running", "started_at": firestore.SERVER_TIMESTAMP})
+                result = await fn(*args)
+                await job_ref.update({"status": "done", "result": result, "finished_at": firestore.SERVER_TIMESTAMP})
+                logger.warning(f"[JOBS] {kind} {job_id} done.")
+            except Exception as e:
+                logger.error(f"❌ [JOBS] {kind} {job_id} failed: {e}"); traceback.print_exc()
+                await self._settle(job_ref.update({"status": "failed", "error": str(e), "finished_at": firestore.SERVER_TIMESTAMP}))
+            finally:
+                self._held.discard(job_id)
+                await self._settle(self._release(project_id, job_id))
+                self._queue.task_done()
+
+    @staticmethod
+    async def _release(project_id: str, job_id: str):
+        lock_ref = db.collection(LOCK_COLLECTION).document(project_id)
+        lock = await lock_ref.get()
+        if lock.exists and lock.to_dict().get("job_id") == job_id: await lock_ref.delete()
+
+    @staticmethod
+    async def _settle(aw):
+        # Bookkeeping failures must never kill a worker
+        try:
+            await aw
+        except Exception as e:
+            logger.error(f"⚠️ [JOBS] Bookkeeping write failed: {e}")
+
+    def snapshot(self):
+        return {"workers": len([t for t in self._tasks if not t.done()]), "queued": self._queue.qsize() if self._queue else 0, "leased": len(self._held)}
+
+async def get_job(job_id: str):
+    if not job_id: return None
+    doc = await db.collection(JOB_COLLECTION).document(job_id).get()
+    return doc.to_dict() if doc.exists else None
+
+JOBS = JobRunner()
@@ -0,0 +1,106 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [KEY]: sha256(llm_string + serialized messages). LangChain's llm_string already carries the model name,
+#    temperature and any bound tools / structured-output schema, so each of those splits the key.
+# 2. [SQLITE_TIER]: One local SQLite file (LLM_CACHE_PATH), shared by every worker process on the host.
+# 3. [TTL_AND_SIZE]: Entries expire after LLM_CACHE_TTL_SECONDS; past LLM_CACHE_MAX_BYTES the least recently used go first.
+# 4. [OPT_IN]: Only agents whose roster doc sets `llm_cache: true` (or all, with LLM_CACHE_DEFAULT=1) get a cached client.
+# 5. [REPLAY]: LLM_CACHE_MODE=replay serves hits and RAISES on a miss, so tests can run fully offline.
+
+# [BANNED PATTERNS]
+# - NO CACHED STREAMS: astream() bypasses the cache by design; only ainvoke()/invoke() turns are stored.
+# - NO SILENT LIVE CALLS IN REPLAY: A replay miss is an error, never a fallback to Vertex.
+
+import os, time, sqlite3, hashlib, logging, threading
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import Generation, ChatGeneration, ChatGenerationChunk
+
+logger = logging.getLogger("uvicorn.error")
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "on")  # on | off | replay
+LLM_CACHE_DEFAULT = os.environ.get("LLM_CACHE_DEFAULT", "0") == "1"
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "/tmp/vibe_llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TRIM_EVERY = 64
+# Only chat results are ever stored; nothing else may be revived from the file
+CACHED_TYPES = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+class SQLiteResponseCache(BaseCache):
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL_SECONDS, max_bytes: int = LLM_CACHE_MAX_BYTES, replay: bool = False):
+        self.path, self.ttl, self.max_bytes, self.replay = path, ttl, max_bytes, replay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0}
+
+    def lookup(self, prompt: str, llm_string: str):
+        key, now = cache_key(prompt, llm_string), time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+                row = None
+            if row: self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.stats["misses"] += 1
+            if self.replay: raise LLMCacheMiss(f"[LLM_CACHE] Replay miss for {key[:16]} ({llm_string[:80]}...)")
+            return None
+        self.stats["hits"] += 1
+        return loads(row[0], allowed_objects=CACHED_TYPES)
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if self.replay: return
+        value, now = dumps(return_val), time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (cache_key(prompt, llm_string), value, len(value), now, now))
+            self.stats["writes"] += 1
+            self._writes += 1
+            if self._writes % LLM_CACHE_TRIM_EVERY == 0: self._trim(now)
+
+    def _trim(self, now):
+        self.stats["expired"] += self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes: return
+        # Walk LRU order until enough bytes are freed
+        cutoff, freed = None, 0
+        for accessed, size in self._conn.execute("SELECT accessed, size FROM responses ORDER BY accessed"):
+            cutoff, freed = accessed, freed + size
+            if total - freed <= self.max_bytes: break
+        self.stats["evicted"] += self._conn.execute("DELETE FROM responses WHERE accessed <= ?", (cutoff,)).rowcount
+
+    def clear(self, **kwargs) -> None:
+        with self._lock: self._conn.execute("DELETE FROM responses")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        total = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "mode": LLM_CACHE_MODE, "entries": entries, "bytes": size, "hit_rate": round(self.stats["hits"] / total, 3) if total else 0.0}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """The process-wide cache, or None when LLM_CACHE_MODE=off. Opened lazily on first use."""
+    global _cache
+    if LLM_CACHE_MODE == "off": return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SQLiteResponseCache(replay=LLM_CACHE_MODE == "replay")
+                logger.warning(f"[LLM_CACHE] Opened {LLM_CACHE_PATH} (mode={LLM_CACHE_MODE}).")
+    return _cache
+
+def cache_stats() -> dict:
+    return _cache.snapshot() if _cache is not None else {"mode": LLM_CACHE_MODE, "entries": 0}
@@ -0,0 +1,49 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [POOL_KEY]: (model_name, temperature, bound tool names, response cache on/off). Same key == same warm ChatVertexAI.
+# 2. [SINGLE_BUILD]: A lock guards construction so concurrent misses never build twice.
+# 3. [STATS]: Hit / miss counters prove steady-state traffic reuses warm HTTP sessions.
+# 4. [RESPONSE_CACHE]: cache=True attaches the SQLite response cache (app/agency/llm_cache.py). Replay mode forces it on.
+
+# [BANNED PATTERNS]
+# - NO PER-REQUEST ChatVertexAI(): Every agency LLM comes from get_llm().
+# - NO MUTATING POOLED CLIENTS: Per-call options go through .bind()/.with_structured_output(), which return new runnables.
+
+import os, logging, threading
+from langchain_google_vertexai import ChatVertexAI
+from app.agency.llm_cache import LLM_CACHE_MODE, get_response_cache
+
+logger = logging.getLogger("uvicorn.error")
+REGION = "us-central1"
+PROJECT_ID = os.environ.get("GCP_PROJECT", "vibe-agent-final")
+
+_pool = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _build(model_name: str, temperature: float, tools: tuple, cache: bool):
+    llm = ChatVertexAI(model_name=model_name, project=PROJECT_ID, location=REGION, transport="rest", temperature=temperature, cache=(get_response_cache() if cache else None))
+    if "google_search_retrieval" in tools:
+        from vertexai.generative_models import Tool
+        llm = llm.bind_tools([Tool.from_dict({"google_search": {}})])
+    return llm
+
+def get_llm(model_name: str, temperature: float = 0.1, tools=(), cache: bool = False):
+    cache = LLM_CACHE_MODE == "replay" or (bool(cache) and LLM_CACHE_MODE != "off")
+    key = (model_name, float(temperature), tuple(sorted(tools or ())), cache)
+    llm = _pool.get(key)
+    if llm is not None:
+        _stats["hits"] += 1
+        return llm
+    with _lock:
+        llm = _pool.get(key)
+        if llm is None:
+            _stats["misses"] += 1
+            llm = _pool[key] = _build(*key)
+            logger.warning(f"[LLM_POOL] Warmed {key}. Pool size: {len(_pool)}")
+        else:
+            _stats["hits"] += 1
+    return llm
+
+def pool_stats():
+    total = _stats["hits"] + _stats["misses"]
+    return {**_stats, "size": len(_pool), "hit_rate": round(_stats["hits"] / total, 3) if total else 0.0, "keys": [f"{m}@{t}{'+' + ','.join(tl) if tl else ''}{'+cache' if c else ''}" for m, t, tl, c in _pool]}
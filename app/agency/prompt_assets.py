@@ -0,0 +1,71 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [BY_NAME]: Brain markdown is referenced by name: an alias in PROMPT_ASSETS, or a path under Brain/ without ".md".
+# 2. [IN_MEMORY]: Each asset is read once and served from memory.
+# 3. [MTIME_RELOAD]: At most every PROMPT_ASSET_CHECK_SECONDS an asset is stat()ed; a new (mtime, size) reloads it.
+# 4. [LAST_GOOD]: A missing or unreadable file keeps serving the last good text. Never loaded == the caller's default.
+
+# [BANNED PATTERNS]
+# - NO BARE open().read(): Files are read in a `with` block, and only on change.
+# - NO REQUEST FAILURES FROM ASSETS: get() logs and falls back; it never raises.
+
+import os, time, logging, threading
+
+logger = logging.getLogger("uvicorn.error")
+FRONTEND_ROOT = os.environ.get("FRONTEND_PATH", "../vibe-design-lab")
+PROMPT_ASSET_CHECK_SECONDS = float(os.environ.get("PROMPT_ASSET_CHECK_SECONDS", "2"))
+
+PROMPT_ASSETS = {
+    "PROTOCOL_ELI": "Brain/EXO_BRAINS/GLOBAL/PROTOCOL_ELI.md",
+}
+
+class PromptAssetRegistry:
+    def __init__(self, root: str = FRONTEND_ROOT, check_seconds: float = PROMPT_ASSET_CHECK_SECONDS):
+        self.root, self.check_seconds = root, check_seconds
+        self._assets = {}  # name -> {"text", "mtime", "size", "checked_at", "error"}
+        self._lock = threading.Lock()
+        self.stats = {"reloads": 0, "fallbacks": 0, "misses": 0}
+
+    def path_of(self, name: str) -> str:
+        rel = PROMPT_ASSETS.get(name) or f"Brain/{name}.md"
+        return os.path.join(self.root, rel)
+
+    def get(self, name: str, default: str = "") -> str:
+        """Current text of the asset. Falls back to the last good version, then to `default`."""
+        now = time.monotonic()
+        entry = self._assets.get(name)
+        if entry is None or now - entry["checked_at"] >= self.check_seconds:
+            entry = self._revalidate(name, entry, now)
+        if entry.get("text") is None:
+            self.stats["misses"] += 1
+            return default
+        return entry["text"]
+
+    def _revalidate(self, name, entry, now):
+        with self._lock:
+            entry = dict(self._assets.get(name) or {})
+            entry["checked_at"] = now
+            path = self.path_of(name)
+            try:
+                st = os.stat(path)
+                if (st.st_mtime_ns, st.st_size) != (entry.get("mtime"), entry.get("size")):
+                    with open(path, encoding="utf-8") as f: text = f.read()
+                    if entry.get("text") is not None: logger.warning(f"[PROMPT_ASSETS] {name} changed on disk; reloaded.")
+                    entry.update(text=text, mtime=st.st_mtime_ns, size=st.st_size, error=None)
+                    self.stats["reloads"] += 1
+            except (OSError, UnicodeDecodeError) as e:
+                # Log once per failure mode, not on every check
+                if entry.get("error") != str(e):
+                    state = "serving last good version" if entry.get("text") is not None else "no version loaded"
+                    logger.warning(f"[PROMPT_ASSETS] {name} unreadable at {path} ({e}); {state}.")
+                entry["error"] = str(e)
+                self.stats["fallbacks"] += 1
+            self._assets[name] = entry
+            return entry
+
+    def preload(self, names=None):
+        for name in names or PROMPT_ASSETS: self.get(name)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "assets": {n: {"loaded": e.get("text") is not None, "chars": len(e.get("text") or ""), "error": e.get("error")} for n, e in self._assets.items()}}
+
+ASSETS = PromptAssetRegistry()
@@ -0,0 +1,89 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [MIRROR]: Process-local copy of agency_roster, department_registry and agency_settings/global_config.
+# 2. [COLD_LOAD]: First lookup awaits one concurrent full load (2 collection scans + 1 doc read).
+# 3. [STALE_WHILE_REVALIDATE]: Past the TTL, lookups keep serving the mirror while ONE background refresh runs.
+# 4. [WRITE_THROUGH]: The roster/department POST handlers merge their patch locally (nested maps merge like Firestore's
+#    set(merge=True)), then mark the mirror stale.
+# 5. [GENERATION]: Every put/invalidate bumps `generation`; a refresh that started under an older generation is
+#    discarded, so a scan that raced a write can never overwrite it.
+
+# [BANNED PATTERNS]
+# - NO FIRESTORE READS ON THE HOT PATH: resolve() is pure dict access.
+# - NO PARALLEL REFRESH STORMS: Only one refresh task may be in flight.
+
+import os, time, logging, asyncio
+from app.db import db
+
+logger = logging.getLogger("uvicorn.error")
+ROSTER_TTL_SECONDS = float(os.environ.get("ROSTER_TTL_SECONDS", "300"))
+
+DEFAULT_AGENT = {"model_tier": "FLASH", "system_prompt": "You are a PM.", "dept_id": "HUB"}
+DEFAULT_DEPT = {"lens_profile": "General strategy."}
+
+def deep_merge(base: dict, patch: dict) -> dict:
+    merged = dict(base)
+    for k, v in patch.items():
+        merged[k] = deep_merge(merged[k], v) if isinstance(v, dict) and isinstance(merged.get(k), dict) else v
+    return merged
+
+class RosterMirror:
+    def __init__(self, ttl: float = ROSTER_TTL_SECONDS):
+        self.ttl = ttl
+        self.agents, self.depts, self.global_rules = {}, {}, ""
+        self.loaded_at = None
+        self.generation = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    async def refresh(self) -> bool:
+        generation = self.generation
+        roster, depts, global_doc = await asyncio.gather(
+            self._scan("agency_roster"), self._scan("department_registry"),
+            db.collection("agency_settings").document("global_config").get(),
+        )
+        if generation != self.generation:
+            logger.warning("[ROSTER_MIRROR] Discarded a refresh that raced a local write; the next lookup retries.")
+            return False
+        self.agents, self.depts = roster, depts
+        self.global_rules = global_doc.to_dict().get("rules", "") if global_doc.exists else ""
+        self.loaded_at = time.monotonic()
+        logger.warning(f"[ROSTER_MIRROR] Loaded {len(roster)} agents, {len(depts)} departments.")
+        return True
+
+    async def ensure_fresh(self):
+        if self.loaded_at is None:
+            async with self._lock:
+                while self.loaded_at is None: await self.refresh()
+        elif time.monotonic() - self.loaded_at > self.ttl and not (self._refresh_task and not self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    def resolve(self, agent_id: str):
+        """Returns (agent_data, dept_data, global_rules) with zero network I/O."""
+        a_data = self.agents.get(agent_id) or DEFAULT_AGENT
+        d_data = self.depts.get(a_data.get("dept_id", "HUB")) or DEFAULT_DEPT
+        return a_data, d_data, self.global_rules
+
+    def put_agent(self, agent_id: str, patch: dict):
+        self.agents[agent_id] = deep_merge(self.agents.get(agent_id, {}), patch)
+        self.invalidate()
+
+    def put_dept(self, dept_id: str, patch: dict):
+        self.depts[dept_id] = deep_merge(self.depts.get(dept_id, {}), patch)
+        self.invalidate()
+
+    def invalidate(self):
+        """Keeps serving the current copy, but forces a background refresh on the next lookup."""
+        self.generation += 1
+        if self.loaded_at is not None: self.loaded_at = float("-inf")
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"⚠️ [ROSTER_MIRROR] Refresh failed, serving last good copy: {e}")
+
+    @staticmethod
+    async def _scan(collection: str):
+        return {d.id: d.to_dict() async for d in db.collection(collection).stream()}
+
+ROSTER = RosterMirror()
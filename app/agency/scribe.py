@@ -0,0 +1,91 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [CURSOR]: `cofounder_boards/{id}/memory/scribe` = {cursor, cursor_hash}: how many chat turns the scribe has already read.
+#    The last extraction itself is the persisted manifesto (vibe_manifest.<MANIFESTO>), so it is not stored twice.
+# 2. [NEW_TURNS_ONLY]: The scribe sees the current manifesto + turns past the cursor (plus the rolling summary if some
+#    of those turns were already folded out of the window).
+# 3. [MERGE]: Non-empty strings from the extraction overwrite; list fields (quotes, drivers, tensions) are unioned.
+# 4. [GATE_SKIP]: While the physics gate is RED, new user text shorter than SCRIBE_SKIP_MIN_CHARS cannot fill a gap
+#    (gaps need 15+ chars) and permission is ignored, so the call is skipped and the cursor stays put.
+
+# [BANNED PATTERNS]
+# - NO FULL-CONVERSATION RE-EXTRACTION: Only a reset/edited client history sends the scribe back to turn 0.
+
+import os, json, hashlib, logging
+from collections import OrderedDict
+from app.db import db
+
+logger = logging.getLogger("uvicorn.error")
+GATE_KEYS = ['founder_frustration', 'competitor_belief', 'business_model', 'success_sentence']
+GATE_MIN_CHARS = 15
+SCRIBE_SKIP_MIN_CHARS = int(os.environ.get("SCRIBE_SKIP_MIN_CHARS", str(GATE_MIN_CHARS)))
+LIST_FIELDS = ('verbatim_quotes', 'emotional_drivers', 'unresolved_tensions')
+SCRIBE_CACHE_MAX = 512
+
+SCRIBE_INSTR = ("You are the Librarian (IQ). CURRENT_MANIFESTO holds facts already extracted. From NEW_TURNS only, verbatim extract facts: "
+                "core_idea, target_user, founder_frustration, competitor_belief, business_model, success_sentence. "
+                "Return a field ONLY if NEW_TURNS state or change it; leave every other field empty. verbatim_quotes: only quotes found in NEW_TURNS. "
+                "Set user_confirmed_start=True ONLY on explicit permission in NEW_TURNS.")
+
+def gate_missing(manifesto: dict) -> list:
+    return [k.replace('_', ' ') for k in GATE_KEYS if len(str(manifesto.get(k, ""))) < GATE_MIN_CHARS]
+
+def _turns_hash(turns) -> str:
+    # Role + content only: clients may decorate turns with ids/timestamps
+    return hashlib.sha256(json.dumps([[t.get('role'), t.get('content')] for t in turns]).encode("utf-8")).hexdigest()
+
+def merge_extraction(manifesto: dict, extracted: dict) -> dict:
+    merged = dict(manifesto)
+    for k, v in extracted.items():
+        if not v or k == 'problem_statement': continue
+        if k in LIST_FIELDS:
+            merged[k] = list(merged.get(k) or []) + [x for x in v if x not in (merged.get(k) or [])]
+        else:
+            merged[k] = v
+    return merged
+
+def can_skip(manifesto: dict, new_turns: list) -> bool:
+    """True when the new turns cannot change the gate: physics is RED and the founder said too little to fill a gap."""
+    user_chars = sum(len(str(t.get('content', '')).strip()) for t in new_turns if t.get('role') == 'user')
+    return bool(gate_missing(manifesto)) and user_chars < SCRIBE_SKIP_MIN_CHARS
+
+def payload(manifesto: dict, new_turns: list, earlier_summary: str = "") -> str:
+    body = {"CURRENT_MANIFESTO": {k: v for k, v in manifesto.items() if k != 'problem_statement'}, "NEW_TURNS": new_turns}
+    if earlier_summary: body["EARLIER_SUMMARY"] = earlier_summary
+    return json.dumps(body)
+
+class ScribeCursor:
+    def __init__(self):
+        self._cursors = OrderedDict()  # project_id -> {"cursor", "cursor_hash"}
+        self.stats = {"calls": 0, "skipped": 0, "resets": 0, "turns_read": 0, "turns_skipped_by_cursor": 0}
+
+    def _ref(self, project_id):
+        return db.collection("cofounder_boards").document(project_id).collection("memory").document("scribe")
+
+    async def pending(self, project_id: str, history: list) -> int:
+        """Index of the first turn the scribe has not read yet (0 if the stored cursor does not match this history)."""
+        if not project_id: return 0
+        state = self._cursors.get(project_id)
+        if state is None:
+            snap = await self._ref(project_id).get()
+            state = self._remember(project_id, snap.to_dict() if snap.exists else {"cursor": 0, "cursor_hash": _turns_hash([])})
+        cursor = state.get("cursor", 0)
+        if cursor > len(history) or _turns_hash(history[:cursor]) != state.get("cursor_hash"):
+            logger.warning(f"[SCRIBE] {project_id}: cursor {cursor} does not match the client history; re-reading from turn 0.")
+            self.stats["resets"] += 1
+            return 0
+        self.stats["turns_skipped_by_cursor"] += cursor
+        return cursor
+
+    async def advance(self, project_id: str, read_turns: list):
+        """Marks `read_turns` (history + the prompt just extracted) as read."""
+        if not project_id: return
+        state = self._remember(project_id, {"cursor": len(read_turns), "cursor_hash": _turns_hash(read_turns)})
+        await self._ref(project_id).set(state)
+
+    def _remember(self, project_id, state):
+        self._cursors[project_id] = state
+        self._cursors.move_to_end(project_id)
+        while len(self._cursors) > SCRIBE_CACHE_MAX: self._cursors.popitem(last=False)
+        return state
+
+SCRIBE = ScribeCursor()
@@ -0,0 +1,43 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [FLIGHT_KEY]: project_id + sha256 of (prompt, specialist, history). Same key == same turn.
+# 2. [LEADER]: The first request runs the pipeline and owns a future for its final payload.
+# 3. [FOLLOWERS]: Duplicates (double-clicks, retries) await the leader's future instead of paying for a second run.
+
+# [BANNED PATTERNS]
+# - NO CANCELLATION LEAKS: Followers await through shield(); one disconnecting client never cancels the turn.
+
+import json, hashlib, logging, asyncio
+
+logger = logging.getLogger("uvicorn.error")
+_flights = {}
+STATS = {"leaders": 0, "coalesced": 0}
+
+def flight_key(project_id, prompt, specialist_id, chat_history) -> str:
+    digest = hashlib.sha256(json.dumps([prompt, specialist_id, chat_history]).encode("utf-8")).hexdigest()
+    return f"{project_id}:{digest}"
+
+def follow(key: str):
+    """Returns the running leader's future for this key, or None if there is no flight."""
+    flight = _flights.get(key)
+    if flight is not None and not flight.done():
+        STATS["coalesced"] += 1
+        logger.warning(f"[SINGLE_FLIGHT] Coalesced duplicate turn onto {key[:24]}...")
+        return flight
+    return None
+
+def lead(key: str) -> asyncio.Future:
+    flight = asyncio.get_running_loop().create_future()
+    # Nobody may be following; mark any exception as retrieved so it is never logged as "never awaited"
+    flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _flights[key] = flight
+    STATS["leaders"] += 1
+    return flight
+
+def land(key: str, flight: asyncio.Future, result=None, error: BaseException = None):
+    if not flight.done():
+        if error is not None: flight.set_exception(error)
+        else: flight.set_result(result)
+    if _flights.get(key) is flight: _flights.pop(key, None)
+
+async def await_flight(flight: asyncio.Future):
+    return await asyncio.shield(flight)
@@ -0,0 +1,45 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [FAN_OUT]: One task per role. Hound + Specialist run back-to-back inside that task.
+# 2. [CONCURRENCY_CAP]: A semaphore bounds in-flight roles (STRIKE_TEAM_CONCURRENCY).
+# 3. [JOIN]: gather() completes every role BEFORE the Editor turn is allowed to start.
+# 4. [HOUND_CACHE]: Roles sharing a research prompt share ONE grounded search (see app/agency/hound.py).
+
+# [BANNED PATTERNS]
+# - NO BLOCKING CALLS: Hound and Specialist must use the async SDK paths.
+# - NO MULTI-PART PASSES: Specialist content is cast to str() before it leaves the task.
+
+import os, json, time, logging, asyncio
+from langchain_core.messages import HumanMessage, SystemMessage
+from app.agency.factory import get_agent_and_dept
+from app.agency.hound import HOUND, as_links
+
+logger = logging.getLogger("uvicorn.error")
+STRIKE_TEAM_CONCURRENCY = int(os.environ.get("STRIKE_TEAM_CONCURRENCY", "3"))
+
+async def _run_role(role, active_manifesto, eli_p, model_hound, search_tool, gate):
+    async with gate:
+        started = time.monotonic()
+        s_c, _ = await get_agent_and_dept(f'strat_the_big_idea_{role}')
+        links = as_links(await HOUND.search(f"Research 2026 data for: {active_manifesto['problem_statement']}", model_hound, search_tool))
+
+        # [STR_CASTING]: Force content to string to avoid multi-part 500 errors
+        p_instr = f"{s_c['system_prompt']}\n\n[ELI]\n{eli_p}\n\nMISSION:\n{active_manifesto['problem_statement']}\n\nGROUND_TRUTH:\n{json.dumps(active_manifesto)}\n\nLINKS:\n{links}\n\nMANDATE: Cite using [Name](URL) format. No [RAW_DATA] tags."
+        p_res = await s_c['llm'].ainvoke([SystemMessage(content=p_instr), HumanMessage(content="Analyze vision. Cite links.")])
+        content = str(p_res.content)
+        logger.warning(f"[SPECIALIST] {role} finished in {time.monotonic() - started:.1f}s. Research Density: {len(content)} chars.")
+        return role, content, links
+
+async def run_strike_team(roles, active_manifesto, eli_p, model_hound, search_tool, concurrency: int = None):
+    """Fans the roles out concurrently and joins them. Returns (team_results, bounty_bank)."""
+    cap = max(1, concurrency or STRIKE_TEAM_CONCURRENCY)
+    gate = asyncio.Semaphore(cap)
+    started = time.monotonic()
+    finished = await asyncio.gather(*[_run_role(role, active_manifesto, eli_p, model_hound, search_tool, gate) for role in roles])
+
+    # [JOIN]: Preserve role order so the bounty bank is deterministic (and free of cached duplicates)
+    team_results, bounty_bank = {}, []
+    for role, content, links in finished:
+        team_results[role] = content
+        bounty_bank.extend(l for l in links if l not in bounty_bank)
+    logger.warning(f"[STRIKE_TEAM] {len(roles)} roles joined in {time.monotonic() - started:.1f}s (cap={cap}).")
+    return team_results, bounty_bank
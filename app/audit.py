@@ -1,19 +1,125 @@
 # app/audit.py (Inside 'the-co-founder' folder)
-import os
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [PARALLEL_WALK]: Backend and FRONTEND_ROOT trees are walked concurrently; changed files are hashed on a pool.
+# 2. [STAT_CACHE]: Per-file sha256 + line count is cached by (path, mtime_ns, size). Untouched files are never re-read.
+#    Every cache access holds _cache_lock: both roots' scans, their prunes and get_file_stats share it.
+# 3. [MERKLE]: Every directory hashes its sorted children ("name:hash"), so one root hash signs a whole repo.
+# 4. [DIFF]: Each run is compared with the previous one: added / removed / modified files per repo.
+# 5. [UNREADABLE]: A file that cannot be read is recorded with hash "unreadable" (and counted), never aborting the walk.
+
+import os, time, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Get the path to your frontend folder from an environment variable
 FRONTEND_ROOT = os.environ.get("FRONTEND_PATH", "../vibe-design-lab")
+BACKEND_ROOT = "."
+AUDIT_SKIP_DIRS = {".git", "node_modules", "__pycache__", ".next", "dist", "build", "venv", ".venv", ".pytest_cache", ".mypy_cache"}
+AUDIT_WORKERS = int(os.environ.get("AUDIT_WORKERS", "8"))
+AUDIT_DIFF_LIMIT = 200
+UNREADABLE = "unreadable"
+
+_pool = ThreadPoolExecutor(max_workers=AUDIT_WORKERS, thread_name_prefix="audit")
+_stat_cache = {}  # abs path -> (mtime_ns, size, sha256, lines)
+_last = {}        # repo label -> {relpath: sha256} from the previous run
+_lock = threading.Lock()
+_cache_lock = threading.Lock()
+
+def _digest(path, mtime_ns, size):
+    h, lines, last = hashlib.sha256(), 0, b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    # Same count readlines() gives: an unterminated last line still counts
+    record = (mtime_ns, size, h.hexdigest(), lines + (last != b"\n"))
+    with _cache_lock: _stat_cache[path] = record
+    return record
+
+def file_record(path):
+    """(sha256, lines, size) for one file, re-reading it only if mtime or size moved. None if missing,
+    (UNREADABLE, 0, size) if it exists but cannot be read."""
+    path = os.path.abspath(path)
+    try: st = os.stat(path)
+    except FileNotFoundError: return None
+    except OSError: return UNREADABLE, 0, 0
+    with _cache_lock: cached = _stat_cache.get(path)
+    if not (cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size):
+        try: cached = _digest(path, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError: return None
+        except OSError:
+            with _cache_lock: _stat_cache.pop(path, None)
+            return UNREADABLE, 0, st.st_size
+    return cached[2], cached[3], cached[1]
+
+def scan_tree(root):
+    """{relpath: (sha256, lines, size)} for every file under root, skipping vendored/build dirs."""
+    if not os.path.isdir(root): return {}
+    paths = []
+    for d, dirs, files in os.walk(root):
+        dirs[:] = [x for x in dirs if x not in AUDIT_SKIP_DIRS]
+        paths.extend(os.path.join(d, f) for f in files)
+    records = dict(zip(paths, _pool.map(file_record, paths)))
+    # Forget files under this root that the walk no longer saw (deleted, renamed, now skipped)
+    prefix, seen = os.path.join(os.path.abspath(root), ""), {os.path.abspath(p) for p in paths}
+    with _cache_lock:
+        for stale in [p for p in _stat_cache if p.startswith(prefix) and p not in seen]: del _stat_cache[stale]
+    return {os.path.relpath(p, root): r for p, r in records.items() if r is not None}
+
+def merkle(files):
+    """Root hash plus per-directory hashes for {relpath: (sha256, ...)}."""
+    tree = {}
+    for rel, record in files.items():
+        node, parts = tree, rel.split(os.sep)
+        for part in parts[:-1]: node = node.setdefault(part + "/", {})
+        node[parts[-1]] = record[0]
+
+    dirs = {}
+    def fold(node, prefix):
+        h = hashlib.sha256()
+        for name in sorted(node):
+            child = node[name]
+            digest = fold(child, prefix + name) if isinstance(child, dict) else child
+            h.update(f"{name}:{digest}\n".encode("utf-8"))
+        dirs[prefix or "/"] = h.hexdigest()
+        return dirs[prefix or "/"]
+    return fold(tree, ""), dirs
 
-def generate_code_signature():
+def diff(previous, current):
+    if previous is None: return {"first_run": True}
+    added = sorted(set(current) - set(previous))
+    removed = sorted(set(previous) - set(current))
+    modified = sorted(p for p in set(current) & set(previous) if current[p] != previous[p])
+    return {"added": added[:AUDIT_DIFF_LIMIT], "removed": removed[:AUDIT_DIFF_LIMIT], "modified": modified[:AUDIT_DIFF_LIMIT], "counts": {"added": len(added), "removed": len(removed), "modified": len(modified)}}
+
+def audit_repos(include_dirs: bool = False):
+    """Scans both repos concurrently. Returns per-repo Merkle roots, totals and the diff against the last run."""
+    started = time.monotonic()
+    roots = {"backend": BACKEND_ROOT, "frontend": FRONTEND_ROOT}
+    with _lock:
+        with ThreadPoolExecutor(max_workers=len(roots)) as walkers:
+            scans = dict(zip(roots, walkers.map(scan_tree, roots.values())))
+        report = {}
+        for label, files in scans.items():
+            root_hash, dirs = merkle(files)
+            hashes = {p: r[0] for p, r in files.items()}
+            report[label] = {"root": roots[label], "merkle_root": root_hash, "files": len(files), "lines": sum(r[1] for r in files.values()), "unreadable": sum(r[0] == UNREADABLE for r in files.values()), "diff": diff(_last.get(label), hashes)}
+            if include_dirs: report[label]["dirs"] = dirs
+            _last[label] = hashes
+    report["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return report
+
+def generate_code_signature(report=None):
     # File paths relative to their respective roots
     backend_targets = ["app/agency/architect.py", "app/agency/departments/product/schemas.py", "app/chain.py"]
     frontend_targets = ["src/app/project/[id]/page.tsx", "src/store/vibe-store.ts", "src/components/StrategyNodes.tsx"]
-    
+    report = report or audit_repos()
+
     # NEW: The Ledger location (inside the Frontend Brain folder)
     ledger_path = os.path.join(FRONTEND_ROOT, "Brain/AGENCY_MISSION.md")
-    
+
     signature = "--- DUAL-REPO CODE SIGNATURE ---\n"
-    
+
     # 1. Audit the Constitution (The Ledger)
     if os.path.exists(ledger_path):
         signature += f"📜 TRUTH LEDGER: DETECTED (Location: Frontend/Brain)\n"
@@ -21,25 +127,29 @@ def generate_code_signature():
         signature += f"⚠️ TRUTH LEDGER: MISSING (Expected at: {ledger_path})\n"
 
     # 2. Audit Backend
-    signature += "\n[REPOSITORY: THE-CO-FOUNDER (BACKEND)]\n"
+    signature += f"\n[REPOSITORY: THE-CO-FOUNDER (BACKEND)]\n{tree_line(report['backend'])}"
     for path in backend_targets:
         signature += get_file_stats(path)
 
     # 3. Audit Frontend
-    signature += "\n[REPOSITORY: VIBE-DESIGN-LAB (FRONTEND)]\n"
+    signature += f"\n[REPOSITORY: VIBE-DESIGN-LAB (FRONTEND)]\n{tree_line(report['frontend'])}"
     for path in frontend_targets:
         full_path = os.path.join(FRONTEND_ROOT, path)
         signature += get_file_stats(full_path, display_name=path)
-        
+
     return signature
 
+def tree_line(repo):
+    counts = repo["diff"].get("counts")
+    changes = f"+{counts['added']} -{counts['removed']} ~{counts['modified']}" if counts else "first scan"
+    return f"MERKLE: {repo['merkle_root'][:16]} | FILES: {repo['files']} | LINES: {repo['lines']} | SINCE LAST: {changes}\n"
+
 def get_file_stats(path, display_name=None):
     name = display_name if display_name else path
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            lines = f.readlines()
-            return f"FILE: {name} | LINES: {len(lines)}\n"
+    record = file_record(path)
+    if record:
+        return f"FILE: {name} | LINES: {record[1]} | SHA: {record[0][:12]}\n"
     return f"FILE: {name} | STATUS: NOT FOUND\n"
 
 if __name__ == "__main__":
-    print(generate_code_signature())
\ No newline at end of file
+    print(generate_code_signature())
@@ -0,0 +1,65 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [LIGHT_BOARD]: `cofounder_boards/{id}.vibe_manifest` keeps only the manifesto (incl. the Brief) and small state.
+# 2. [PAPER_DOCS]: Each strategy paper lives in `cofounder_boards/{id}/papers/{dept_id}`: `content` + `appendix`.
+# 3. [PAPER_INDEX]: The board carries `paper_index.{dept_id}` = {headline, updated_at} so UIs can list papers cheaply.
+# 4. [SELECTIVE_LOAD]: load_papers() projects away the appendix unless it is asked for, and point-reads the requested
+#    dept_ids instead of streaming every paper.
+
+# [BANNED PATTERNS]
+# - NO PAPERS INSIDE vibe_manifest: save_manifest() splits them out before writing.
+# - NO WHOLE-BOARD READS ON THE HOT PATH: design turns read only the manifesto field path.
+
+from google.cloud import firestore
+from app.db import db
+
+BOARD_COLLECTION = "cofounder_boards"
+PAPER_COLLECTION = "papers"
+PAPER_KEYS = ('the_big_idea', 'the_opportunity', 'the_people', 'the_experience', 'the_mvp')
+
+def _board(project_id: str):
+    return db.collection(BOARD_COLLECTION).document(project_id)
+
+def split_manifest(manifest: dict):
+    """Returns (light manifest, {dept_id: paper content}) for a client-supplied vibe_manifest."""
+    manifest = manifest or {}
+    return {k: v for k, v in manifest.items() if k not in PAPER_KEYS}, {k: v for k, v in manifest.items() if k in PAPER_KEYS and v}
+
+def _paper_writes(batch, project_id: str, dept_id: str, content: dict):
+    content = dict(content)
+    doc = {'dept_id': dept_id, 'content': content, 'updated_at': firestore.SERVER_TIMESTAMP}
+    # Papers are usually loaded without their appendix; only a caller that sent one may replace it
+    if 'appendix' in content: doc['appendix'] = content.pop('appendix')
+    batch.set(_board(project_id).collection(PAPER_COLLECTION).document(dept_id), doc, merge=list(doc))
+    return {f'paper_index.{dept_id}': {'headline': content.get('headline', ''), 'updated_at': firestore.SERVER_TIMESTAMP}}
+
+async def save_paper(project_id: str, dept_id: str, content: dict):
+    batch = db.batch()
+    # Every client/pipeline write bumps manifest_version so an in-flight ManifestWriter rebases onto it
+    batch.update(_board(project_id), {**_paper_writes(batch, project_id, dept_id, content), 'manifest_version': firestore.Increment(1)})
+    await batch.commit()
+
+async def save_manifest(project_id: str, manifest: dict):
+    """Client save: light manifest onto the board, papers into the subcollection, one batch."""
+    light, papers = split_manifest(manifest)
+    batch = db.batch()
+    board_update = {'vibe_manifest': light, 'manifest_version': firestore.Increment(1), 'updated_at': firestore.SERVER_TIMESTAMP}
+    for dept_id, content in papers.items():
+        board_update.update(_paper_writes(batch, project_id, dept_id, content))
+    batch.update(_board(project_id), board_update)
+    await batch.commit()
+
+async def load_papers(project_id: str, dept_ids=None, include_appendix: bool = False):
+    """Returns {dept_id: content}. The appendix is only transferred when include_appendix is set."""
+    papers_ref = _board(project_id).collection(PAPER_COLLECTION)
+    fields = None if include_appendix else ['dept_id', 'content']
+    if dept_ids:
+        # Point reads: only the requested papers leave Firestore
+        snaps = db.get_all([papers_ref.document(dept_id) for dept_id in dept_ids], field_paths=fields)
+    else:
+        snaps = (papers_ref.select(fields) if fields else papers_ref).stream()
+    papers = {}
+    async for d in snaps:
+        if not d.exists: continue
+        data = d.to_dict()
+        papers[d.id] = {**data['content'], 'appendix': data['appendix']} if include_appendix and data.get('appendix') is not None else data['content']
+    return papers
@@ -6,11 +6,13 @@ import json
 import asyncio
 import traceback
 import base64
+import binascii
 import logging
 from pathlib import Path
-from google.cloud import firestore, storage
+from google.cloud import firestore
 from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Literal, Tuple
 from typing_extensions import TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
@@ -18,19 +20,30 @@ from langgraph.graph.message import add_messages
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_vertexai import ChatVertexAI, HarmBlockThreshold, HarmCategory
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata, CheckpointTuple
-from langchain_core.load import dumpd, load
 from pydantic import BaseModel, Field
 from app.tools import update_board, write_file
 from langserve import add_routes
 from app.naming_registry import REGISTRY
 # --- IMPORT LOCAL TOOLS ---
-from app.agency.architect import router as architect_router
-from app.audit import generate_code_signature
+from app.agency.architect import router as architect_router, SPECULATION_STATS
+from app.audit import generate_code_signature, audit_repos
+from app.checkpointer import CustomFirestoreSaver
+from app.board_store import PAPER_KEYS, load_papers, save_manifest
+from app.state_writer import WRITE_STATS
+from app.agency.roster_mirror import ROSTER
+from app.agency.prompt_assets import ASSETS
+from app.agency.history import HISTORY
+from app.agency.scribe import SCRIBE
+from app.agency.llm_pool import pool_stats
+from app.agency.llm_cache import cache_stats
+from app.agency.hound import HOUND
+from app.agency.jobs import JOBS
+from app.agency.single_flight import STATS as FLIGHT_STATS
+from app.workspace import WORKSPACE, sync_dir, sync_up, sync_down
+from app.dev_files import PatchError, resolve_dev_path, read_lines, iter_chunks, apply_patches
 
 # --- SECTION B: CLOUD & LOCAL CONFIG ---
-db = firestore.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
-storage_client = storage.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
+from app.db import db, storage_client
 BUCKET_NAME = "vibe-agent-user-projects"
 REGION = "us-central1"
 logger = logging.getLogger("uvicorn.error")
@@ -60,36 +73,6 @@ workflow.set_entry_point("cofounder")
 workflow.add_edge("cofounder", END)
 
 # --- SECTION E: PERSISTENCE (CHECKPOINTER) ---
-class TypedSerializer:
-    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
-        return "json", json.dumps(dumpd(obj)).encode("utf-8")
-    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
-        return load(json.loads(data[1].decode("utf-8")))
-
-class CustomFirestoreSaver(BaseCheckpointSaver):
-    def __init__(self, client: firestore.Client, collection: str = "checkpoints"):
-        super().__init__(serde=TypedSerializer())
-        self.client = client
-        self.collection = collection
-    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
-        thread_id = config["configurable"]["thread_id"]
-        docs = list(self.client.collection(self.collection).where("thread_id", "==", thread_id).order_by("checkpoint_id", direction=firestore.Query.DESCENDING).limit(1).stream())
-        if not docs: return None
-        data = docs[0].to_dict()
-        return CheckpointTuple(config, self.serde.loads_typed(("json", data["checkpoint"].encode("utf-8"))), self.serde.loads_typed(("json", data["metadata"].encode("utf-8"))), None)
-    async def aput(self, config, checkpoint, metadata, new_versions):
-        thread_id = config["configurable"]["thread_id"]
-        checkpoint_id = f"{int(time.time()*1000)}"
-        _, chk_bytes = self.serde.dumps_typed(checkpoint)
-        _, meta_bytes = self.serde.dumps_typed(metadata)
-        self.client.collection(self.collection).document(f"{thread_id}_{checkpoint_id}").set({"thread_id": thread_id, "checkpoint_id": checkpoint_id, "checkpoint": chk_bytes.decode("utf-8"), "metadata": meta_bytes.decode("utf-8"), "created_at": firestore.SERVER_TIMESTAMP})
-        return {"configurable": {"thread_id": thread_id, "checkpoint_id": checkpoint_id}}
-    async def aput_writes(self, config, writes, task_id, task_path=""): pass
-    def list(self, config, **kwargs): return []
-    async def alist(self, config, **kwargs): return []
-    def get_tuple(self, config): return None 
-    def put(self, config, checkpoint, metadata, new_versions): return {}
-
 checkpointer = CustomFirestoreSaver(db, "custom_checkpoints")
 graph = workflow.compile(checkpointer=checkpointer)
 
@@ -100,6 +83,14 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
 # MOUNT THE AGENCY ENGINE
 app.include_router(architect_router, prefix="/agent/design", tags=["Architect"])
 
+@app.on_event("startup")
+async def warm_roster_mirror():
+    try:
+        await ROSTER.refresh()
+    except Exception as e:
+        logger.error(f"⚠️ [ROSTER_MIRROR] Warm-up failed, will load on first lookup: {e}")
+    ASSETS.preload()
+
 @app.get("/")
 async def root():
     return {"status": "AGENCY ONLINE", "version": "2.0.0", "engine": "Regression-Proof Eye"}
@@ -107,109 +98,170 @@ async def root():
 # --- SECTION I: LOCAL DEVELOPMENT TOOLS (THE EYE) ---
 
 @app.get("/agent/dev/audit")
-async def run_local_audit():
-    """Runs the biological signature check on both repositories."""
-    return {"signature": generate_code_signature()}
+async def run_local_audit(include_dirs: bool = False):
+    """Runs the biological signature check on both repositories: Merkle roots, totals and changes since the last audit."""
+    report = await asyncio.to_thread(audit_repos, include_dirs)
+    return {"signature": generate_code_signature(report), **report}
+
+@app.get("/agent/dev/metrics")
+async def dev_metrics():
+    """Process-local cache and pool counters for the agency engine."""
+    return {"llm_pool": pool_stats(), "hound_cache": HOUND.snapshot(), "jobs": JOBS.snapshot(), "checkpointer": {**checkpointer.stats, "hot_threads": len(checkpointer._hot)}, "manifest_writes": WRITE_STATS, "single_flight": FLIGHT_STATS, "workspace_cache": WORKSPACE.snapshot(), "prompt_assets": ASSETS.snapshot(), "history": HISTORY.stats, "scribe": SCRIBE.stats, "speculative_pm": SPECULATION_STATS, "llm_cache": cache_stats()}
 
 @app.post("/agent/dev/read")
 async def local_read_file(req: dict):
-    """Reads a file from either the local backend or frontend repo."""
-    target_path = req.get("path")
-    # Determine which repo to look in
-    is_frontend = target_path.startswith("src/") or target_path.startswith("public/") or "Brain/" in target_path
-    base = Path(FRONTEND_ROOT) if is_frontend else Path(".")
-    
-    file_path = base / target_path
+    """Reads a file from either the local backend or frontend repo. Optional 1-based `start_line` / `end_line`."""
+    file_path = resolve_dev_path(req.get("path"))
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
-    
+    if req.get("start_line") is not None or req.get("end_line") is not None:
+        try:
+            lines = await asyncio.to_thread(read_lines, file_path, req.get("start_line"), req.get("end_line"))
+        except PatchError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        return {**lines, "path": str(file_path)}
     return {"content": file_path.read_text(), "path": str(file_path)}
 
+@app.get("/agent/dev/read/stream")
+async def local_stream_file(path: str):
+    """Streams a local file in chunks instead of buffering it into one JSON body."""
+    file_path = resolve_dev_path(path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
+    return StreamingResponse(iter_chunks(file_path), media_type="text/plain; charset=utf-8")
+
 @app.post("/agent/dev/write_patch")
 async def local_write_patch(req: dict):
     """
-    Applies a targeted Search-and-Replace patch to a local file.
-    This prevents full-file truncation and amnesia.
+    Applies targeted Search-and-Replace hunks to local files.
+    Batched: {"patches": [{"path", "hunks": [{"search", "replace", "line"?}]}], "dry_run"?}.
+    Legacy single hunk: {"path", "search", "replace"}. Each search block must match exactly once (or once near `line`).
     """
-    target_path = req.get("path")
-    search_block = req.get("search")
-    replace_block = req.get("replace")
-    
-    is_frontend = target_path.startswith("src/") or target_path.startswith("public/") or "Brain/" in target_path
-    base = Path(FRONTEND_ROOT) if is_frontend else Path(".")
-    file_path = base / target_path
-
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Target file for patch not found.")
-
-    content = file_path.read_text()
-    if search_block not in content:
-        raise HTTPException(status_code=422, detail="Search block not found in file. Patch failed.")
-
-    new_content = content.replace(search_block, replace_block)
-    file_path.write_text(new_content)
-    
-    return {"status": "success", "lines_changed": len(replace_block.splitlines())}
+    patches = req.get("patches") or [{"path": req.get("path"), "hunks": [{"search": req.get("search"), "replace": req.get("replace", ""), "line": req.get("line")}]}]
+    try:
+        results = await asyncio.to_thread(apply_patches, patches, bool(req.get("dry_run")))
+    except PatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"status": "success", "dry_run": bool(req.get("dry_run")), "files": results, "lines_changed": sum(r["lines_changed"] for r in results)}
+
+@app.post("/agent/dev/checkpoints/{thread_id}/compact")
+async def compact_checkpoints(thread_id: str, keep: Optional[int] = None):
+    """Prunes a thread's checkpoint history down to the newest `keep` (default CHECKPOINT_RETENTION)."""
+    pruned = await checkpointer.compact(thread_id, keep=keep) if keep is not None else await checkpointer.compact(thread_id)
+    return {"status": "success", "pruned": pruned}
+
+@app.post("/agent/dev/workspace/sync")
+async def sync_workspace(req: dict):
+    """Mirrors a thread's cloud workspace with a directory under WORKSPACE_SYNC_ROOT. `direction` is "up" (local -> GCS) or "down"."""
+    thread_id, local_dir, direction = req.get("thread_id"), req.get("local_dir"), req.get("direction", "down")
+    if not thread_id or not local_dir or direction not in ("up", "down"):
+        raise HTTPException(status_code=400, detail="thread_id, local_dir and direction (up|down) are required.")
+    local_dir = sync_dir(local_dir)
+    if local_dir is None:
+        raise HTTPException(status_code=400, detail="local_dir must be inside the workspace sync root.")
+    return await asyncio.to_thread(sync_up if direction == "up" else sync_down, thread_id, local_dir)
 
 # --- SECTION G: PROJECT MANAGEMENT ---
+# Sidebar fields only: the listing must never pull vibe_manifest
+PROJECT_LIST_FIELDS = ["project_name", "updated_at", "is_pinned"]
+PROJECT_PAGE_MAX = 200
+
+def _encode_cursor(doc_id: str) -> str:
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> str:
+    """Doc id behind a cursor. Anything that does not decode to a plain document id is a 400."""
+    try:
+        doc_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (ValueError, binascii.Error):  # UnicodeError is a ValueError
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not doc_id or "/" in doc_id: raise HTTPException(status_code=400, detail="Invalid cursor")
+    return doc_id
+
 @app.get("/agent/projects")
-async def list_projects():
-    docs = db.collection("cofounder_boards").order_by("is_pinned", direction=firestore.Query.DESCENDING).order_by("updated_at", direction=firestore.Query.DESCENDING).limit(50).stream()
-    return {"projects": [{"thread_id": d.id, "project_name": d.to_dict().get("project_name", "Untitled"), "updated_at": d.to_dict().get("updated_at").isoformat() if d.to_dict().get("updated_at") else None, "is_pinned": d.to_dict().get("is_pinned", False)} for d in docs]}
+async def list_projects(limit: int = 50, cursor: Optional[str] = None):
+    """Projected, cursor-paginated listing. Pass `next_cursor` back as `cursor` for the next page."""
+    limit = max(1, min(limit, PROJECT_PAGE_MAX))
+    boards = db.collection("cofounder_boards")
+    query = boards.select(PROJECT_LIST_FIELDS).order_by("is_pinned", direction=firestore.Query.DESCENDING).order_by("updated_at", direction=firestore.Query.DESCENDING)
+    if cursor:
+        # start_after needs the anchor's order-by values; fetch them with the same projection
+        anchor = await boards.document(_decode_cursor(cursor)).get(field_paths=PROJECT_LIST_FIELDS)
+        if not anchor.exists: raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.start_after(anchor)
+
+    docs = [d async for d in query.limit(limit + 1).stream()]
+    page = docs[:limit]
+    projects = []
+    for d in page:
+        data = d.to_dict()
+        updated_at = data.get("updated_at")
+        projects.append({"thread_id": d.id, "project_name": data.get("project_name", "Untitled"), "updated_at": updated_at.isoformat() if updated_at else None, "is_pinned": data.get("is_pinned", False)})
+    return {"projects": projects, "next_cursor": _encode_cursor(page[-1].id) if len(docs) > limit else None}
 
 @app.post("/agent/projects/init")
 async def init_project(req: dict):
-    db.collection("cofounder_boards").document(req.get("thread_id")).set({"project_name": req.get("project_name", "UNTITLED PROJECT"), "is_pinned": False, "updated_at": firestore.SERVER_TIMESTAMP, "vibe_manifest": None})
+    await db.collection("cofounder_boards").document(req.get("thread_id")).set({"project_name": req.get("project_name", "UNTITLED PROJECT"), "is_pinned": False, "updated_at": firestore.SERVER_TIMESTAMP, "vibe_manifest": None})
     return {"status": "success"}
 
 @app.get("/agent/projects/{thread_id}")
-async def get_project(thread_id: str):
-    doc = db.collection("cofounder_boards").document(thread_id).get()
-    return doc.to_dict() if doc.exists else {"error": "not found"}
+async def get_project(thread_id: str, include: str = "all"):
+    """`include` is a comma list. Default "all": board + every paper with its appendix (the original response shape).
+    Lighter opt-in views: "board" (board only), "papers" (no appendix), specific dept_ids, plus "appendix" to add it back."""
+    doc = await db.collection("cofounder_boards").document(thread_id).get()
+    if not doc.exists: return {"error": "not found"}
+    data = doc.to_dict()
+    wanted = {i.strip() for i in include.split(",") if i.strip()}
+    if "all" in wanted: wanted |= {"papers", "appendix"}
+    dept_ids = wanted & set(PAPER_KEYS)
+    if wanted & {"papers", "appendix"} or dept_ids:
+        papers = await load_papers(thread_id, dept_ids or None, include_appendix="appendix" in wanted)
+        data["vibe_manifest"] = {**(data.get("vibe_manifest") or {}), **papers}
+    return data
 
 @app.post("/agent/projects/save")
 async def save_project(req: dict):
-    db.collection("cofounder_boards").document(req.get("thread_id")).update({"vibe_manifest": req.get("manifest"), "updated_at": firestore.SERVER_TIMESTAMP})
+    await save_manifest(req.get("thread_id"), req.get("manifest"))
     return {"status": "success"}
 
 @app.post("/agent/thread/{thread_id}/rename")
 async def rename_thread(thread_id: str, req: dict):
-    db.collection("cofounder_boards").document(thread_id).update({"project_name": req.get("name")})
+    await db.collection("cofounder_boards").document(thread_id).update({"project_name": req.get("name")})
     return {"status": "success"}
 
 @app.delete("/agent/thread/{thread_id}")
 async def delete_thread(thread_id: str):
-    db.collection("cofounder_boards").document(thread_id).delete()
+    await db.collection("cofounder_boards").document(thread_id).delete()
     return {"status": "success"}
 
 @app.post("/agent/thread/{thread_id}/pin")
 async def toggle_pin(thread_id: str):
     doc_ref = db.collection("cofounder_boards").document(thread_id)
-    doc_snap = doc_ref.get()
+    doc_snap = await doc_ref.get()
     if doc_snap.exists:
         curr = doc_snap.to_dict().get("is_pinned", False)
-        doc_ref.update({"is_pinned": not curr})
+        await doc_ref.update({"is_pinned": not curr})
     return {"status": "success"}
 
 # --- SECTION H: THE LIQUID ROSTER & DEPARTMENT LENSES ---
 @app.get("/agent/roster")
 async def get_roster():
-    docs = db.collection("agency_roster").stream()
-    return {"roster": [d.to_dict() for d in docs]}
+    return {"roster": [d.to_dict() async for d in db.collection("agency_roster").stream()]}
 
 @app.post("/agent/roster/{agent_id}")
 async def update_agent(agent_id: str, req: dict):
-    db.collection("agency_roster").document(agent_id).set(req, merge=True)
+    await db.collection("agency_roster").document(agent_id).set(req, merge=True)
+    ROSTER.put_agent(agent_id, req)
     return {"status": "success"}
 
 @app.get("/agent/departments")
 async def get_departments():
-    docs = db.collection("department_registry").stream()
-    return {"departments": [d.to_dict() for d in docs]}
+    return {"departments": [d.to_dict() async for d in db.collection("department_registry").stream()]}
 
 @app.post("/agent/departments/{dept_id}")
 async def update_dept(dept_id: str, req: dict):
-    db.collection("department_registry").document(dept_id).set(req, merge=True)
+    await db.collection("department_registry").document(dept_id).set(req, merge=True)
+    ROSTER.put_dept(dept_id, req)
     return {"status": "success"}
 
 @app.get("/health")
@@ -0,0 +1,428 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [THREAD_KEY]: `thread_id` field holds thread_id (root namespace) or "thread_id|ns". Legacy docs and the
+#    existing (thread_id, checkpoint_id DESC) composite index keep working unchanged.
+# 2. [CHECKPOINT_ID]: LangGraph's own checkpoint["id"] (uuid6): monotonic, sortable, collision-free.
+# 3. [PARENT_LINK]: Each doc stores parent_checkpoint_id so history can be walked and replayed.
+# 4. [PENDING_WRITES]: put_writes lands in `{collection}_writes`, one doc per (checkpoint, task, idx).
+#    get_tuple returns them so an interrupted node resumes without re-invoking the model. Regular writes are
+#    insert-if-absent (a replayed task never clobbers what was stored first); only special channels
+#    (negative WRITES_IDX_MAP indices, e.g. errors/interrupts) overwrite.
+# 5. [DUAL_API]: Async paths use the shared AsyncClient; sync paths use the lazy blocking client.
+# 6. [DELTA_CHAIN]: A "delta" doc stores only the channels that changed since its parent
+#    (list channels that grew by appending store just the tail). A "snapshot" doc stores everything.
+#    A snapshot is forced every CHECKPOINT_SNAPSHOT_EVERY steps, or whenever this process has no base.
+# 7. [REBUILD]: Reads walk parent links back to the nearest snapshot and replay the deltas forward.
+# 8. [SERDE_TAG]: checkpoint / metadata / deltas are written as bytes by CompactSerializer; the doc's
+#    `serde` field names the format. Docs without it are legacy JSON strings and still load.
+# 9. [HEAD_POINTER]: `{collection}_heads/{thread_key}` names the latest checkpoint. It is written in the same
+#    batch as the checkpoint, so "latest" is two point reads instead of an indexed order_by query.
+# 10. [HOT_THREADS]: An in-process LRU holds the latest CheckpointTuple of recently active threads. aput
+#    writes through, aput_writes invalidates, entries expire after HOT_THREAD_TTL_SECONDS. Every hit is
+#    validated against the head doc (checkpoint_id + `writes` counter, bumped by put_writes), so a write from
+#    another instance is never masked; callers always get a copy.
+# 11. [RETENTION]: compact() keeps the newest CHECKPOINT_RETENTION docs per thread, re-materializes any
+#    kept delta whose chain would cross the cut, then deletes the rest (and their pending writes). It reads only
+#    ids to find the cut, the kept docs next to it in full, and ids of the collapsed range.
+# 12. [COMPACTOR]: aput only marks a thread due (on each new snapshot); an in-process compactor task drains the
+#    due set every CHECKPOINT_COMPACT_INTERVAL_SECONDS. POST /agent/dev/checkpoints/{id}/compact runs it on demand.
+
+# [BANNED PATTERNS]
+# - NO WALL-CLOCK IDS: Two writes in the same millisecond must never collide.
+# - NO SILENT NO-OPS: Every BaseCheckpointSaver method is implemented on both APIs.
+# - NO FULL-HISTORY REWRITES PER STEP: Only snapshots carry the whole message list.
+
+import os, time, asyncio, logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, AsyncIterator, Optional, Sequence, Tuple
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import firestore
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple, copy_checkpoint
+from app.db import get_sync_db
+from app.serde import TypedSerializer, CompactSerializer
+
+try:
+    from langgraph.checkpoint.base import WRITES_IDX_MAP
+except ImportError:  # older langgraph-checkpoint releases
+    WRITES_IDX_MAP = {}
+
+logger = logging.getLogger("uvicorn.error")
+CHECKPOINT_SNAPSHOT_EVERY = int(os.environ.get("CHECKPOINT_SNAPSHOT_EVERY", "20"))
+CHECKPOINT_RETENTION = int(os.environ.get("CHECKPOINT_RETENTION", "100"))
+CHECKPOINT_SERDE = os.environ.get("CHECKPOINT_SERDE", "compact")
+HOT_THREAD_CACHE_SIZE = int(os.environ.get("HOT_THREAD_CACHE_SIZE", "512"))
+HOT_THREAD_TTL_SECONDS = float(os.environ.get("HOT_THREAD_TTL_SECONDS", "900"))
+CHECKPOINT_COMPACT_INTERVAL_SECONDS = float(os.environ.get("CHECKPOINT_COMPACT_INTERVAL_SECONDS", "60"))
+_BASE_CACHE_SIZE = 256
+_BATCH_LIMIT = 400
+
+def _ids(config: Dict[str, Any]):
+    c = config["configurable"]
+    thread_id, ns = c["thread_id"], c.get("checkpoint_ns", "")
+    return thread_id, ns, (thread_id if not ns else f"{thread_id}|{ns}"), c.get("checkpoint_id")
+
+def _config(thread_id: str, ns: str, checkpoint_id: str):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}}
+
+def _diff_channels(prev: Dict[str, Any], new: Dict[str, Any], changed) -> Dict[str, list]:
+    """Per-channel ops turning `prev` into `new`: ["set", v], ["extend", tail] or ["del", None]."""
+    ops = {}
+    for ch in set(changed) | (set(prev) ^ set(new)):
+        if ch not in new:
+            if ch in prev: ops[ch] = ["del", None]
+            continue
+        old, val = prev.get(ch), new[ch]
+        if isinstance(old, list) and isinstance(val, list) and len(val) >= len(old) and val[:len(old)] == old:
+            if len(val) > len(old): ops[ch] = ["extend", val[len(old):]]
+        elif ch not in prev or old != val:
+            ops[ch] = ["set", val]
+    return ops
+
+def _head_stamp(head: Optional[Dict[str, Any]]):
+    return (head.get("checkpoint_id"), head.get("writes", 0)) if head else None
+
+def _copy_checkpoint(checkpoint):
+    # copy_checkpoint() is shallow per channel; list channels (messages) are appended to in place by callers
+    copied = copy_checkpoint(checkpoint)
+    copied["channel_values"] = {k: list(v) if isinstance(v, list) else v for k, v in copied["channel_values"].items()}
+    return copied
+
+def _copy_tuple(tup: CheckpointTuple) -> CheckpointTuple:
+    parent = {"configurable": dict(tup.parent_config["configurable"])} if tup.parent_config else None
+    return CheckpointTuple({"configurable": dict(tup.config["configurable"])}, _copy_checkpoint(tup.checkpoint), dict(tup.metadata), parent, list(tup.pending_writes or []))
+
+def _apply_ops(values: Dict[str, Any], ops: Dict[str, list]):
+    for ch, (op, payload) in ops.items():
+        if op == "del": values.pop(ch, None)
+        elif op == "extend": values[ch] = list(values.get(ch, [])) + list(payload)
+        else: values[ch] = payload
+
+class CustomFirestoreSaver(BaseCheckpointSaver):
+    def __init__(self, client: firestore.AsyncClient, collection: str = "checkpoints"):
+        super().__init__(serde=CompactSerializer() if CHECKPOINT_SERDE == "compact" else TypedSerializer())
+        self.client = client
+        self.collection = collection
+        self.writes_collection = f"{collection}_writes"
+        self.heads_collection = f"{collection}_heads"
+        # key -> (checkpoint_id, channel_values, steps since last snapshot). Base for the next delta.
+        self._bases = OrderedDict()
+        # key -> (expires_at, latest CheckpointTuple, head stamp it was current for)
+        self._hot = OrderedDict()
+        # (thread_id, checkpoint_ns) waiting for the compactor
+        self._compact_due = set()
+        self._compactor = None
+        self.stats = {"hot_hits": 0, "hot_misses": 0, "hot_stale": 0, "head_misses": 0, "compactions": 0}
+
+    # --- Hot-thread cache ---
+    def _hot_get(self, key: str, checkpoint_id: Optional[str], head: Optional[Dict[str, Any]]):
+        entry = self._hot.get(key)
+        if entry and entry[0] > time.monotonic() and entry[2] == _head_stamp(head) and (not checkpoint_id or entry[1].config["configurable"]["checkpoint_id"] == checkpoint_id):
+            self._hot.move_to_end(key)
+            self.stats["hot_hits"] += 1
+            return _copy_tuple(entry[1])
+        if entry and entry[2] != _head_stamp(head):
+            # Another instance moved the head (or added writes) since we cached it
+            self._hot.pop(key, None)
+            self.stats["hot_stale"] += 1
+        self.stats["hot_misses"] += 1
+        return None
+
+    def _hot_put(self, key: str, tup: CheckpointTuple, stamp):
+        self._hot[key] = (time.monotonic() + HOT_THREAD_TTL_SECONDS, tup, stamp)
+        self._hot.move_to_end(key)
+        while len(self._hot) > HOT_THREAD_CACHE_SIZE: self._hot.popitem(last=False)
+
+    def _fresh_tuple(self, doc, checkpoint, metadata):
+        parent = _config(doc["raw_thread_id"], doc["checkpoint_ns"], doc["parent_checkpoint_id"]) if doc["parent_checkpoint_id"] else None
+        return CheckpointTuple(_config(doc["raw_thread_id"], doc["checkpoint_ns"], doc["checkpoint_id"]), _copy_checkpoint(checkpoint), dict(metadata), parent, [])
+
+    # --- Document shaping (shared by both APIs) ---
+    def _doc_id(self, key: str, checkpoint_id: str):
+        return f"{key}_{checkpoint_id}"
+
+    def _dumps(self, obj):
+        type_, blob = self.serde.dumps_typed(obj)
+        return blob.decode("utf-8") if type_ == "json" else blob
+
+    def _loads(self, data: Dict[str, Any], field: str):
+        value = data[field]
+        return self.serde.loads_typed((data.get("serde", "json"), value.encode("utf-8") if isinstance(value, str) else value))
+
+    def _remember(self, key: str, checkpoint_id: str, values: Dict[str, Any], depth: int):
+        self._bases[key] = (checkpoint_id, {k: list(v) if isinstance(v, list) else v for k, v in values.items()}, depth)
+        self._bases.move_to_end(key)
+        while len(self._bases) > _BASE_CACHE_SIZE: self._bases.popitem(last=False)
+
+    def _checkpoint_doc(self, config, checkpoint, metadata, new_versions):
+        thread_id, ns, key, parent_id = _ids(config)
+        values = checkpoint.get("channel_values", {})
+        base = self._bases.get(key)
+        doc = {"thread_id": key, "raw_thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"], "parent_checkpoint_id": parent_id, "serde": self.serde.tag, "metadata": self._dumps(metadata), "created_at": firestore.SERVER_TIMESTAMP}
+
+        if base and parent_id and base[0] == parent_id and base[2] + 1 < CHECKPOINT_SNAPSHOT_EVERY:
+            ops = _diff_channels(base[1], values, (new_versions or {}).keys())
+            doc.update({"kind": "delta", "checkpoint": self._dumps({**checkpoint, "channel_values": {}}), "deltas": self._dumps(ops)})
+            depth = base[2] + 1
+        else:
+            doc.update({"kind": "snapshot", "checkpoint": self._dumps(checkpoint)})
+            depth = 0
+        self._remember(key, checkpoint["id"], values, depth)
+        return key, checkpoint["id"], doc
+
+    def _write_docs(self, config, writes, task_id, task_path):
+        _, _, key, checkpoint_id = _ids(config)
+        for idx, (channel, value) in enumerate(writes):
+            w_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, blob = self.serde.dumps_typed(value)
+            yield f"{key}_{checkpoint_id}_{task_id}_{w_idx}", w_idx < 0, {"thread_id": key, "checkpoint_id": checkpoint_id, "task_id": task_id, "task_path": task_path, "idx": w_idx, "channel": channel, "type": type_, "value": blob}
+
+    def _writes_batch(self, client, key: str, docs, skip=()):
+        batch = client.batch()
+        for doc_id, special, doc in docs:
+            ref = client.collection(self.writes_collection).document(doc_id)
+            if special: batch.set(ref, doc)
+            elif doc_id not in skip: batch.create(ref, doc)
+        batch.set(client.collection(self.heads_collection).document(key), {"writes": firestore.Increment(1)}, merge=True)
+        return batch
+
+    def _latest_query(self, client, key: str, before_id: Optional[str] = None, limit: Optional[int] = None, upto_id: Optional[str] = None):
+        q = client.collection(self.collection).where("thread_id", "==", key)
+        if before_id: q = q.where("checkpoint_id", "<", before_id)
+        if upto_id: q = q.where("checkpoint_id", "<=", upto_id)
+        q = q.order_by("checkpoint_id", direction=firestore.Query.DESCENDING)
+        return q.limit(limit) if limit else q
+
+    def _writes_query(self, client, key: str, checkpoint_id: str):
+        return client.collection(self.writes_collection).where("thread_id", "==", key).where("checkpoint_id", "==", checkpoint_id)
+
+    def _chain(self, data: Dict[str, Any], known: Dict[str, Dict[str, Any]]):
+        """Walks parent links to the nearest snapshot. Returns (chain oldest-first, None) or (None, missing_id)."""
+        chain, cur = [data], data
+        while cur.get("kind") == "delta":
+            parent_id = cur.get("parent_checkpoint_id")
+            if parent_id not in known: return None, parent_id
+            cur = known[parent_id]
+            chain.append(cur)
+        return chain[::-1], None
+
+    def _rebuild(self, chain):
+        checkpoint = self._loads(chain[-1], "checkpoint")
+        values = dict(self._loads(chain[0], "checkpoint").get("channel_values", {}))
+        for link in chain[1:]: _apply_ops(values, self._loads(link, "deltas"))
+        checkpoint["channel_values"] = values
+        return checkpoint
+
+    def _to_tuple(self, data: Dict[str, Any], checkpoint, writes):
+        thread_id = data.get("raw_thread_id", data["thread_id"])
+        ns = data.get("checkpoint_ns", "")
+        pending = [(w["task_id"], w["channel"], self.serde.loads_typed((w["type"], w["value"]))) for w in sorted(writes, key=lambda w: (w["task_id"], w["idx"]))]
+        parent = _config(thread_id, ns, data["parent_checkpoint_id"]) if data.get("parent_checkpoint_id") else None
+        return CheckpointTuple(_config(thread_id, ns, data["checkpoint_id"]), checkpoint, self._loads(data, "metadata"), parent, pending)
+
+    def _matches(self, tup: CheckpointTuple, filter: Optional[Dict[str, Any]]):
+        return not filter or all(tup.metadata.get(k) == v for k, v in filter.items())
+
+    # --- Async API ---
+    async def _amaterialize(self, key: str, data: Dict[str, Any], known: Optional[Dict[str, Dict[str, Any]]] = None):
+        known = known if known is not None else {}
+        while True:
+            chain, missing = self._chain(data, known)
+            if chain: return self._rebuild(chain), len(chain) - 1
+            window = {d.get("checkpoint_id"): d.to_dict() async for d in self._latest_query(self.client, key, limit=CHECKPOINT_SNAPSHOT_EVERY + 1, upto_id=missing).stream()}
+            if missing not in window: raise ValueError(f"Checkpoint chain broken for {key}: {missing} is missing")
+            known.update(window)
+
+    async def _ahead(self, key: str):
+        head = await self.client.collection(self.heads_collection).document(key).get()
+        return head.to_dict() if head.exists else None
+
+    async def _alatest(self, key: str, head: Optional[Dict[str, Any]]):
+        if head and head.get("checkpoint_id"):
+            doc = await self.client.collection(self.collection).document(self._doc_id(key, head["checkpoint_id"])).get()
+            if doc.exists: return doc.to_dict()
+        # Legacy thread (no head yet): one indexed query, then backfill the pointer
+        self.stats["head_misses"] += 1
+        docs = [d async for d in self._latest_query(self.client, key, limit=1).stream()]
+        if not docs: return None
+        data = docs[0].to_dict()
+        await self.client.collection(self.heads_collection).document(key).set({"checkpoint_id": data["checkpoint_id"], "updated_at": firestore.SERVER_TIMESTAMP})
+        return data
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        _, _, key, checkpoint_id = _ids(config)
+        head = await self._ahead(key)
+        hot = self._hot_get(key, checkpoint_id, head)
+        if hot: return hot
+        if checkpoint_id:
+            doc = await self.client.collection(self.collection).document(self._doc_id(key, checkpoint_id)).get()
+            data = doc.to_dict() if doc.exists else None
+        else:
+            data = await self._alatest(key, head)
+        if not data: return None
+        checkpoint, depth = await self._amaterialize(key, data)
+        writes = [w.to_dict() async for w in self._writes_query(self.client, key, data["checkpoint_id"]).stream()]
+        tup = self._to_tuple(data, checkpoint, writes)
+        if not checkpoint_id:
+            self._remember(key, data["checkpoint_id"], checkpoint.get("channel_values", {}), depth)
+            self._hot_put(key, _copy_tuple(tup), _head_stamp(head) if head and head.get("checkpoint_id") == data["checkpoint_id"] else (data["checkpoint_id"], 0))
+        return tup
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[CheckpointTuple]:
+        _, _, key, _ = _ids(config)
+        before_id = before["configurable"].get("checkpoint_id") if before else None
+        yielded, known = 0, {}
+        docs = [d.to_dict() async for d in self._latest_query(self.client, key, before_id, None if filter else limit).stream()]
+        known.update({d["checkpoint_id"]: d for d in docs})
+        for data in docs:
+            checkpoint, _ = await self._amaterialize(key, data, known)
+            writes = [w.to_dict() async for w in self._writes_query(self.client, key, data["checkpoint_id"]).stream()]
+            tup = self._to_tuple(data, checkpoint, writes)
+            if not self._matches(tup, filter): continue
+            yield tup
+            yielded += 1
+            if limit and yielded >= limit: return
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        key, checkpoint_id, doc = self._checkpoint_doc(config, checkpoint, metadata, new_versions)
+        batch = self.client.batch()
+        batch.set(self.client.collection(self.collection).document(self._doc_id(key, checkpoint_id)), doc)
+        batch.set(self.client.collection(self.heads_collection).document(key), {"checkpoint_id": checkpoint_id, "updated_at": firestore.SERVER_TIMESTAMP})
+        await batch.commit()
+        self._hot_put(key, self._fresh_tuple(doc, checkpoint, metadata), (checkpoint_id, 0))
+        if doc["kind"] == "snapshot" and doc["parent_checkpoint_id"] and CHECKPOINT_RETENTION > 0:
+            self._schedule_compaction(doc["raw_thread_id"], doc["checkpoint_ns"])
+        return _config(doc["raw_thread_id"], doc["checkpoint_ns"], checkpoint_id)
+
+    async def aput_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        key = _ids(config)[2]
+        self._hot.pop(key, None)
+        docs = list(self._write_docs(config, writes, task_id, task_path))
+        try:
+            await self._writes_batch(self.client, key, docs).commit()
+        except AlreadyExists:
+            # The batch is atomic, so nothing landed: retry without the regular writes already stored
+            snaps = await asyncio.gather(*(self.client.collection(self.writes_collection).document(doc_id).get() for doc_id, special, _ in docs if not special))
+            await self._writes_batch(self.client, key, docs, {s.id for s in snaps if s.exists}).commit()
+
+    async def compact(self, thread_id: str, checkpoint_ns: str = "", keep: int = CHECKPOINT_RETENTION) -> int:
+        """Prunes checkpoints beyond the newest `keep` for one thread. Returns the number deleted."""
+        key = _ids(_config(thread_id, checkpoint_ns, None))[2]
+        if keep <= 0: return 0
+        ids = [d.get("checkpoint_id") async for d in self._latest_query(self.client, key, limit=keep + 1).select(["checkpoint_id"]).stream()]
+        if len(ids) <= keep: return 0
+        # Chains hold fewer than CHECKPOINT_SNAPSHOT_EVERY links, so only that many kept docs can reach past the cut
+        n = min(keep, CHECKPOINT_SNAPSHOT_EVERY)
+        boundary = [d.to_dict() async for d in self._latest_query(self.client, key, limit=n, upto_id=ids[keep - n]).stream()]
+        known = {d["checkpoint_id"]: d for d in boundary}
+
+        # [RETENTION]: Oldest-first, so a re-materialized snapshot shortens the chains of newer deltas
+        for data in reversed(boundary):
+            chain, _ = self._chain(data, known)
+            if data.get("kind") != "delta" or chain: continue
+            checkpoint, _ = await self._amaterialize(key, data, known)
+            data.update({"kind": "snapshot", "checkpoint": self._dumps(checkpoint), "metadata": self._dumps(self._loads(data, "metadata")), "serde": self.serde.tag})
+            data.pop("deltas", None)
+            await self.client.collection(self.collection).document(self._doc_id(key, data["checkpoint_id"])).set(data)
+
+        doomed = [d.get("checkpoint_id") async for d in self._latest_query(self.client, key, upto_id=ids[keep]).select(["checkpoint_id"]).stream()]
+        refs = [self.client.collection(self.collection).document(self._doc_id(key, cid)) for cid in doomed]
+        for cid in doomed:
+            refs.extend([w.reference async for w in self._writes_query(self.client, key, cid).stream()])
+        for i in range(0, len(refs), _BATCH_LIMIT):
+            batch = self.client.batch()
+            for ref in refs[i:i + _BATCH_LIMIT]: batch.delete(ref)
+            await batch.commit()
+        logger.warning(f"[CHECKPOINTS] Compacted {key}: kept {keep}, pruned {len(doomed)}.")
+        return len(doomed)
+
+    def _schedule_compaction(self, thread_id: str, checkpoint_ns: str):
+        self._compact_due.add((thread_id, checkpoint_ns))
+        if self._compactor is None or self._compactor.done():
+            self._compactor = asyncio.get_running_loop().create_task(self._compact_loop())
+
+    async def _compact_loop(self):
+        while self._compact_due:
+            await asyncio.sleep(CHECKPOINT_COMPACT_INTERVAL_SECONDS)
+            while self._compact_due:
+                thread_id, ns = self._compact_due.pop()
+                try:
+                    await self.compact(thread_id, ns)
+                    self.stats["compactions"] += 1
+                except Exception as e:
+                    logger.error(f"⚠️ [CHECKPOINTS] Compaction of {thread_id} failed: {e}")
+
+    # --- Sync API (blocking client; for scripts and sync graph runs) ---
+    def _materialize(self, client, key: str, data: Dict[str, Any], known: Optional[Dict[str, Dict[str, Any]]] = None):
+        known = known if known is not None else {}
+        while True:
+            chain, missing = self._chain(data, known)
+            if chain: return self._rebuild(chain), len(chain) - 1
+            window = {d.get("checkpoint_id"): d.to_dict() for d in self._latest_query(client, key, limit=CHECKPOINT_SNAPSHOT_EVERY + 1, upto_id=missing).stream()}
+            if missing not in window: raise ValueError(f"Checkpoint chain broken for {key}: {missing} is missing")
+            known.update(window)
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        client = get_sync_db()
+        _, _, key, checkpoint_id = _ids(config)
+        head_snap = client.collection(self.heads_collection).document(key).get()
+        head = head_snap.to_dict() if head_snap.exists else None
+        hot = self._hot_get(key, checkpoint_id, head)
+        if hot: return hot
+        if checkpoint_id:
+            doc = client.collection(self.collection).document(self._doc_id(key, checkpoint_id)).get()
+            data = doc.to_dict() if doc.exists else None
+        else:
+            data = self._latest(client, key, head)
+        if not data: return None
+        checkpoint, depth = self._materialize(client, key, data)
+        tup = self._to_tuple(data, checkpoint, [w.to_dict() for w in self._writes_query(client, key, data["checkpoint_id"]).stream()])
+        if not checkpoint_id:
+            self._remember(key, data["checkpoint_id"], checkpoint.get("channel_values", {}), depth)
+            self._hot_put(key, _copy_tuple(tup), _head_stamp(head) if head and head.get("checkpoint_id") == data["checkpoint_id"] else (data["checkpoint_id"], 0))
+        return tup
+
+    def _latest(self, client, key: str, head: Optional[Dict[str, Any]]):
+        if head and head.get("checkpoint_id"):
+            doc = client.collection(self.collection).document(self._doc_id(key, head["checkpoint_id"])).get()
+            if doc.exists: return doc.to_dict()
+        self.stats["head_misses"] += 1
+        docs = list(self._latest_query(client, key, limit=1).stream())
+        if not docs: return None
+        data = docs[0].to_dict()
+        client.collection(self.heads_collection).document(key).set({"checkpoint_id": data["checkpoint_id"], "updated_at": firestore.SERVER_TIMESTAMP})
+        return data
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[CheckpointTuple]:
+        client = get_sync_db()
+        _, _, key, _ = _ids(config)
+        before_id = before["configurable"].get("checkpoint_id") if before else None
+        yielded = 0
+        docs = [d.to_dict() for d in self._latest_query(client, key, before_id, None if filter else limit).stream()]
+        known = {d["checkpoint_id"]: d for d in docs}
+        for data in docs:
+            checkpoint, _ = self._materialize(client, key, data, known)
+            tup = self._to_tuple(data, checkpoint, [w.to_dict() for w in self._writes_query(client, key, data["checkpoint_id"]).stream()])
+            if not self._matches(tup, filter): continue
+            yield tup
+            yielded += 1
+            if limit and yielded >= limit: return
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        key, checkpoint_id, doc = self._checkpoint_doc(config, checkpoint, metadata, new_versions)
+        client = get_sync_db()
+        batch = client.batch()
+        batch.set(client.collection(self.collection).document(self._doc_id(key, checkpoint_id)), doc)
+        batch.set(client.collection(self.heads_collection).document(key), {"checkpoint_id": checkpoint_id, "updated_at": firestore.SERVER_TIMESTAMP})
+        batch.commit()
+        self._hot_put(key, self._fresh_tuple(doc, checkpoint, metadata), (checkpoint_id, 0))
+        return _config(doc["raw_thread_id"], doc["checkpoint_ns"], checkpoint_id)
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        key = _ids(config)[2]
+        self._hot.pop(key, None)
+        client = get_sync_db()
+        docs = list(self._write_docs(config, writes, task_id, task_path))
+        try:
+            self._writes_batch(client, key, docs).commit()
+        except AlreadyExists:
+            snaps = [client.collection(self.writes_collection).document(doc_id).get() for doc_id, special, _ in docs if not special]
+            self._writes_batch(client, key, docs, {s.id for s in snaps if s.exists}).commit()
@@ -0,0 +1,25 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [ASYNC_CLIENT]: One firestore.AsyncClient per process. Every handler, tool and factory lookup shares it.
+# 2. [SYNC_ESCAPE_HATCH]: Blocking client is lazy and reserved for boot-time / script paths outside the event loop.
+# 3. [STORAGE]: One storage.Client per process for the GCS workspace.
+
+# [BANNED PATTERNS]
+# - NO MODULE-LEVEL firestore.Client() ANYWHERE ELSE: Import `db` from here.
+# - NO SYNC READS INSIDE `async def`: Always `await` the AsyncClient.
+
+import os
+from google.cloud import firestore, storage
+
+PROJECT_ID = os.environ.get("GCP_PROJECT", "vibe-agent-final")
+
+db = firestore.AsyncClient(project=PROJECT_ID)
+storage_client = storage.Client(project=PROJECT_ID)
+
+_sync_db = None
+
+def get_sync_db() -> firestore.Client:
+    """Blocking client for code that runs before the event loop (registry boot-sync, scripts)."""
+    global _sync_db
+    if _sync_db is None:
+        _sync_db = firestore.Client(project=PROJECT_ID)
+    return _sync_db
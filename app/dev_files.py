@@ -0,0 +1,121 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [ONE_READ_ONE_WRITE]: Every hunk for a file is located against ONE read; the file is written ONCE.
+# 2. [UNIQUE_HUNKS]: A search block must match exactly once, or have ONE closest match to its `line` anchor
+#    within PATCH_ANCHOR_SLACK lines.
+# 3. [NO_OVERLAP]: Hunks are resolved against the original text, must not overlap, and are spliced back-to-front.
+# 4. [ATOMIC_FILES]: Each file is replaced via temp + fsync + os.replace. A failed batch restores files already swapped.
+# 5. [RANGED_READS]: Line ranges stream through the file; nothing outside the range is held in memory.
+
+# [BANNED PATTERNS]
+# - NO str.replace(): It rewrites every occurrence.
+# - NO PARTIAL BATCHES: Any hunk that fails validation fails the whole request before a byte is written.
+
+import os, tempfile, itertools
+from pathlib import Path
+
+FRONTEND_ROOT = os.environ.get("FRONTEND_PATH", "../vibe-design-lab")
+PATCH_ANCHOR_SLACK = int(os.environ.get("PATCH_ANCHOR_SLACK", "20"))
+STREAM_CHUNK_BYTES = 64 * 1024
+
+class PatchError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code, self.detail = status_code, detail
+
+def resolve_dev_path(target_path: str) -> Path:
+    """Frontend paths (src/, public/, Brain/) live under FRONTEND_ROOT; everything else is the backend repo."""
+    is_frontend = target_path.startswith("src/") or target_path.startswith("public/") or "Brain/" in target_path
+    base = Path(FRONTEND_ROOT) if is_frontend else Path(".")
+    return base / target_path
+
+# --- Reads ---
+def _line_number(value, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit() or int(value) < 1:
+        raise PatchError(400, f"{name} must be a whole number >= 1, got {value!r}.")
+    return int(value)
+
+def read_lines(file_path: Path, start_line: int = 1, end_line: int = None) -> dict:
+    """1-based, inclusive line range. Lines past `end_line` are never read. A malformed range raises PatchError(400)."""
+    start = 1 if start_line is None else _line_number(start_line, "start_line")
+    end = None if end_line is None else _line_number(end_line, "end_line")
+    if end is not None and end < start: raise PatchError(400, f"end_line {end} is before start_line {start}.")
+    with open(file_path, encoding="utf-8") as f:
+        lines = list(itertools.islice(f, start - 1, end))
+    return {"content": "".join(lines), "start_line": start, "end_line": start + len(lines) - 1}
+
+def iter_chunks(file_path: Path):
+    with open(file_path, "rb") as f:
+        while chunk := f.read(STREAM_CHUNK_BYTES):
+            yield chunk
+
+# --- Patches ---
+def _line_of(content: str, offset: int) -> int:
+    return content.count("\n", 0, offset) + 1
+
+def locate_hunk(content: str, hunk: dict, label: str):
+    """Returns (start, end) of the hunk's search block in `content`."""
+    search = hunk.get("search")
+    if not search: raise PatchError(422, f"{label}: empty search block.")
+    hits, i = [], content.find(search)
+    while i != -1:
+        hits.append(i)
+        i = content.find(search, i + 1)
+    if not hits: raise PatchError(422, f"{label}: search block not found.")
+
+    anchor = hunk.get("line")
+    if anchor is not None:
+        near = sorted((abs(_line_of(content, h) - anchor), h) for h in hits)
+        near = [(d, h) for d, h in near if d <= PATCH_ANCHOR_SLACK]
+        if not near or (len(near) > 1 and near[0][0] == near[1][0]):
+            raise PatchError(422, f"{label}: no single closest match within {PATCH_ANCHOR_SLACK} lines of line {anchor} ({len(hits)} in file).")
+        hits = [near[0][1]]
+    elif len(hits) > 1:
+        lines = [_line_of(content, h) for h in hits]
+        raise PatchError(422, f"{label}: search block matches {len(hits)} times (lines {lines}). Add context or a `line` anchor.")
+    return hits[0], hits[0] + len(search)
+
+def patch_text(content: str, hunks: list, path: str) -> str:
+    spans = sorted((locate_hunk(content, h, f"{path} hunk {n}") + (h.get("replace") or "", n) for n, h in enumerate(hunks)))
+    for (s1, e1, _, n1), (s2, _, _, n2) in zip(spans, spans[1:]):
+        if s2 < e1: raise PatchError(422, f"{path}: hunks {n1} and {n2} overlap.")
+    for start, end, replace, _ in reversed(spans):
+        content = content[:start] + replace + content[end:]
+    return content
+
+def _atomic_write(file_path: Path, content: str):
+    # mkstemp: unique per call, so concurrent patches of one file (even in one process) never share a temp file
+    fd, tmp = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    tmp = Path(tmp)
+    try:
+        with open(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+            f.flush(); os.fsync(f.fileno())
+        os.chmod(tmp, file_path.stat().st_mode if file_path.exists() else 0o644)  # mkstemp creates 0600
+        os.replace(tmp, file_path)
+    finally:
+        if tmp.exists(): tmp.unlink()
+
+def apply_patches(patches: list, dry_run: bool = False) -> list:
+    """patches: [{"path", "hunks": [{"search", "replace", "line"?}]}]. All-or-nothing across files."""
+    staged = {}
+    for p in patches:
+        path = p.get("path")
+        if not path or not p.get("hunks"): raise PatchError(400, "Each patch needs a path and at least one hunk.")
+        if path in staged: raise PatchError(400, f"{path}: listed twice; put all of its hunks in one patch.")
+        file_path = resolve_dev_path(path)
+        if not file_path.exists(): raise PatchError(404, f"Target file for patch not found: {path}")
+        with open(file_path, encoding="utf-8", newline="") as f: original = f.read()
+        staged[path] = (file_path, original, patch_text(original, p["hunks"], path), p["hunks"])
+
+    results = [{"path": path, "hunks": len(hunks), "lines_changed": sum(len((h.get("replace") or "").splitlines()) for h in hunks), "lines_after": patched.count("\n") + 1} for path, (_, _, patched, hunks) in staged.items()]
+    if dry_run: return results
+
+    written = []
+    try:
+        for file_path, original, patched, _ in staged.values():
+            _atomic_write(file_path, patched)
+            written.append((file_path, original))
+    except OSError as e:
+        for file_path, original in reversed(written): _atomic_write(file_path, original)
+        raise PatchError(500, f"Patch write failed, {len(written)} file(s) restored: {e}")
+    return results
@@ -1,5 +1,4 @@
-import os
-from google.cloud import firestore
+from app.db import get_sync_db
 
 class REGISTRY:
     _data = {}
@@ -7,8 +6,8 @@ class REGISTRY:
     @classmethod
     def sync(cls):
         try:
-            db = firestore.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
-            doc = db.collection("_system_config").document("naming_registry").get()
+            # Boot-time read runs before the event loop, so it takes the blocking escape hatch
+            doc = get_sync_db().collection("_system_config").document("naming_registry").get()
             if not doc.exists: raise ValueError("Lion’s Mouth is Silent (Doc missing)")
             cls._data = doc.to_dict()
             # Dynamic Attribute Assignment
@@ -0,0 +1,62 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [TYPE_TAG]: dumps_typed returns "<codec>+<compression>" (e.g. "msgpack+zstd"). loads_typed dispatches on it.
+# 2. [LEGACY_JSON]: The bare "json" tag is the original TypedSerializer format and always stays readable.
+# 3. [OPTIONAL_CODECS]: msgpack and zstandard are optional. Without them we fall back to JSON / zlib.
+
+# [BANNED PATTERNS]
+# - NO UNTAGGED BLOBS: A payload without its tag can never be decoded safely after a codec change.
+
+import json, zlib
+from typing import Any, Tuple
+from langchain_core.load import dumpd, load
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+class TypedSerializer:
+    tag = "json"
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return "json", json.dumps(dumpd(obj)).encode("utf-8")
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        if type_ == "json": return load(json.loads(blob.decode("utf-8")))
+        codec, compression = type_.split("+")
+        return load(_decode(codec, _decompress(compression, blob)))
+
+class CompactSerializer(TypedSerializer):
+    """Binary checkpoint encoding: msgpack body (JSON fallback), zstd compression (zlib fallback)."""
+    def __init__(self, codec: str = None, compression: str = None):
+        self.codec = codec or ("msgpack" if msgpack else "json")
+        self.compression = compression or ("zstd" if zstandard else "zlib")
+        self.tag = f"{self.codec}+{self.compression}"
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.tag, _compress(self.compression, _encode(self.codec, dumpd(obj)))
+
+def _encode(codec: str, obj) -> bytes:
+    if codec == "msgpack": return msgpack.packb(obj, use_bin_type=True)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def _decode(codec: str, raw: bytes):
+    if codec == "msgpack": return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw.decode("utf-8"))
+
+def _compress(compression: str, raw: bytes) -> bytes:
+    # Compressor objects are not safe to share across threads; they are cheap to build per call
+    if compression == "zstd": return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+def _decompress(compression: str, blob: bytes) -> bytes:
+    if compression == "zstd": return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
@@ -1,10 +1,98 @@
+import json, copy, logging
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 from app.naming_registry import REGISTRY
 
-def safe_state_merge(project_id, scribe_output, db):
+logger = logging.getLogger("uvicorn.error")
+WRITE_STATS = {"writes": 0, "skipped": 0, "fields": 0, "bytes": 0, "full_bytes": 0, "conflicts": 0}
+_VERSION_BUMP = firestore.Increment(1)
+
+async def safe_state_merge(project_id, scribe_output, db):
     # Reject any attempt to touch ZONE A
     if REGISTRY.ENVELOPE in scribe_output or REGISTRY.MANIFESTO in scribe_output:
         raise ValueError("SCRIBE VETO: Attempted to overwrite Immutable Envelope.")
 
     # Firestore Path Merge
     update_payload = {f"{REGISTRY.STATE}.{k}": v for k, v in scribe_output.items()}
-    db.collection("cofounder_boards").document(project_id).update(update_payload)
+    await db.collection("cofounder_boards").document(project_id).update(update_payload)
+
+def field_path_diff(before, after, prefix=()):
+    """Dotted-path update payload turning `before` into `after`. Maps recurse; anything else is replaced whole."""
+    payload = {}
+    for k in set(before) | set(after):
+        path = prefix + (k,)
+        if k not in after:
+            payload[FieldPath(*path).to_api_repr()] = firestore.DELETE_FIELD
+        elif isinstance(after[k], dict) and isinstance(before.get(k), dict):
+            payload.update(field_path_diff(before[k], after[k], path))
+        elif k not in before or before[k] != after[k]:
+            payload[FieldPath(*path).to_api_repr()] = after[k]
+    return payload
+
+def _size(obj):
+    return len(json.dumps(obj, default=str).encode("utf-8"))
+
+def rebase_manifesto(baseline: dict, ours: dict, remote: dict):
+    """Replays our changes (baseline -> ours) on top of a concurrently written remote manifesto.
+    Lists both sides grew are unioned; for any other field changed on both sides, ours wins."""
+    merged, conflicts = dict(remote), []
+    for k in set(baseline) | set(ours):
+        if baseline.get(k) == ours.get(k) and (k in baseline) == (k in ours): continue
+        remote_changed = remote.get(k) != baseline.get(k)
+        if k not in ours:
+            merged.pop(k, None)
+        elif remote_changed and isinstance(ours[k], list) and isinstance(remote.get(k), list):
+            merged[k] = remote[k] + [x for x in ours[k] if x not in remote[k]]
+        else:
+            merged[k] = ours[k]
+        if remote_changed: conflicts.append(k)
+    return merged, conflicts
+
+class ManifestWriter:
+    """Per-request manifesto persistence. Diffs against the state loaded at ingest and writes only changed field
+    paths, inside a transaction guarded by the board's `manifest_version`."""
+    def __init__(self, db, project_id, ingested: dict, version: int = 0):
+        self.db, self.project_id = db, project_id
+        self.baseline = copy.deepcopy(ingested or {})
+        self.version = version or 0
+        self.metrics = {"writes": 0, "fields": 0, "bytes": 0, "full_bytes": 0, "conflicts": 0}
+
+    async def commit(self, manifesto: dict) -> dict:
+        """Persists `manifesto` and returns what is now stored (ours, rebased on any concurrent write)."""
+        full = _size({"vibe_manifest": {REGISTRY.MANIFESTO: manifesto}})
+        self.metrics["full_bytes"] += full
+        WRITE_STATS["full_bytes"] += full
+        if not field_path_diff(self.baseline, manifesto):
+            WRITE_STATS["skipped"] += 1
+            return manifesto
+
+        ref = self.db.collection("cofounder_boards").document(self.project_id)
+        stored, payload, rebase = await firestore.async_transactional(self._commit_txn)(self.db.transaction(), ref, manifesto)
+        # Counted once per commit, not once per transaction attempt
+        if rebase:
+            self.metrics["conflicts"] += 1; WRITE_STATS["conflicts"] += 1
+            logger.warning(f"[MANIFEST_WRITE] {self.project_id}: v{rebase[0]} -> v{rebase[1]} moved underneath us; rebased. Overlaps: {rebase[2]}")
+        sent = _size({k: v for k, v in payload.items() if v is not firestore.DELETE_FIELD and v is not _VERSION_BUMP})
+        self.baseline = copy.deepcopy(stored)
+        for stats in (self.metrics, WRITE_STATS):
+            stats["writes"] += 1; stats["fields"] += len(payload); stats["bytes"] += sent
+        return stored
+
+    async def _commit_txn(self, transaction, ref, manifesto):
+        # [OPTIMISTIC_VERSION]: The transaction re-runs if the board changes under us; the version tells us
+        # whether someone else committed since STATE_INGEST, in which case we rebase instead of overwriting.
+        snap = await ref.get(field_paths=[f"vibe_manifest.{REGISTRY.MANIFESTO}", "manifest_version"], transaction=transaction)
+        data = snap.to_dict() if snap.exists else {}
+        remote_version = data.get("manifest_version", 0) or 0
+        remote = (data.get("vibe_manifest") or {}).get(REGISTRY.MANIFESTO) or {}
+        stored, rebase = manifesto, None
+        if remote_version != self.version:
+            stored, conflicts = rebase_manifesto(self.baseline, manifesto, remote)
+            rebase = (self.version, remote_version, conflicts)
+
+        payload = field_path_diff(remote, stored, ("vibe_manifest", REGISTRY.MANIFESTO))
+        payload["manifest_version"] = _VERSION_BUMP
+        if snap.exists: transaction.update(ref, payload)
+        else: transaction.set(ref, {"vibe_manifest": {REGISTRY.MANIFESTO: stored}, "manifest_version": _VERSION_BUMP}, merge=True)
+        self.version = remote_version + 1
+        return stored, payload, rebase
@@ -1,44 +1,56 @@
-import os
-from typing import List, Optional
+import os, json
+from datetime import datetime
+from typing import List, Optional, Dict
 from langchain_core.tools import tool
 from google.cloud import firestore
-from google.cloud import storage
-
-# Initialize DB
-db = firestore.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
-
-# Initialize Storage
-storage_client = storage.Client(project=os.environ.get("GCP_PROJECT", "vibe-agent-final"))
-BUCKET_NAME = "vibe-agent-user-projects"
+from app.db import db
+from app.workspace import WORKSPACE, BUCKET_NAME, clean_path, get_bucket, get_index, record_writes, read_many, write_many
 
 # --- ISOLATION CONFIGURATION ---
 BOARD_COLLECTION = "cofounder_boards" 
 
-def get_bucket():
-    return storage_client.bucket(BUCKET_NAME)
-
 @tool
 def list_files(thread_id: str, path: str = ".") -> str:
     """List files in the cloud workspace."""
     try:
-        bucket = get_bucket()
-        prefix = f"{thread_id}/{path}/".replace("//", "/")
-        if path == ".": prefix = f"{thread_id}/"
-        blobs = bucket.list_blobs(prefix=prefix)
-        file_names = [blob.name.replace(f"{thread_id}/", "") for blob in blobs]
+        # [INDEX]: Answered from the workspace index object; the bucket is never enumerated
+        folder = clean_path(path) if path not in ("", ".") else ""
+        if folder is None: return f"Rejected unsafe path: {path}"
+        prefix = f"{folder}/" if folder else ""
+        file_names = [p for p, _ in get_index(thread_id).query(prefix)]
         if not file_names: return "No files found."
-        return "\n".join(sorted(file_names))
+        return "\n".join(file_names)
     except Exception as e:
         return f"Error listing files: {e}"
 
+@tool
+def find_files(thread_id: str, pattern: str = "*", changed_since: Optional[str] = None, min_size: Optional[int] = None, max_size: Optional[int] = None) -> str:
+    """
+    Search the cloud workspace index.
+    Args:
+        thread_id: The ID of the current conversation.
+        pattern: Glob over workspace paths; "*" also crosses "/" (e.g. "src/*.tsx", "*.md").
+        changed_since: ISO-8601 timestamp; only files updated after it.
+        min_size / max_size: Size bounds in bytes.
+    """
+    try:
+        since = datetime.fromisoformat(changed_since).timestamp() if changed_since else None
+        hits = get_index(thread_id).query(pattern=pattern, changed_since=since, min_size=min_size, max_size=max_size)
+        lines = [f"{p} | {e['size']}B | {datetime.fromtimestamp(e['updated']).isoformat()}" for p, e in hits]
+        return "\n".join(lines) if lines else "No files found."
+    except Exception as e:
+        return f"Error searching files: {e}"
+
 @tool
 def read_file(thread_id: str, path: str) -> str:
     """Read a file from cloud workspace."""
     try:
-        bucket = get_bucket()
-        blob = bucket.blob(f"{thread_id}/{path}")
-        if not blob.exists(): return "File not found."
-        return blob.download_as_text()
+        # [READ_THROUGH]: One conditional GET; a 304 serves the locally cached generation
+        clean = clean_path(path)
+        if clean is None: return f"Rejected unsafe path: {path}"
+        data = WORKSPACE.read(thread_id, clean)
+        if data is None: return "File not found."
+        return data.decode("utf-8")
     except Exception as e:
         return f"Error reading file: {e}"
 
@@ -47,15 +59,33 @@ def write_file(thread_id: str, path: str, content: str) -> str:
     """Write a file to cloud workspace."""
     try:
         print(f"DEBUG: Writing file {path} for {thread_id}")
-        bucket = get_bucket()
-        blob = bucket.blob(f"{thread_id}/{path}")
-        blob.upload_from_string(content, content_type="text/plain")
-        return f"Successfully wrote to {path}"
+        clean = clean_path(path)
+        if clean is None: return f"Rejected unsafe path: {path}"
+        record_writes(thread_id, [WORKSPACE.write(thread_id, clean, content.encode("utf-8"))])
+        return f"Successfully wrote to {clean}"
     except Exception as e:
         return f"Error writing file: {e}"
 
 @tool
-def update_board(thread_id: str, vision: str = "", tasks: str = "", status: str = "active") -> str:
+def read_files(thread_id: str, paths: List[str]) -> str:
+    """Read several files from cloud workspace in one call. Returns a JSON object of path -> content (null if missing)."""
+    try:
+        return json.dumps({p: (d.decode("utf-8") if d is not None else None) for p, d in read_many(thread_id, paths).items()})
+    except Exception as e:
+        return f"Error reading files: {e}"
+
+@tool
+def write_files(thread_id: str, files: Dict[str, str]) -> str:
+    """Write several files (path -> content) to cloud workspace in one call."""
+    try:
+        written = write_many(thread_id, {p: c.encode("utf-8") for p, c in files.items()})
+        rejected = sorted(set(files) - set(written))
+        return f"Successfully wrote {len(written)} files: {', '.join(sorted(written))}" + (f"; rejected unsafe paths: {', '.join(rejected)}" if rejected else "")
+    except Exception as e:
+        return f"Error writing files: {e}"
+
+@tool
+async def update_board(thread_id: str, vision: str = "", tasks: str = "", status: str = "active") -> str:
     """
     Updates the Knowledge Base (Board) for the user.
     Args:
@@ -83,7 +113,7 @@ def update_board(thread_id: str, vision: str = "", tasks: str = "", status: str
         if vision: data["vision"] = vision
         if formatted_tasks: data["tasks"] = formatted_tasks
             
-        doc_ref.set(data, merge=True)
+        await doc_ref.set(data, merge=True)
         print("✅ DEBUG: Board Updated Successfully")
         return f"Successfully updated Knowledge Base for {thread_id}."
     except Exception as e:
@@ -0,0 +1,425 @@
+# [FUNCTIONAL LEDGER - DO NOT REMOVE]
+# 1. [GENERATION_KEYED]: Every cached blob carries the GCS generation it was read at.
+# 2. [CONDITIONAL_GET]: A read is ONE request: download with if_generation_not_match=<cached>. 304 == serve the cache.
+# 3. [TWO_TIERS]: In-memory LRU (WORKSPACE_CACHE_MEMORY_BYTES) over an on-disk tier (WORKSPACE_CACHE_DISK_BYTES).
+# 4. [WRITE_THROUGH]: write() uploads, then caches the bytes under the generation GCS assigned.
+# 5. [PER_THREAD_METRICS]: hits / misses / not_found / bytes_saved per thread_id, for the WORKSPACE_STATS_THREADS
+#    most recently active threads.
+# 6. [BATCH_IO]: read_many / write_many fan blobs out over a bounded thread pool (WORKSPACE_IO_WORKERS).
+# 7. [HASH_SYNC]: sync_up / sync_down compare md5 (crc32c for composite objects) against a local manifest
+#    keyed by (size, mtime), so repeated syncs neither re-hash untouched files nor move unchanged bytes.
+# 8. [INDEX_OBJECT]: Each workspace keeps `{thread_id}/.workspace_index.json`, a path-sorted columnar table
+#    (size, hash, updated). Writes merge into it under if_generation_match; list/glob/changed-since read ONLY it.
+# 9. [PATH_SAFETY]: Workspace paths are normalized and must stay inside the workspace; on sync, every local target is
+#    realpath-checked against local_dir. Offenders are logged and skipped, never written. local_dir itself must resolve
+#    under WORKSPACE_SYNC_ROOT, so a sync can neither publish nor overwrite arbitrary server directories.
+
+# [BANNED PATTERNS]
+# - NO EXISTS() PROBES: NotFound on the download IS the existence check.
+# - NO STALE SERVES: Cached bytes are only returned after GCS confirmed the generation (304).
+# - NO BUCKET ENUMERATION ON QUERIES: list_blobs is reserved for (re)building a missing index and for sync.
+
+import os, json, time, base64, bisect, fnmatch, hashlib, logging, mimetypes, posixpath, threading
+import google_crc32c
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.exceptions import NotFound, NotModified, PreconditionFailed
+from app.db import storage_client
+
+logger = logging.getLogger("uvicorn.error")
+BUCKET_NAME = "vibe-agent-user-projects"
+WORKSPACE_CACHE_DIR = os.environ.get("WORKSPACE_CACHE_DIR", "/tmp/vibe_workspace_cache")
+WORKSPACE_CACHE_MEMORY_BYTES = int(os.environ.get("WORKSPACE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+WORKSPACE_CACHE_DISK_BYTES = int(os.environ.get("WORKSPACE_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+WORKSPACE_STATS_THREADS = 1024
+# The disk tier is scanned only once it overshoots, then trimmed to this fraction of its budget
+WORKSPACE_CACHE_DISK_TRIM_TO = 0.9
+WORKSPACE_IO_WORKERS = int(os.environ.get("WORKSPACE_IO_WORKERS", "16"))
+SYNC_MANIFEST_NAME = ".workspace_manifest.json"
+INDEX_NAME = ".workspace_index.json"
+INDEX_COMMIT_RETRIES = 8
+SYNC_TMP_SUFFIX = ".workspace-sync.tmp"
+WORKSPACE_SYNC_ROOT = os.environ.get("WORKSPACE_SYNC_ROOT", "/tmp/vibe_workspace_sync")
+_pool = ThreadPoolExecutor(max_workers=WORKSPACE_IO_WORKERS, thread_name_prefix="workspace-io")
+
+def get_bucket():
+    return storage_client.bucket(BUCKET_NAME)
+
+def blob_name(thread_id: str, path: str) -> str:
+    return f"{thread_id}/{path}"
+
+def clean_path(path: str):
+    """Normalized workspace-relative path, or None if it is empty, absolute or climbs out with '..'."""
+    norm = posixpath.normpath(str(path).replace("\\", "/"))
+    if norm in (".", "..") or norm.startswith(("/", "../")): return None
+    return norm
+
+def local_target(local_dir: str, rel: str):
+    """Real path of `rel` under local_dir, or None (logged) if it resolves outside it, e.g. through '..' or a symlink."""
+    root = os.path.realpath(local_dir)
+    target = os.path.realpath(os.path.join(root, clean_path(rel) or ".."))
+    if os.path.commonpath([root, target]) != root or target == root:
+        logger.warning(f"[WORKSPACE_SYNC] Skipping {rel!r}: resolves outside {local_dir}.")
+        return None
+    return target
+
+def sync_dir(local_dir: str):
+    """Real path of a sync directory (relative paths are taken from WORKSPACE_SYNC_ROOT), or None if it lies outside the root."""
+    root = os.path.realpath(WORKSPACE_SYNC_ROOT)
+    target = os.path.realpath(os.path.join(root, str(local_dir)))
+    return target if os.path.commonpath([root, target]) == root else None
+
+def content_type_of(path: str, data: bytes) -> str:
+    guessed = mimetypes.guess_type(path)[0]
+    if guessed: return guessed
+    try:
+        data.decode("utf-8")
+        return "text/plain"
+    except UnicodeDecodeError:
+        return "application/octet-stream"
+
+class WorkspaceCache:
+    """Read-through cache for workspace blobs. Tools are sync, so state is guarded by a threading lock."""
+    def __init__(self, root: str = WORKSPACE_CACHE_DIR, memory_bytes: int = WORKSPACE_CACHE_MEMORY_BYTES, disk_bytes: int = WORKSPACE_CACHE_DISK_BYTES):
+        self.root, self.memory_bytes, self.disk_bytes = root, memory_bytes, disk_bytes
+        self._mem = OrderedDict()  # name -> (generation, bytes)
+        self._mem_size = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_size = None  # running byte total of the disk tier; None until the first scan
+        self.stats = OrderedDict()  # thread_id -> counters, LRU-bounded by WORKSPACE_STATS_THREADS
+
+    def read(self, thread_id: str, path: str):
+        """Returns the blob's bytes, or None if it does not exist."""
+        fetched = self.fetch(thread_id, path)
+        return fetched[1] if fetched else None
+
+    def fetch(self, thread_id: str, path: str):
+        """Returns (generation, bytes), or None if the blob does not exist."""
+        name = blob_name(thread_id, path)
+        cached = self._get(name)
+        blob = get_bucket().blob(name)
+        try:
+            data = blob.download_as_bytes(if_generation_not_match=cached[0]) if cached else blob.download_as_bytes()
+        except NotModified:
+            self._count(thread_id, hits=1, bytes_saved=len(cached[1]))
+            return cached
+        except NotFound:
+            self._count(thread_id, not_found=1)
+            self.evict(name)
+            return None
+        self._count(thread_id, misses=1)
+        self._put(name, blob.generation, data)
+        return int(blob.generation or 0), data
+
+    def write(self, thread_id: str, path: str, data: bytes, content_type: str = "text/plain", **preconditions):
+        """Uploads and caches under the new generation. Returns the blob (generation, hashes populated).
+        `preconditions` (e.g. if_generation_match) pass straight through to the upload."""
+        name = blob_name(thread_id, path)
+        blob = get_bucket().blob(name)
+        blob.upload_from_string(data, content_type=content_type, **preconditions)
+        self._count(thread_id, writes=1)
+        self._put(name, blob.generation, data)
+        return blob
+
+    def evict(self, name: str):
+        with self._lock:
+            entry = self._mem.pop(name, None)
+            if entry: self._mem_size -= len(entry[1])
+        self._disk_remove(self._disk_path(name))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"memory_entries": len(self._mem), "memory_bytes": self._mem_size, "disk_bytes": self._disk_size, "threads": {t: dict(s) for t, s in self.stats.items()}}
+
+    def _count(self, thread_id, **deltas):
+        with self._lock:
+            stats = self.stats.pop(thread_id, None) or {"hits": 0, "misses": 0, "not_found": 0, "writes": 0, "bytes_saved": 0}
+            for k, v in deltas.items(): stats[k] += v
+            self.stats[thread_id] = stats
+            while len(self.stats) > WORKSPACE_STATS_THREADS: self.stats.popitem(last=False)
+
+    # --- Tiers ---
+    def _get(self, name):
+        with self._lock:
+            entry = self._mem.get(name)
+            if entry is not None:
+                self._mem.move_to_end(name)
+                return entry
+        entry = self._disk_get(name)
+        if entry is not None: self._mem_put(name, entry)
+        return entry
+
+    def _put(self, name, generation, data: bytes):
+        if generation is None: return self.evict(name)
+        entry = (int(generation), data)
+        self._mem_put(name, entry)
+        self._disk_put(name, entry)
+
+    def _mem_put(self, name, entry):
+        if len(entry[1]) > self.memory_bytes: return
+        with self._lock:
+            old = self._mem.pop(name, None)
+            if old: self._mem_size -= len(old[1])
+            self._mem[name] = entry
+            self._mem_size += len(entry[1])
+            while self._mem_size > self.memory_bytes:
+                _, (_, evicted) = self._mem.popitem(last=False)
+                self._mem_size -= len(evicted)
+
+    def _disk_path(self, name):
+        return os.path.join(self.root, hashlib.sha256(name.encode("utf-8")).hexdigest())
+
+    def _disk_get(self, name):
+        path = self._disk_path(name)
+        try:
+            with open(path, "rb") as f:
+                generation = int(f.readline())
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # mtime doubles as the disk tier's LRU clock
+        return generation, data
+
+    def _disk_put(self, name, entry):
+        if self.disk_bytes <= 0 or len(entry[1]) > self.disk_bytes: return
+        path = self._disk_path(name)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            # Generation header + bytes in one file, swapped in atomically so a reader never pairs the wrong two
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f: f.write(b"%d\n" % entry[0] + entry[1])
+            with self._disk_lock:
+                try: replaced = os.stat(path).st_size
+                except FileNotFoundError: replaced = 0
+                os.replace(tmp, path)
+                if self._disk_size is None: self._disk_size = self._disk_scan()[1]
+                else: self._disk_size += os.stat(path).st_size - replaced
+                if self._disk_size > self.disk_bytes: self._disk_trim()
+        except OSError as e:
+            logger.warning(f"[WORKSPACE_CACHE] Disk tier write failed: {e}")
+
+    def _disk_remove(self, path):
+        with self._disk_lock:
+            try:
+                size = os.stat(path).st_size
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            if self._disk_size is not None: self._disk_size -= size
+
+    def _disk_scan(self):
+        files = [e for e in os.scandir(self.root) if e.is_file() and "." not in e.name]
+        return files, sum(e.stat().st_size for e in files)
+
+    def _disk_trim(self):
+        # Caller holds _disk_lock. Rescan (other processes share the directory), then trim below the low-water mark
+        files, total = self._disk_scan()
+        target = self.disk_bytes * WORKSPACE_CACHE_DISK_TRIM_TO
+        for e in sorted(files, key=lambda e: e.stat().st_mtime):
+            if total <= target: break
+            total -= e.stat().st_size
+            try: os.remove(e.path)
+            except FileNotFoundError: pass
+        self._disk_size = total
+
+WORKSPACE = WorkspaceCache()
+
+# --- Index ---
+def index_entry(blob) -> dict:
+    updated = blob.updated.timestamp() if blob.updated else time.time()
+    return {"size": int(blob.size or 0), "hash": blob.md5_hash or blob.crc32c, "updated": updated}
+
+class WorkspaceIndex:
+    """Columnar, path-sorted file table: {"paths": [...], "size": [...], "hash": [...], "updated": [...]}. Hash is md5 (crc32c for composites)."""
+    COLUMNS = ("size", "hash", "updated")
+
+    def __init__(self, table: dict = None):
+        table = table or {}
+        self.paths = table.get("paths", [])
+        self.columns = {c: table.get(c, [None] * len(self.paths)) for c in self.COLUMNS}
+
+    @classmethod
+    def from_entries(cls, entries: dict):
+        paths = sorted(entries)
+        return cls({"paths": paths, **{c: [entries[p][c] for p in paths] for c in cls.COLUMNS}})
+
+    def entries(self) -> dict:
+        return {p: {c: self.columns[c][i] for c in self.COLUMNS} for i, p in enumerate(self.paths)}
+
+    def merged(self, updates: dict):
+        entries = self.entries()
+        entries.update(updates)
+        return WorkspaceIndex.from_entries(entries)
+
+    def encode(self) -> bytes:
+        return json.dumps({"paths": self.paths, **self.columns}, separators=(",", ":")).encode("utf-8")
+
+    def query(self, prefix: str = "", pattern: str = None, changed_since: float = None, min_size: int = None, max_size: int = None):
+        """Yields (path, entry). Prefix (and a glob's literal head) is a bisect range over the sorted paths."""
+        if pattern:
+            head = pattern.split("*", 1)[0].split("?", 1)[0].split("[", 1)[0]
+            if head.startswith(prefix): prefix = head
+        i = bisect.bisect_left(self.paths, prefix)
+        while i < len(self.paths) and self.paths[i].startswith(prefix):
+            path, size, updated = self.paths[i], self.columns["size"][i], self.columns["updated"][i]
+            i += 1
+            if pattern and not fnmatch.fnmatchcase(path, pattern): continue
+            if changed_since is not None and (updated or 0) <= changed_since: continue
+            if min_size is not None and size < min_size: continue
+            if max_size is not None and size > max_size: continue
+            yield path, {"size": size, "hash": self.columns["hash"][i - 1], "updated": updated}
+
+INDEX_PARSED_MAX = 256
+_parsed = OrderedDict()  # thread_id -> (generation, WorkspaceIndex); decode once per generation
+_parsed_lock = threading.Lock()  # tools run on worker threads
+
+def _remember(thread_id, generation, index):
+    with _parsed_lock:
+        _parsed[thread_id] = (generation, index)
+        _parsed.move_to_end(thread_id)
+        while len(_parsed) > INDEX_PARSED_MAX: _parsed.popitem(last=False)
+        return generation, index
+
+def _build_index(thread_id: str) -> WorkspaceIndex:
+    prefix = f"{thread_id}/"
+    blobs = [b for b in get_bucket().list_blobs(prefix=prefix) if b.name != prefix + INDEX_NAME]
+    logger.warning(f"[WORKSPACE_INDEX] {thread_id}: (re)built from {len(blobs)} blobs.")
+    return WorkspaceIndex.from_entries({b.name[len(prefix):]: index_entry(b) for b in blobs})
+
+def _load_index(thread_id: str):
+    """(generation, index). Generation 0 means the index object does not exist yet."""
+    fetched = WORKSPACE.fetch(thread_id, INDEX_NAME)
+    if fetched is None: return 0, None
+    generation, data = fetched
+    with _parsed_lock: cached = _parsed.get(thread_id)
+    if cached and cached[0] == generation: return cached
+    return _remember(thread_id, generation, WorkspaceIndex(json.loads(data)))
+
+def _commit_index(thread_id: str, change):
+    """Optimistic read-modify-write: `change(index | None) -> index`, retried when another writer got there first."""
+    for _ in range(INDEX_COMMIT_RETRIES):
+        generation, index = _load_index(thread_id)
+        index = change(index)
+        try:
+            blob = WORKSPACE.write(thread_id, INDEX_NAME, index.encode(), content_type="application/json", if_generation_match=generation)
+        except PreconditionFailed:
+            continue
+        _remember(thread_id, int(blob.generation or 0), index)
+        return index
+    logger.warning(f"[WORKSPACE_INDEX] {thread_id}: gave up after {INDEX_COMMIT_RETRIES} contended commits; next query rebuilds it.")
+    WORKSPACE.evict(blob_name(thread_id, INDEX_NAME))
+    with _parsed_lock: _parsed.pop(thread_id, None)
+    try: get_bucket().blob(blob_name(thread_id, INDEX_NAME)).delete()
+    except NotFound: pass
+
+def record_writes(thread_id: str, blobs):
+    """Merges freshly uploaded blobs into the index. A missing index is built from the bucket (which already has them)."""
+    updates = {b.name[len(thread_id) + 1:]: index_entry(b) for b in blobs}
+    if updates: _commit_index(thread_id, lambda index: index.merged(updates) if index else _build_index(thread_id))
+
+def get_index(thread_id: str) -> WorkspaceIndex:
+    generation, index = _load_index(thread_id)
+    if index is not None: return index
+    return _commit_index(thread_id, lambda index: index or _build_index(thread_id)) or _build_index(thread_id)
+
+def rebuild_index(thread_id: str) -> WorkspaceIndex:
+    return _commit_index(thread_id, lambda _: _build_index(thread_id)) or _build_index(thread_id)
+
+# --- Batch IO ---
+def read_many(thread_id: str, paths) -> dict:
+    """{path: bytes | None}. Each read goes through the cache, so unchanged blobs cost one 304.
+    Paths are normalized like write_many's; ones that would escape the workspace read as None."""
+    paths = list(dict.fromkeys(paths))
+    return dict(zip(paths, _pool.map(lambda p: WORKSPACE.read(thread_id, clean_path(p)) if clean_path(p) else None, paths)))
+
+def write_many(thread_id: str, files: dict) -> dict:
+    """{path: generation}. Uploads run concurrently; the first failure is raised after all have settled.
+    Paths that would escape the workspace are logged and left out of the result."""
+    futures = {}
+    for p, data in files.items():
+        if clean_path(p) is None:
+            logger.warning(f"[WORKSPACE] {thread_id}: rejected unsafe path {p!r}.")
+            continue
+        futures[p] = _pool.submit(WORKSPACE.write, thread_id, clean_path(p), data)
+    blobs = {p: f.result() for p, f in futures.items()}
+    record_writes(thread_id, blobs.values())
+    return {p: b.generation for p, b in blobs.items()}
+
+# --- Sync ---
+def _digests(data: bytes) -> dict:
+    return {"md5": base64.b64encode(hashlib.md5(data).digest()).decode("ascii"),
+            "crc32c": base64.b64encode(google_crc32c.Checksum(data).digest()).decode("ascii")}
+
+def _same(entry: dict, blob) -> bool:
+    # Composite objects have no md5; crc32c is always present
+    if blob.md5_hash: return entry.get("md5") == blob.md5_hash
+    return entry.get("crc32c") == blob.crc32c
+
+class SyncManifest:
+    """Local record of {relpath: {size, mtime, md5, crc32c}} stored beside the synced tree."""
+    def __init__(self, local_dir: str):
+        self.path = os.path.join(local_dir, SYNC_MANIFEST_NAME)
+        try:
+            with open(self.path) as f: self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def entry(self, local_dir: str, rel: str):
+        """Digests of the local file, re-hashed only when size or mtime moved. None if it does not exist."""
+        try: st = os.stat(os.path.join(local_dir, rel))
+        except FileNotFoundError: return None
+        cached = self.entries.get(rel)
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime_ns: return cached
+        with open(os.path.join(local_dir, rel), "rb") as f: digests = _digests(f.read())
+        self.entries[rel] = {"size": st.st_size, "mtime": st.st_mtime_ns, **digests}
+        return self.entries[rel]
+
+    def save(self):
+        tmp = self.path + SYNC_TMP_SUFFIX
+        with open(tmp, "w") as f: json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+def _local_files(local_dir: str):
+    for root, dirs, files in os.walk(local_dir):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), local_dir)
+            if rel != SYNC_MANIFEST_NAME and not rel.endswith(SYNC_TMP_SUFFIX) and local_target(local_dir, rel): yield rel
+
+def _remote_blobs(thread_id: str) -> dict:
+    prefix = f"{thread_id}/"
+    return {b.name[len(prefix):]: b for b in get_bucket().list_blobs(prefix=prefix) if b.name != prefix + INDEX_NAME}
+
+def sync_up(thread_id: str, local_dir: str) -> dict:
+    """Uploads local files whose digests differ from the workspace copy."""
+    manifest, remote, local = SyncManifest(local_dir), _remote_blobs(thread_id), list(_local_files(local_dir))
+    present = set(local)
+    manifest.entries = {rel: e for rel, e in manifest.entries.items() if rel in present}
+    changed = [rel for rel in local if rel not in remote or not _same(manifest.entry(local_dir, rel), remote[rel])]
+
+    def upload(rel):
+        with open(os.path.join(local_dir, rel), "rb") as f: data = f.read()
+        return WORKSPACE.write(thread_id, rel, data, content_type=content_type_of(rel, data))
+    record_writes(thread_id, list(_pool.map(upload, changed)))
+    manifest.save()
+    logger.warning(f"[WORKSPACE_SYNC] {thread_id} up: {len(changed)} uploaded, {len(local) - len(changed)} unchanged.")
+    return {"uploaded": sorted(changed), "unchanged": len(local) - len(changed)}
+
+def sync_down(thread_id: str, local_dir: str) -> dict:
+    """Downloads workspace blobs whose digests differ from the local copy."""
+    os.makedirs(local_dir, exist_ok=True)
+    manifest, remote = SyncManifest(local_dir), _remote_blobs(thread_id)
+    remote = {rel: blob for rel, blob in remote.items() if local_target(local_dir, rel)}
+    changed = [rel for rel, blob in remote.items() if not (manifest.entry(local_dir, rel) and _same(manifest.entries[rel], blob))]
+
+    def download(rel):
+        target = local_target(local_dir, rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        remote[rel].download_to_filename(target + SYNC_TMP_SUFFIX)
+        os.replace(target + SYNC_TMP_SUFFIX, target)
+        manifest.entries.pop(rel, None)
+    list(_pool.map(download, changed))
+    for rel in changed: manifest.entry(local_dir, rel)
+    manifest.save()
+    logger.warning(f"[WORKSPACE_SYNC] {thread_id} down: {len(changed)} downloaded, {len(remote) - len(changed)} unchanged.")
+    return {"downloaded": sorted(changed), "unchanged": len(remote) - len(changed)}
@@ -0,0 +1,104 @@
+# Checkpoint serializer benchmark: encode/decode time and stored size on varied synthetic chat histories.
+# Usage: python bench_checkpoint_serde.py [turns ...]   (default: 20 80 200)
+import sys, time, random
+from langchain_core.messages import HumanMessage, AIMessage
+from app.serde import TypedSerializer, CompactSerializer, msgpack, zstandard
+
+random.seed(7)
+
+# Varied natural-language corpus, so the compression ratios are not flattered by a tiny repeated vocabulary:
+# Zipf-weighted prose over a few thousand words (common English words first, then generated ones), mixed with
+# founder-chat templates carrying names, numbers, URLs and non-ASCII text. Built here: no fixtures, no extra imports.
+COMMON = ("the of and to a in is it that we for they on with as be this are have not but at our what by from or if so "
+          "customers price users team market would can will just about think do more when need one their there how product "
+          "pay time which because like really some first month data sales people tool build only weeks problem growth").split()
+SYLLABLES = ["ba", "con", "de", "fer", "gra", "in", "lo", "ment", "na", "or", "pro", "qui", "re", "sta", "ti", "ver", "al", "ex", "ure", "ly"]
+
+def _vocabulary(size: int = 4000):
+    words = list(COMMON)
+    while len(words) < size:
+        words.append("".join(random.choice(SYLLABLES) for _ in range(random.randint(1, 4))))
+    return words
+
+VOCABULARY = _vocabulary()
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+def word_sentence():
+    words = random.choices(VOCABULARY, WEIGHTS, k=random.randint(6, 24))
+    return " ".join(words).capitalize() + random.choice([".", ".", ".", "?", "!"])
+
+SENTENCES = [
+    "We interviewed {n} {who} in {city} last {when}, and {pct}% said the biggest pain is {pain}.",
+    "Honestly, I think {rival} gets it wrong because they assume {who} care about {feature} more than {pain}.",
+    "Our pricing hypothesis is ${price}/month per seat, with a {pct}% discount for annual plans billed up front.",
+    "Here is the deck I mentioned: {url} (slides {n}-{m} cover the go-to-market).",
+    "The founder said, verbatim: \"{quote}\"",
+    "Retention in the {when} cohort was {pct}% at week {n}, versus {pct2}% for the control group.",
+    "If we can't get {who} to onboard in under {n} minutes, the wedge doesn't work — full stop.",
+    "Competitors: {rival} (raised ${price}M), {rival2}, and a long tail of spreadsheets and WhatsApp groups.",
+    "Next steps:\n- call {name} about the pilot in {city}\n- draft the {feature} spec\n- send the survey to {n} users",
+    "I'd frame the moat as {feature}: every week of usage makes the {who}' data harder to leave behind.",
+    "Revenue model: take {pct}% of each transaction, capped at ${price}, plus an optional {feature} add-on.",
+    "Success in 18 months looks like {n},{m}00 paying {who} and net revenue retention above {pct2}%.",
+    "The risk I keep coming back to is that {pain} is seasonal; in {city} it peaks around {when}.",
+    "Source for the market sizing: {url} — they estimate {n}.{m} million {who} across the region.",
+    "{name} pushed back: \"{quote}\" — worth keeping that exact wording in the brief.",
+    "Technically it's a {feature} on top of a {stack} backend, synced nightly; nothing exotic.",
+]
+FILL = {
+    "who": ["dairy farmers", "clinic managers", "indie game studios", "school bursars", "fleet operators", "café owners", "freelance translators"],
+    "city": ["Taranaki", "São Paulo", "Kraków", "Nairobi", "Osaka (大阪)", "Reykjavík", "Chiang Mai", "Zürich"],
+    "when": ["spring", "quarter", "harvest season", "January", "term", "year"],
+    "pain": ["reconciling invoices by hand", "chasing late payments", "no-shows", "compliance paperwork", "gumboots wearing out every winter", "double-booked equipment"],
+    "rival": ["Xero", "FarmOS", "Notion templates", "a 2014-era ERP", "Calendly"], "rival2": ["Airtable", "QuickBooks", "Excel", "Monday.com"],
+    "feature": ["offline-first mobile capture", "automatic reconciliation", "the shared ledger", "SMS reminders", "benchmark dashboards"],
+    "stack": ["FastAPI + Firestore", "Rails", "Postgres", "serverless"],
+    "name": ["Aroha", "Łukasz", "Dr. Okonkwo", "Søren", "María José", "Tanaka-san", "Priya"],
+    "quote": ["I don't want another app, I want my Sunday back.", "Nobody reads the weekly report, they just ring me.",
+              "If it needs Wi-Fi in the shed, it's dead on arrival.", "We tried three tools; all of them assumed an accountant.",
+              "Ça marche, mais c'est trop lent.", "正直、紙の方が早い。", "Honestly the spreadsheet is the product 🙃"],
+    "url": ["https://docs.google.com/presentation/d/1xQ{n}/edit#slide=id.p{m}", "https://www.stats.govt.nz/information-releases/agricultural-production-{n}",
+            "https://example.com/research/{n}-{m}?utm_source=cofounder", "https://github.com/vibe/design-lab/issues/{n}"],
+}
+
+def sentence():
+    if random.random() < 0.7: return word_sentence()
+    text = random.choice(SENTENCES)
+    for key, pool in FILL.items():
+        while "{" + key + "}" in text: text = text.replace("{" + key + "}", random.choice(pool), 1)
+    return text.format(n=random.randint(2, 480), m=random.randint(1, 9), pct=random.randint(3, 97), pct2=random.randint(3, 97), price=random.choice([9, 19, 29, 49, 120, 4.5]))
+
+def prose(sentences: int):
+    return " ".join(sentence() for _ in range(sentences))
+
+def history(turns: int):
+    msgs = []
+    for i in range(turns):
+        msgs.append(HumanMessage(content=prose(random.randint(1, 4))))
+        msgs.append(AIMessage(content="\n\n".join(prose(random.randint(2, 5)) for _ in range(random.randint(1, 4))), response_metadata={"model_name": "gemini-2.5-flash", "finish_reason": "STOP"}))
+    return {"v": 1, "id": f"1f0{turns:05d}", "ts": "2026-01-01T00:00:00+00:00", "channel_values": {"messages": msgs}, "channel_versions": {"messages": turns * 2}, "versions_seen": {"cofounder": {"messages": turns * 2 - 1}}}
+
+def bench(serde, checkpoint, rounds: int = 5):
+    enc = dec = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter(); tag, blob = serde.dumps_typed(checkpoint)
+        t1 = time.perf_counter(); serde.loads_typed((tag, blob))
+        enc += t1 - t0; dec += time.perf_counter() - t1
+    return tag, len(blob), enc / rounds * 1000, dec / rounds * 1000
+
+if __name__ == "__main__":
+    print(f"corpus: {len(VOCABULARY)}-word Zipf prose + {len(SENTENCES)} chat templates")
+    serdes = [TypedSerializer(), CompactSerializer(codec="json", compression="zlib")]
+    if zstandard: serdes.append(CompactSerializer(codec="json", compression="zstd"))
+    if msgpack: serdes.append(CompactSerializer(codec="msgpack", compression="zlib"))
+    if msgpack and zstandard: serdes.append(CompactSerializer(codec="msgpack", compression="zstd"))
+
+    for turns in [int(a) for a in sys.argv[1:]] or [20, 80, 200]:
+        checkpoint = history(turns)
+        print(f"\n--- {turns} TURNS ({turns * 2} messages) ---")
+        print(f"{'FORMAT':<16}{'BYTES':>12}{'RATIO':>8}{'ENCODE ms':>12}{'DECODE ms':>12}")
+        baseline = None
+        for serde in serdes:
+            tag, size, enc, dec = bench(serde, checkpoint)
+            baseline = baseline or size
+            print(f"{tag:<16}{size:>12,}{size / baseline:>8.2f}{enc:>12.2f}{dec:>12.2f}")
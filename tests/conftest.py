@@ -0,0 +1,34 @@
+"""Installs in-memory Firestore / GCS clients as `app.db` before any app module is imported: no credentials needed."""
+import os, sys, types, tempfile
+import pytest
+from fakes import FakeFirestore, FakeStorageClient
+
+os.environ.setdefault("WORKSPACE_CACHE_DIR", tempfile.mkdtemp(prefix="vibe_ws_cache_"))
+
+FIRESTORE = FakeFirestore()
+STORAGE = FakeStorageClient()
+REGISTRY_DOC = {"MANIFESTO": "mission_manifesto", "ENVELOPE": "immutable_envelope", "STATE": "live_state"}
+
+fake_db = types.ModuleType("app.db")
+fake_db.PROJECT_ID = "test-project"
+fake_db.db = FIRESTORE
+fake_db.storage_client = STORAGE
+fake_db.get_sync_db = FIRESTORE.sync_client
+sys.modules["app.db"] = fake_db
+FIRESTORE.docs["_system_config/naming_registry"] = dict(REGISTRY_DOC)
+
+@pytest.fixture(autouse=True)
+def clean_backends():
+    FIRESTORE.docs.clear(); FIRESTORE.stamps.clear()
+    FIRESTORE.docs["_system_config/naming_registry"] = dict(REGISTRY_DOC)
+    STORAGE.buckets.clear()
+    yield
+
+@pytest.fixture
+def firestore_db():
+    return FIRESTORE
+
+@pytest.fixture
+def bucket():
+    from app.workspace import BUCKET_NAME
+    return STORAGE.bucket(BUCKET_NAME)
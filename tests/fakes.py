@@ -0,0 +1,290 @@
+"""In-memory stand-ins for the Firestore and GCS clients in app.db: just enough surface for the unit tests."""
+import copy, base64, hashlib, datetime
+import google_crc32c
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound, NotModified, PreconditionFailed
+
+_INCREMENT = type(firestore.Increment(1))
+
+async def _ready(value):
+    return value
+
+def _parts(path: str):
+    return FieldPath.from_api_repr(path).parts
+
+def _resolve(value, current):
+    if value is firestore.SERVER_TIMESTAMP: return datetime.datetime.now(datetime.timezone.utc)
+    if isinstance(value, _INCREMENT): return (current or 0) + value.value
+    return copy.deepcopy(value)
+
+def _merge(doc, data):
+    for k, v in data.items():
+        if v is firestore.DELETE_FIELD: doc.pop(k, None)
+        elif isinstance(v, dict) and isinstance(doc.get(k), dict): _merge(doc[k], v)
+        else: doc[k] = _resolve(v, doc.get(k))
+
+class Snapshot:
+    def __init__(self, ref, data, update_time=None):
+        self.reference, self.id, self._data, self.update_time = ref, ref.id, data, update_time
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        value = self._data
+        for p in _parts(field): value = value[p]
+        return value
+
+class FakeFirestore:
+    """One store shared by an async and a sync facade (`FakeFirestore(store, is_async=False)`)."""
+    def __init__(self, store=None, is_async=True):
+        self.docs = {} if store is None else store
+        self.stamps = {}
+        self.is_async = is_async
+
+    def _out(self, value):
+        return _ready(value) if self.is_async else value
+
+    def sync_client(self):
+        twin = FakeFirestore(self.docs, is_async=False)
+        twin.stamps = self.stamps
+        return twin
+
+    def collection(self, name):
+        return Query(self, name)
+
+    def document(self, path):
+        return DocRef(self, path)
+
+    def batch(self):
+        return Batch(self)
+
+    def transaction(self, **kwargs):
+        return Batch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        snaps = [ref._snapshot(field_paths) for ref in references]
+        if not self.is_async: return iter(snaps)
+        async def gen():
+            for snap in snaps: yield snap
+        return gen()
+
+    def write_option(self, last_update_time):
+        return {"last_update_time": last_update_time}
+
+    # --- Primitive writes (raise before touching the store) ---
+    def _touch(self, path):
+        self.stamps[path] = self.stamps.get(path, 0) + 1
+
+    def _set(self, path, data, merge=False):
+        doc = self.docs.get(path) if merge else None
+        doc = {} if doc is None else doc
+        if isinstance(merge, list):
+            for field in merge:
+                if field in data: doc[field] = _resolve(data[field], doc.get(field))
+        else:
+            _merge(doc, data)
+        self.docs[path] = doc
+        self._touch(path)
+
+    def _update(self, path, data, option=None):
+        if path not in self.docs: raise NotFound(path)
+        if option and self.stamps.get(path) != option["last_update_time"]: raise FailedPrecondition(path)
+        doc = self.docs[path]
+        for key, value in data.items():
+            *parents, leaf = _parts(key)
+            node = doc
+            for p in parents: node = node.setdefault(p, {})
+            if value is firestore.DELETE_FIELD: node.pop(leaf, None)
+            else: node[leaf] = _resolve(value, node.get(leaf))
+        self._touch(path)
+
+    def _create(self, path, data):
+        if path in self.docs: raise AlreadyExists(path)
+        self._set(path, data)
+
+    def _delete(self, path):
+        self.docs.pop(path, None)
+        self.stamps.pop(path, None)
+
+class DocRef:
+    def __init__(self, client, path):
+        self.client, self.path, self.id = client, path, path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return Query(self.client, f"{self.path}/{name}")
+
+    def _snapshot(self, field_paths=None):
+        data = copy.deepcopy(self.client.docs.get(self.path))
+        if data is not None and field_paths:
+            projected = {}
+            for field in field_paths:
+                *parents, leaf = _parts(field)
+                src, dst = data, projected
+                for p in parents:
+                    src = src.get(p) if isinstance(src, dict) else None
+                    dst = dst.setdefault(p, {})
+                if isinstance(src, dict) and leaf in src: dst[leaf] = src[leaf]
+            data = projected
+        return Snapshot(self, data, self.client.stamps.get(self.path))
+
+    def get(self, field_paths=None, transaction=None):
+        return self.client._out(self._snapshot(field_paths))
+
+    def set(self, data, merge=False):
+        return self.client._out(self.client._set(self.path, data, merge))
+
+    def update(self, data, option=None):
+        return self.client._out(self.client._update(self.path, data, option))
+
+    def create(self, data):
+        return self.client._out(self.client._create(self.path, data))
+
+    def delete(self):
+        return self.client._out(self.client._delete(self.path))
+
+class Query:
+    _OPS = {"==": lambda a, b: a == b, "<": lambda a, b: a is not None and a < b, "<=": lambda a, b: a is not None and a <= b,
+            ">": lambda a, b: a is not None and a > b, ">=": lambda a, b: a is not None and a >= b, "in": lambda a, b: a in b}
+
+    def __init__(self, client, path, filters=(), orders=(), limit_=None, fields=None, after=None):
+        self.client, self.path = client, path
+        self._filters, self._orders, self._limit, self._fields, self._after = list(filters), list(orders), limit_, fields, after
+
+    def _with(self, **kw):
+        state = dict(filters=self._filters, orders=self._orders, limit_=self._limit, fields=self._fields, after=self._after)
+        state.update(kw)
+        return Query(self.client, self.path, **state)
+
+    def document(self, doc_id):
+        return DocRef(self.client, f"{self.path}/{doc_id}")
+
+    def where(self, field, op, value):
+        return self._with(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction=firestore.Query.ASCENDING):
+        return self._with(orders=self._orders + [(field, direction)])
+
+    def limit(self, n):
+        return self._with(limit_=n)
+
+    def select(self, fields):
+        return self._with(fields=list(fields))
+
+    def start_after(self, snapshot):
+        return self._with(after=snapshot)
+
+    def _run(self):
+        prefix = f"{self.path}/"
+        rows = [(p, d) for p, d in self.client.docs.items() if p.startswith(prefix) and "/" not in p[len(prefix):]]
+        for field, op, value in self._filters:
+            rows = [r for r in rows if self._OPS[op](r[1].get(field), value)]
+        for field, direction in reversed(self._orders):
+            rows.sort(key=lambda r: (r[1].get(field) is not None, r[1].get(field)), reverse=direction == firestore.Query.DESCENDING)
+        if self._after is not None:
+            paths = [p for p, _ in rows]
+            rows = rows[paths.index(self._after.reference.path) + 1:]
+        if self._limit: rows = rows[:self._limit]
+        return [DocRef(self.client, p)._snapshot(self._fields) for p, _ in rows]
+
+    def stream(self):
+        if not self.client.is_async: return iter(self._run())
+        async def gen():
+            for snap in self._run(): yield snap
+        return gen()
+
+    def get(self):
+        return self.client._out(self._run())
+
+class Batch:
+    """WriteBatch / Transaction: writes are queued and applied atomically on commit."""
+    def __init__(self, client):
+        self.client, self._ops = client, []
+
+    def set(self, ref, data, merge=False): self._ops.append(lambda: self.client._set(ref.path, data, merge))
+    def update(self, ref, data, option=None): self._ops.append(lambda: self.client._update(ref.path, data, option))
+    def create(self, ref, data): self._ops.append(lambda: self.client._create(ref.path, data))
+    def delete(self, ref): self._ops.append(lambda: self.client._delete(ref.path))
+
+    def _apply(self):
+        docs, stamps = copy.deepcopy(self.client.docs), dict(self.client.stamps)
+        try:
+            for op in self._ops: op()
+        except Exception:
+            self.client.docs.clear(); self.client.docs.update(docs)
+            self.client.stamps.clear(); self.client.stamps.update(stamps)
+            raise
+        finally:
+            self._ops = []
+
+    def commit(self):
+        return self.client._out(self._apply())
+
+def fake_async_transactional(fn, attempts: int = 1):
+    """Stand-in for firestore.async_transactional. `attempts` > 1 replays fn as if earlier attempts were aborted."""
+    async def run(transaction, *args, **kwargs):
+        for _ in range(attempts - 1):
+            await fn(transaction, *args, **kwargs)
+            transaction._ops = []
+        result = await fn(transaction, *args, **kwargs)
+        transaction._apply()
+        return result
+    return run
+
+# --- GCS ---
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+        self.generation = self.size = self.md5_hash = self.crc32c = self.updated = self.content_type = None
+
+    def _load(self):
+        generation, data, updated, content_type = self.bucket.objects[self.name]
+        self.generation, self.size, self.updated, self.content_type = generation, len(data), updated, content_type
+        self.md5_hash = base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+        self.crc32c = base64.b64encode(google_crc32c.Checksum(data).digest()).decode("ascii")
+        return data
+
+    def download_as_bytes(self, if_generation_not_match=None):
+        if self.name not in self.bucket.objects: raise NotFound(self.name)
+        if if_generation_not_match is not None and self.bucket.objects[self.name][0] == if_generation_not_match: raise NotModified(self.name)
+        return self._load()
+
+    def download_to_filename(self, filename):
+        with open(filename, "wb") as f: f.write(self.download_as_bytes())
+
+    def upload_from_string(self, data, content_type="text/plain", if_generation_match=None):
+        current = self.bucket.objects.get(self.name, (0,))[0]
+        if if_generation_match is not None and if_generation_match != current: raise PreconditionFailed(self.name)
+        self.bucket.generation += 1
+        self.bucket.objects[self.name] = (self.bucket.generation, bytes(data), datetime.datetime.now(datetime.timezone.utc), content_type)
+        self._load()
+
+    def delete(self):
+        if self.bucket.objects.pop(self.name, None) is None: raise NotFound(self.name)
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}  # name -> (generation, bytes, updated, content_type)
+        self.generation = 0
+        self.listings = 0
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix=""):
+        self.listings += 1
+        blobs = [FakeBlob(self, n) for n in sorted(self.objects) if n.startswith(prefix)]
+        for b in blobs: b._load()
+        return blobs
+
+class FakeStorageClient:
+    def __init__(self):
+        self.buckets = {}
+
+    def bucket(self, name):
+        return self.buckets.setdefault(name, FakeBucket())
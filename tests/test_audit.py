@@ -0,0 +1,81 @@
+import os, threading
+import pytest
+from app import audit
+from app.audit import UNREADABLE, audit_repos, file_record, merkle, scan_tree
+
+@pytest.fixture(autouse=True)
+def fresh_audit(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "_stat_cache", {})
+    monkeypatch.setattr(audit, "_last", {})
+    monkeypatch.setattr(audit, "BACKEND_ROOT", str(tmp_path / "backend"))
+    monkeypatch.setattr(audit, "FRONTEND_ROOT", str(tmp_path / "frontend"))
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+def test_record_counts_lines_like_readlines(tmp_path):
+    assert file_record(write(tmp_path / "a.txt", "one\ntwo"))[1:] == (2, 7)
+    assert file_record(write(tmp_path / "b.txt", "one\n"))[1] == 1
+    assert file_record(tmp_path / "missing.txt") is None
+
+def test_untouched_files_are_not_reread(tmp_path, monkeypatch):
+    path = write(tmp_path / "a.txt", "x\n")
+    first = file_record(path)
+    monkeypatch.setattr(audit, "_digest", lambda *a: pytest.fail("re-read an unchanged file"))
+    assert file_record(path) == first
+
+def test_unreadable_files_are_recorded_not_fatal(tmp_path, monkeypatch):
+    root = tmp_path / "backend"
+    write(root / "ok.py", "x\n"); bad = write(root / "secret.key", "k")
+    digest = audit._digest
+
+    def failing(path, *args):
+        if path == str(bad): raise PermissionError(path)
+        return digest(path, *args)
+
+    monkeypatch.setattr(audit, "_digest", failing)
+    report = audit_repos()
+    assert report["backend"]["files"] == 2 and report["backend"]["unreadable"] == 1
+    assert scan_tree(str(root))["secret.key"] == (UNREADABLE, 0, 1)
+
+def test_runs_are_diffed_against_the_previous_one(tmp_path):
+    root = tmp_path / "backend"
+    write(root / "keep.py", "a\n"); write(root / "edit.py", "b\n"); gone = write(root / "gone.py", "c\n")
+    first = audit_repos()
+    assert first["backend"]["diff"] == {"first_run": True} and first["frontend"]["files"] == 0
+
+    os.remove(gone)
+    edited = write(root / "edit.py", "b changed\n")
+    os.utime(edited, ns=(1, 1))
+    write(root / "pkg" / "new.py", "d\n")
+    second = audit_repos(include_dirs=True)
+    assert second["backend"]["diff"]["added"] == [os.path.join("pkg", "new.py")]
+    assert second["backend"]["diff"]["removed"] == ["gone.py"] and second["backend"]["diff"]["modified"] == ["edit.py"]
+    assert second["backend"]["merkle_root"] != first["backend"]["merkle_root"] and "pkg/" in second["backend"]["dirs"]
+    assert audit_repos()["backend"]["diff"]["counts"] == {"added": 0, "removed": 0, "modified": 0}
+
+def test_scan_prunes_only_its_own_root(tmp_path):
+    a, b = write(tmp_path / "backend" / "a.py", "a"), write(tmp_path / "frontend" / "b.py", "b")
+    audit_repos()
+    os.remove(a)
+    scan_tree(str(tmp_path / "backend"))
+    assert str(a) not in audit._stat_cache and str(b) in audit._stat_cache
+
+def test_merkle_root_depends_on_every_file():
+    root, dirs = merkle({"a.py": ("h1",), os.path.join("src", "b.py"): ("h2",)})
+    assert root == dirs["/"] and "src/" in dirs
+    assert merkle({"a.py": ("h1",), os.path.join("src", "b.py"): ("h3",)})[0] != root
+
+def test_scans_and_file_stats_wait_for_the_cache_lock(tmp_path):
+    root = tmp_path / "backend"
+    write(root / "a.py", "a")
+    results = []
+    with audit._cache_lock:
+        workers = [threading.Thread(target=lambda: results.append(scan_tree(str(root)))), threading.Thread(target=lambda: results.append(audit.get_file_stats(str(root / "a.py"))))]
+        for w in workers: w.start()
+        for w in workers: w.join(0.2)
+        assert results == [] and all(w.is_alive() for w in workers)
+    for w in workers: w.join()
+    assert len(results) == 2
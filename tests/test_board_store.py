@@ -0,0 +1,37 @@
+import asyncio
+from app.board_store import load_papers, save_manifest, save_paper
+
+def board(db, project_id="p1"):
+    return db.docs[f"cofounder_boards/{project_id}"]
+
+def seed(db):
+    db.docs["cofounder_boards/p1"] = {"project_name": "x", "manifest_version": 1}
+    asyncio.run(save_manifest("p1", {"mission_manifesto": {"core_idea": "idea"},
+                                     "the_big_idea": {"headline": "Big", "appendix": ["a1"]},
+                                     "the_mvp": {"headline": "MVP", "appendix": ["m1"]}}))
+
+def test_save_manifest_splits_papers_out_of_the_board(firestore_db):
+    seed(firestore_db)
+    assert board(firestore_db)["vibe_manifest"] == {"mission_manifesto": {"core_idea": "idea"}}
+    assert board(firestore_db)["paper_index"]["the_mvp"]["headline"] == "MVP"
+    assert board(firestore_db)["manifest_version"] == 2
+    assert firestore_db.docs["cofounder_boards/p1/papers/the_mvp"]["appendix"] == ["m1"]
+
+def test_saving_a_paper_without_appendix_keeps_the_stored_one(firestore_db):
+    seed(firestore_db)
+    asyncio.run(save_paper("p1", "the_mvp", {"headline": "MVP v2"}))
+    paper = firestore_db.docs["cofounder_boards/p1/papers/the_mvp"]
+    assert paper["content"] == {"headline": "MVP v2"} and paper["appendix"] == ["m1"]
+    assert board(firestore_db)["manifest_version"] == 3
+
+def test_load_papers_projects_the_appendix_away_unless_asked(firestore_db):
+    seed(firestore_db)
+    assert asyncio.run(load_papers("p1")) == {"the_big_idea": {"headline": "Big"}, "the_mvp": {"headline": "MVP"}}
+    assert asyncio.run(load_papers("p1", include_appendix=True))["the_mvp"] == {"headline": "MVP", "appendix": ["m1"]}
+
+def test_load_papers_point_reads_requested_dept_ids(firestore_db, monkeypatch):
+    seed(firestore_db)
+    streamed = []
+    monkeypatch.setattr(type(firestore_db.collection("x")), "stream", lambda self: streamed.append(self.path))
+    assert asyncio.run(load_papers("p1", {"the_mvp", "the_people"}, include_appendix=True)) == {"the_mvp": {"headline": "MVP", "appendix": ["m1"]}}
+    assert streamed == []
@@ -0,0 +1,39 @@
+import os, asyncio
+import pytest
+from fastapi import HTTPException
+from app import chain
+from test_board_store import seed
+
+@pytest.fixture
+def project(firestore_db):
+    seed(firestore_db)
+    return "p1"
+
+def papers_in(response):
+    return {k: v for k, v in response["vibe_manifest"].items() if k != "mission_manifesto"}
+
+def test_get_project_defaults_to_the_full_board_with_appendices(project):
+    response = asyncio.run(chain.get_project(project))
+    assert papers_in(response) == {"the_big_idea": {"headline": "Big", "appendix": ["a1"]}, "the_mvp": {"headline": "MVP", "appendix": ["m1"]}}
+    assert response["vibe_manifest"]["mission_manifesto"] == {"core_idea": "idea"}
+
+def test_get_project_lighter_views_are_opt_in(project):
+    assert papers_in(asyncio.run(chain.get_project(project, include="board"))) == {}
+    assert papers_in(asyncio.run(chain.get_project(project, include="papers"))) == {"the_big_idea": {"headline": "Big"}, "the_mvp": {"headline": "MVP"}}
+    assert papers_in(asyncio.run(chain.get_project(project, include="the_mvp"))) == {"the_mvp": {"headline": "MVP"}}
+    assert papers_in(asyncio.run(chain.get_project(project, include="the_mvp,appendix"))) == {"the_mvp": {"headline": "MVP", "appendix": ["m1"]}}
+
+def test_workspace_sync_rejects_directories_outside_the_sync_root(tmp_path, monkeypatch):
+    from app import workspace
+    monkeypatch.setattr(workspace, "WORKSPACE_SYNC_ROOT", str(tmp_path))
+    for local_dir in ("/root", "../up", str(tmp_path.parent)):
+        with pytest.raises(HTTPException) as e: asyncio.run(chain.sync_workspace({"thread_id": "t1", "local_dir": local_dir, "direction": "up"}))
+        assert e.value.status_code == 400
+    assert asyncio.run(chain.sync_workspace({"thread_id": "t1", "local_dir": "t1", "direction": "down"})) == {"downloaded": [], "unchanged": 0}
+
+def test_dev_read_rejects_malformed_line_ranges(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(chain.__file__)))
+    for req in ({"start_line": "x"}, {"end_line": -1}, {"start_line": 3, "end_line": 2}):
+        with pytest.raises(HTTPException) as e: asyncio.run(chain.local_read_file({"path": "app/dev_files.py", **req}))
+        assert e.value.status_code == 400
+    assert asyncio.run(chain.local_read_file({"path": "app/dev_files.py", "start_line": 1, "end_line": 1}))["content"].startswith("# [FUNCTIONAL LEDGER")
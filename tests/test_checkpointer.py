@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint, create_checkpoint
+from app import checkpointer as ckpt_mod
+from app.checkpointer import CustomFirestoreSaver, WRITES_IDX_MAP
+
+THREAD = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+
+@pytest.fixture
+def saver(firestore_db, monkeypatch):
+    monkeypatch.setattr(ckpt_mod, "CHECKPOINT_SNAPSHOT_EVERY", 3)
+    return CustomFirestoreSaver(firestore_db, "ck")
+
+async def put_steps(saver, steps, config=THREAD, start=0):
+    checkpoint = empty_checkpoint()
+    for step in range(start, start + steps):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        checkpoint["channel_values"] = {"messages": [f"m{i}" for i in range(step + 1)], "step": step}
+        config = await saver.aput(config, checkpoint, {"step": step}, {"messages": step, "step": step})
+    return config
+
+def docs(db, collection="ck"):
+    return [d for p, d in sorted(db.docs.items()) if p.startswith(f"{collection}/")]
+
+def test_deltas_between_snapshots_and_list_tails(saver, firestore_db):
+    asyncio.run(put_steps(saver, 7))
+    stored = sorted(docs(firestore_db), key=lambda d: d["checkpoint_id"])
+    assert [d["kind"] for d in stored] == ["snapshot", "delta", "delta", "snapshot", "delta", "delta", "snapshot"]
+    assert all(d["serde"] == saver.serde.tag for d in stored)
+    # A delta stores only the appended tail of the message list
+    ops = saver._loads(stored[1], "deltas")
+    assert ops["messages"] == ["extend", ["m1"]] and ops["step"] == ["set", 1]
+
+def test_rebuild_from_a_cold_process_replays_the_chain(saver, firestore_db):
+    asyncio.run(put_steps(saver, 5))
+    cold = CustomFirestoreSaver(firestore_db, "ck")
+    tup = asyncio.run(cold.aget_tuple(THREAD))
+    assert tup.checkpoint["channel_values"] == {"messages": [f"m{i}" for i in range(5)], "step": 4}
+    history = asyncio.run(_collect(cold.alist(THREAD)))
+    assert [h.metadata["step"] for h in history] == [4, 3, 2, 1, 0]
+    assert [len(h.checkpoint["channel_values"]["messages"]) for h in history] == [5, 4, 3, 2, 1]
+    assert cold.get_tuple(THREAD).checkpoint["channel_values"]["step"] == 4
+
+async def _collect(aiter):
+    return [x async for x in aiter]
+
+def test_head_pointer_names_latest_and_is_backfilled_for_legacy_threads(saver, firestore_db):
+    config = asyncio.run(put_steps(saver, 2))
+    head = firestore_db.docs["ck_heads/t1"]
+    assert head["checkpoint_id"] == config["configurable"]["checkpoint_id"]
+
+    del firestore_db.docs["ck_heads/t1"]
+    cold = CustomFirestoreSaver(firestore_db, "ck")
+    assert asyncio.run(cold.aget_tuple(THREAD)).config == config
+    assert cold.stats["head_misses"] == 1
+    assert firestore_db.docs["ck_heads/t1"]["checkpoint_id"] == config["configurable"]["checkpoint_id"]
+
+def test_hot_hits_are_copies(saver):
+    asyncio.run(put_steps(saver, 2))
+    first = asyncio.run(saver.aget_tuple(THREAD))
+    first.checkpoint["channel_values"]["messages"].append("mutated")
+    first.metadata["step"] = 99
+    again = asyncio.run(saver.aget_tuple(THREAD))
+    assert again.checkpoint["channel_values"]["messages"] == ["m0", "m1"] and again.metadata["step"] == 1
+    assert saver.stats["hot_hits"] == 2
+
+def test_hot_entry_is_dropped_when_another_instance_moves_the_head(saver, firestore_db):
+    config = asyncio.run(put_steps(saver, 2))
+    other = CustomFirestoreSaver(firestore_db, "ck")
+    asyncio.run(put_steps(other, 1, config, start=2))
+    assert asyncio.run(saver.aget_tuple(THREAD)).checkpoint["channel_values"]["step"] == 2
+    assert saver.stats["hot_stale"] == 1
+
+    asyncio.run(other.aput_writes(asyncio.run(other.aget_tuple(THREAD)).config, [("messages", "w")], "task-1"))
+    assert asyncio.run(saver.aget_tuple(THREAD)).pending_writes == [("task-1", "messages", "w")]
+
+def test_regular_writes_are_insert_if_absent_and_special_ones_overwrite(saver):
+    config = asyncio.run(put_steps(saver, 1))
+    special = next(iter(WRITES_IDX_MAP))
+    asyncio.run(saver.aput_writes(config, [("a", 1), (special, "first")], "task"))
+    asyncio.run(saver.aput_writes(config, [("a", 2), ("b", 3), (special, "second")], "task"))
+    pending = sorted((ch, v) for _, ch, v in asyncio.run(saver.aget_tuple(config)).pending_writes)
+    assert pending == sorted([("a", 1), ("b", 3), (special, "second")])
+
+    saver.put_writes(config, [("a", 9)], "task")
+    assert ("a", 1) in [(ch, v) for _, ch, v in saver.get_tuple(config).pending_writes]
+
+def test_compact_keeps_newest_and_rematerializes_crossing_deltas(saver, firestore_db):
+    asyncio.run(put_steps(saver, 8))
+    config = asyncio.run(saver.aget_tuple(THREAD)).config
+    asyncio.run(saver.aput_writes(config, [("a", 1)], "task"))
+    before = asyncio.run(_collect(saver.alist(THREAD)))
+    pruned = asyncio.run(saver.compact("t1", keep=4))
+    assert pruned == 4
+    after = asyncio.run(_collect(CustomFirestoreSaver(firestore_db, "ck").alist(THREAD)))
+    assert [a.checkpoint["channel_values"] for a in after] == [b.checkpoint["channel_values"] for b in before[:4]]
+    assert sorted(docs(firestore_db), key=lambda d: d["checkpoint_id"])[0]["kind"] == "snapshot"
+    assert asyncio.run(saver.compact("t1", keep=4)) == 0
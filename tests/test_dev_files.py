@@ -0,0 +1,76 @@
+import pytest
+from app import dev_files
+from app.dev_files import PatchError, apply_patches, locate_hunk, patch_text, read_lines
+
+CODE = "def a():\n    return 1\n\ndef b():\n    return 1\n"
+
+def test_unique_search_block_is_located():
+    start, end = locate_hunk(CODE, {"search": "def b():"}, "h")
+    assert CODE[start:end] == "def b():"
+
+def test_ambiguous_block_needs_an_anchor():
+    with pytest.raises(PatchError) as e: locate_hunk(CODE, {"search": "    return 1"}, "h")
+    assert e.value.status_code == 422 and "matches 2 times" in e.value.detail
+    start, _ = locate_hunk(CODE, {"search": "    return 1", "line": 6}, "h")
+    assert CODE.count("\n", 0, start) + 1 == 5
+
+def test_anchor_equidistant_from_two_matches_is_rejected():
+    with pytest.raises(PatchError, match="no single closest match"):
+        locate_hunk("x = 1\n\n\n\nx = 1\n", {"search": "x = 1", "line": 3}, "h")
+
+def test_missing_or_empty_search_block():
+    with pytest.raises(PatchError, match="not found"): locate_hunk(CODE, {"search": "nope"}, "h")
+    with pytest.raises(PatchError, match="empty"): locate_hunk(CODE, {"search": ""}, "h")
+
+def test_hunks_resolve_against_the_original_and_must_not_overlap():
+    patched = patch_text(CODE, [{"search": "def a():", "replace": "def first():"}, {"search": "def b():", "replace": "def second():"}], "f.py")
+    assert patched == CODE.replace("def a", "def first").replace("def b", "def second")
+    with pytest.raises(PatchError, match="overlap"):
+        patch_text(CODE, [{"search": "def a():\n    return", "replace": ""}, {"search": "return 1\n\ndef b", "replace": ""}], "f.py")
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "one.py").write_text(CODE)
+    (tmp_path / "two.py").write_text("x = 1\n")
+    return tmp_path
+
+def test_batch_is_all_or_nothing_on_validation(tree):
+    with pytest.raises(PatchError):
+        apply_patches([{"path": "one.py", "hunks": [{"search": "def a():", "replace": "def z():"}]},
+                       {"path": "two.py", "hunks": [{"search": "missing", "replace": ""}]}])
+    assert (tree / "one.py").read_text() == CODE
+
+def test_failed_write_restores_files_already_swapped(tree, monkeypatch):
+    real_write, calls = dev_files._atomic_write, []
+
+    def flaky(path, content):
+        calls.append(path.name)
+        if len(calls) == 2: raise OSError("disk full")
+        real_write(path, content)
+
+    monkeypatch.setattr(dev_files, "_atomic_write", flaky)
+    with pytest.raises(PatchError) as e:
+        apply_patches([{"path": "one.py", "hunks": [{"search": "def a():", "replace": "def z():"}]},
+                       {"path": "two.py", "hunks": [{"search": "x = 1", "replace": "x = 2"}]}])
+    assert e.value.status_code == 500 and "1 file(s) restored" in e.value.detail
+    assert (tree / "one.py").read_text() == CODE and (tree / "two.py").read_text() == "x = 1\n"
+
+def test_apply_writes_once_and_leaves_no_temp_files(tree):
+    results = apply_patches([{"path": "one.py", "hunks": [{"search": "    return 1", "replace": "    return 2", "line": 2}]}])
+    assert results == [{"path": "one.py", "hunks": 1, "lines_changed": 1, "lines_after": 6}]
+    assert (tree / "one.py").read_text() == CODE.replace("return 1", "return 2", 1)
+    assert sorted(p.name for p in tree.iterdir()) == ["one.py", "two.py"]
+
+def test_dry_run_writes_nothing(tree):
+    apply_patches([{"path": "two.py", "hunks": [{"search": "x = 1", "replace": "x = 2"}]}], dry_run=True)
+    assert (tree / "two.py").read_text() == "x = 1\n"
+
+def test_read_lines_range(tree):
+    assert read_lines(tree / "one.py", 4, 5) == {"content": "def b():\n    return 1\n", "start_line": 4, "end_line": 5}
+    assert read_lines(tree / "one.py", "4", None)["start_line"] == 4
+
+def test_malformed_line_ranges_are_400s(tree):
+    for start, end in (("abc", None), (0, None), (None, -1), (True, 2), (2.5, None), (5, 4)):
+        with pytest.raises(PatchError) as e: read_lines(tree / "one.py", start, end)
+        assert e.value.status_code == 400
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.agency import history as history_mod
+from app.agency.history import HistoryManager, context_messages, turn_tokens
+
+class FakeSummarizer:
+    def __init__(self, fail=False):
+        self.calls, self.fail = [], fail
+
+    async def ainvoke(self, messages):
+        if self.fail: raise RuntimeError("vertex unavailable")
+        self.calls.append(messages[1].content)
+        return type("Res", (), {"content": f"summary #{len(self.calls)}"})()
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    llm = FakeSummarizer()
+    monkeypatch.setattr(history_mod, "get_llm", lambda *a, **k: llm)
+    return llm
+
+def chat(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "x" * 76} for i in range(n)]
+
+def test_short_history_is_sent_verbatim(summarizer):
+    manager = HistoryManager(budget=1000, keep_turns=2)
+    window = asyncio.run(manager.window("p1", chat(4), ["exact words"]))
+    assert window["turns"] == chat(4) and window["summary"] == "" and summarizer.calls == []
+    assert window["pinned_quotes"] == ["exact words"]
+    assert window["tokens"] == sum(turn_tokens(t) for t in chat(4))
+
+def test_overflow_folds_down_to_the_target_and_persists(summarizer, firestore_db):
+    manager = HistoryManager(budget=100, keep_turns=2, fold_target=0.5)
+    history = chat(6)  # 24 tokens per turn
+    window = asyncio.run(manager.window("p1", history))
+    assert window["summary"] == "summary #1" and window["turns"] == history[4:]
+    assert "turn 0" in summarizer.calls[0] and "turn 3" in summarizer.calls[0]
+    assert firestore_db.docs["cofounder_boards/p1/memory/history"]["covered"] == 4
+    assert context_messages(window)[0].content.endswith("summary #1")
+
+def test_later_turns_reuse_the_summary_until_the_budget_overflows_again(summarizer):
+    manager = HistoryManager(budget=100, keep_turns=2, fold_target=0.5)
+    history = chat(6)
+    asyncio.run(manager.window("p1", history))
+    history += chat(8)[6:]
+    window = asyncio.run(manager.window("p1", history))
+    assert len(summarizer.calls) == 1 and window["turns"] == history[4:]
+
+def test_cold_process_loads_the_persisted_summary(summarizer):
+    history = chat(6)
+    asyncio.run(HistoryManager(budget=100, keep_turns=2, fold_target=0.5).window("p1", history))
+    window = asyncio.run(HistoryManager(budget=100, keep_turns=2, fold_target=0.5).window("p1", history))
+    assert window["summary"] == "summary #1" and len(summarizer.calls) == 1
+
+def test_edited_history_rebuilds_the_summary(summarizer):
+    manager = HistoryManager(budget=100, keep_turns=2, fold_target=0.5)
+    history = chat(6)
+    asyncio.run(manager.window("p1", history))
+    edited = [{"role": "user", "content": "rewritten"}] + history[1:]
+    window = asyncio.run(manager.window("p1", edited))
+    assert manager.stats["resets"] == 1 and len(summarizer.calls) == 2 and "rewritten" in summarizer.calls[1]
+    assert window["turns"] == edited[4:]
+
+def test_summarizer_failure_sends_the_unfolded_tail(monkeypatch, firestore_db):
+    monkeypatch.setattr(history_mod, "get_llm", lambda *a, **k: FakeSummarizer(fail=True))
+    manager = HistoryManager(budget=100, keep_turns=2, fold_target=0.5)
+    window = asyncio.run(manager.window("p1", chat(6)))
+    assert window["turns"] == chat(6) and window["summary"] == ""
+    assert manager.stats["fold_errors"] == 1
+    assert "cofounder_boards/p1/memory/history" not in firestore_db.docs
+
+def test_decorated_turns_do_not_reset_the_summary(summarizer):
+    manager = HistoryManager(budget=100, keep_turns=2, fold_target=0.5)
+    history = chat(6)
+    asyncio.run(manager.window("p1", history))
+    decorated = [{**t, "id": f"msg-{i}", "ts": 1700000000 + i} for i, t in enumerate(history + chat(7)[6:])]
+    window = asyncio.run(manager.window("p1", decorated))
+    assert manager.stats["resets"] == 0 and len(summarizer.calls) == 1 and window["turns"] == decorated[4:]
@@ -0,0 +1,36 @@
+import asyncio
+from types import SimpleNamespace
+from app.agency.hound import GroundingCache, prompt_key
+
+class FakeHound:
+    def __init__(self, *answers):
+        self.answers, self.calls = list(answers), 0
+
+    async def generate_content_async(self, prompt, tools=None):
+        self.calls += 1
+        await asyncio.sleep(0)
+        chunks = [SimpleNamespace(web=SimpleNamespace(title=t, uri=f"https://{t}.example")) for t in self.answers.pop(0)]
+        return SimpleNamespace(candidates=[SimpleNamespace(grounding_metadata=SimpleNamespace(grounding_chunks=chunks))])
+
+def test_identical_prompts_share_one_grounded_call():
+    hound, cache = FakeHound(["a"]), GroundingCache()
+
+    async def main():
+        return await asyncio.gather(cache.search("Market size?", hound, None), cache.search("  market   SIZE? ", hound, None))
+
+    assert asyncio.run(main()) == [[{"title": "a", "uri": "https://a.example"}]] * 2
+    assert asyncio.run(cache.search("market size?", hound, None)) == [{"title": "a", "uri": "https://a.example"}]
+    assert hound.calls == 1 and cache.stats["coalesced"] == 1 and cache.stats["hits"] == 1
+
+def test_empty_grounding_is_not_cached(firestore_db):
+    hound, cache = FakeHound([], ["b"]), GroundingCache(persist=True)
+    assert asyncio.run(cache.search("q", hound, None)) == []
+    assert cache.stats["empty"] == 1 and f"hound_cache/{prompt_key('q')}" not in firestore_db.docs
+    assert asyncio.run(cache.search("q", hound, None)) == [{"title": "b", "uri": "https://b.example"}]
+    assert hound.calls == 2 and firestore_db.docs[f"hound_cache/{prompt_key('q')}"]["chunks"]
+
+def test_persisted_empty_entry_counts_as_a_miss(firestore_db):
+    firestore_db.docs[f"hound_cache/{prompt_key('q')}"] = {"chunks": [], "expires_at": 4e9}
+    hound = FakeHound(["c"])
+    assert asyncio.run(GroundingCache(persist=True).search("q", hound, None)) == [{"title": "c", "uri": "https://c.example"}]
+    assert hound.calls == 1
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from app.agency import jobs
+from app.agency.jobs import JobRunner, get_job, lease_expired
+
+def ago(seconds):
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+async def noop(*args):
+    return {"ok": True}
+
+def lock_of(db, project_id="p1"):
+    return db.docs.get(f"design_job_locks/{project_id}")
+
+def test_lock_and_job_doc_are_written_together(firestore_db):
+    job_id, deduplicated = asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop))
+    assert not deduplicated and lock_of(firestore_db)["job_id"] == job_id
+    job = firestore_db.docs[f"design_jobs/{job_id}"]
+    assert job["status"] == "queued" and not lease_expired(job)
+
+def test_concurrent_submits_queue_one_job():
+    async def main():
+        runner = JobRunner(workers=0)
+        return await asyncio.gather(*(runner.submit("p1", "strike_team", noop) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len({job_id for job_id, _ in results}) == 1 and [d for _, d in results].count(False) == 1
+
+def test_live_lease_deduplicates(firestore_db):
+    firestore_db.docs["design_job_locks/p1"] = {"job_id": "old", "created_at": ago(5)}
+    firestore_db.docs["design_jobs/old"] = {"job_id": "old", "kind": "strike_team", "status": "running", "expires_at": ago(-60)}
+    assert asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop)) == ("old", True)
+
+def test_expired_lease_is_failed_and_the_lock_taken_over(firestore_db):
+    firestore_db.docs["design_job_locks/p1"] = {"job_id": "old", "created_at": ago(600)}
+    firestore_db.docs["design_jobs/old"] = {"job_id": "old", "kind": "strike_team", "status": "running", "expires_at": ago(1)}
+    job_id, deduplicated = asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop))
+    assert not deduplicated and job_id != "old" and lock_of(firestore_db)["job_id"] == job_id
+    assert firestore_db.docs["design_jobs/old"]["status"] == "failed" and firestore_db.docs["design_jobs/old"]["error"] == "lease expired"
+    assert firestore_db.docs[f"design_jobs/{job_id}"]["status"] == "queued"
+
+def test_lease_less_job_counts_as_expired(firestore_db):
+    firestore_db.docs["design_job_locks/p1"] = {"job_id": "old", "created_at": ago(5)}
+    firestore_db.docs["design_jobs/old"] = {"job_id": "old", "kind": "strike_team", "status": "queued"}
+    assert asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop))[1] is False
+
+def test_fresh_lock_without_job_doc_is_live_until_its_lease_runs_out(firestore_db):
+    firestore_db.docs["design_job_locks/p1"] = {"job_id": "pending", "created_at": ago(5)}
+    assert asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop)) == ("pending", True)
+    firestore_db.docs["design_job_locks/p1"]["created_at"] = ago(jobs.JOB_LEASE_SECONDS + 1)
+    job_id, deduplicated = asyncio.run(JobRunner(workers=0).submit("p1", "strike_team", noop))
+    assert not deduplicated and lock_of(firestore_db)["job_id"] == job_id
+
+def test_concurrent_takeover_loses_the_precondition_and_dedupes(firestore_db, monkeypatch):
+    firestore_db.docs["design_job_locks/p1"] = {"job_id": "old", "created_at": ago(600)}
+    firestore_db.docs["design_jobs/old"] = {"job_id": "old", "kind": "strike_team", "status": "running", "expires_at": ago(1)}
+    runner, real_get_job, raced = JobRunner(workers=0), jobs.get_job, []
+
+    async def get_job_then_race(job_id):
+        job = await real_get_job(job_id)
+        if not raced:
+            # Another instance takes the lock between our read and our conditional update
+            raced.append(None)
+            raced[0] = await JobRunner(workers=0).submit("p1", "strike_team", noop)
+        return job
+
+    monkeypatch.setattr(jobs, "get_job", get_job_then_race)
+    job_id, deduplicated = asyncio.run(runner.submit("p1", "strike_team", noop))
+    assert deduplicated and job_id == raced[0][0] == lock_of(firestore_db)["job_id"]
+
+def test_worker_runs_the_job_releases_the_lock_and_heartbeat_renews(firestore_db, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.01)
+    async def main():
+        release = asyncio.Event()
+        async def slow(x):
+            await release.wait()
+            return {"x": x}
+        runner = JobRunner(workers=1)
+        job_id, _ = await runner.submit("p1", "strike_team", slow, 7)
+        firestore_db.docs[f"design_jobs/{job_id}"]["expires_at"] = ago(1)
+        await asyncio.sleep(0.05)
+        renewed = not lease_expired(await get_job(job_id))
+        release.set()
+        await runner._queue.join()
+        return job_id, renewed, runner.snapshot()
+
+    job_id, renewed, snapshot = asyncio.run(main())
+    assert renewed and snapshot["leased"] == 0
+    assert firestore_db.docs[f"design_jobs/{job_id}"]["status"] == "done" and firestore_db.docs[f"design_jobs/{job_id}"]["result"] == {"x": 7}
+    assert lock_of(firestore_db) is None
@@ -0,0 +1,63 @@
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from app.agency import llm_cache
+from app.agency.llm_cache import LLMCacheMiss, SQLiteResponseCache
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "llm.sqlite3")
+
+def model(cache, responses=("first", "second", "third")):
+    return FakeListChatModel(responses=list(responses), cache=cache)
+
+def test_hit_serves_the_stored_response(path):
+    cache = SQLiteResponseCache(path)
+    llm = model(cache)
+    assert llm.invoke("hello").content == "first"
+    assert llm.invoke("hello").content == "first"
+    assert llm.invoke("other").content == "second"
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2 and cache.stats["writes"] == 2
+
+def test_expired_entries_are_misses(path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = SQLiteResponseCache(path, ttl=60)
+    llm = model(cache)
+    llm.invoke("hello")
+    clock[0] += 61
+    assert llm.invoke("hello").content == "second"
+    assert cache.stats["expired"] == 1 and cache.stats["hits"] == 0
+
+def test_trim_evicts_least_recently_used_past_max_bytes(path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = SQLiteResponseCache(path)
+    llm = model(cache, [f"answer {i}" for i in range(3)])
+    for prompt in ("a", "b", "c"):
+        llm.invoke(prompt); clock[0] += 1
+    llm.invoke("a")  # refresh "a": "b" is now the oldest
+    sizes = dict(cache._conn.execute("SELECT key, size FROM responses").fetchall())
+    cache.max_bytes = sum(sizes.values()) - 1
+    cache._trim(clock[0])
+    assert cache.stats["evicted"] == 1
+    cache.replay = True
+    assert llm.invoke("a").content == "answer 0" and llm.invoke("c").content == "answer 2"
+    with pytest.raises(LLMCacheMiss): llm.invoke("b")
+
+def test_trim_runs_every_n_writes(path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_TRIM_EVERY", 2)
+    cache = SQLiteResponseCache(path, max_bytes=0)
+    llm = model(cache, ["x", "y"])
+    llm.invoke("a")
+    assert cache.snapshot()["entries"] == 1
+    llm.invoke("b")
+    assert cache.snapshot()["entries"] == 0 and cache.stats["evicted"] == 2
+
+def test_replay_serves_recordings_and_raises_on_a_miss(path):
+    llm = model(SQLiteResponseCache(path))
+    llm.invoke("recorded")
+    replay = SQLiteResponseCache(path, replay=True)
+    llm.cache = replay
+    assert llm.invoke("recorded").content == "first"
+    with pytest.raises(LLMCacheMiss): llm.invoke("never recorded")
+    assert replay.snapshot()["entries"] == 1 and replay.stats["writes"] == 0
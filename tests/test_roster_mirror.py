@@ -0,0 +1,71 @@
+import asyncio
+from app.agency.roster_mirror import DEFAULT_AGENT, RosterMirror, deep_merge
+
+def seed(db):
+    db.docs["agency_roster/pm"] = {"model_tier": "PRO", "dept_id": "PRODUCT", "tools": {"search": True}}
+    db.docs["department_registry/PRODUCT"] = {"lens_profile": "Product lens."}
+    db.docs["agency_settings/global_config"] = {"rules": "Be brief."}
+
+def test_deep_merge_merges_nested_maps_without_mutating():
+    base = {"a": 1, "tools": {"search": True, "code": False}}
+    assert deep_merge(base, {"tools": {"code": True}, "b": 2}) == {"a": 1, "b": 2, "tools": {"search": True, "code": True}}
+    assert base["tools"] == {"search": True, "code": False}
+
+def test_cold_load_then_resolve_without_io(firestore_db):
+    seed(firestore_db)
+    mirror = RosterMirror()
+    asyncio.run(mirror.ensure_fresh())
+    firestore_db.docs.clear()
+    assert mirror.resolve("pm") == ({"model_tier": "PRO", "dept_id": "PRODUCT", "tools": {"search": True}}, {"lens_profile": "Product lens."}, "Be brief.")
+    assert mirror.resolve("unknown")[0] == DEFAULT_AGENT
+
+def test_refresh_that_raced_a_local_put_is_discarded(firestore_db, monkeypatch):
+    seed(firestore_db)
+    mirror = RosterMirror()
+    asyncio.run(mirror.ensure_fresh())
+    scan = RosterMirror._scan
+
+    async def racing_scan(collection):
+        rows = await scan(collection)
+        # The handler's write-through lands while the scan is in flight; Firestore has not caught up yet
+        if collection == "agency_roster": mirror.put_agent("pm", {"tools": {"code": True}})
+        return rows
+
+    monkeypatch.setattr(mirror, "_scan", racing_scan)
+    assert asyncio.run(mirror.refresh()) is False
+    assert mirror.resolve("pm")[0]["tools"] == {"search": True, "code": True}
+
+    monkeypatch.setattr(mirror, "_scan", scan)
+    firestore_db.docs["agency_roster/pm"]["tools"]["code"] = True
+    assert asyncio.run(mirror.refresh()) is True
+    assert mirror.resolve("pm")[0]["tools"] == {"search": True, "code": True}
+
+def test_cold_load_retries_until_a_refresh_sticks(firestore_db, monkeypatch):
+    seed(firestore_db)
+    mirror = RosterMirror()
+    scan, calls = RosterMirror._scan, []
+
+    async def racing_once(collection):
+        if collection == "agency_roster" and not calls:
+            calls.append(collection)
+            mirror.invalidate()
+        return await scan(collection)
+
+    monkeypatch.setattr(mirror, "_scan", racing_once)
+    asyncio.run(mirror.ensure_fresh())
+    assert mirror.loaded_at is not None and mirror.resolve("pm")[0]["model_tier"] == "PRO"
+
+def test_stale_mirror_serves_while_one_background_refresh_runs(firestore_db):
+    seed(firestore_db)
+
+    async def main():
+        mirror = RosterMirror(ttl=0)
+        await mirror.ensure_fresh()
+        firestore_db.docs["agency_roster/pm"]["model_tier"] = "FLASH"
+        await mirror.ensure_fresh(); task = mirror._refresh_task
+        await mirror.ensure_fresh()
+        assert mirror._refresh_task is task and mirror.resolve("pm")[0]["model_tier"] == "PRO"
+        await task
+        return mirror.resolve("pm")[0]["model_tier"]
+
+    assert asyncio.run(main()) == "FLASH"
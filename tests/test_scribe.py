@@ -0,0 +1,36 @@
+import asyncio
+from app.agency.scribe import SCRIBE_SKIP_MIN_CHARS, ScribeCursor, can_skip, gate_missing, merge_extraction
+
+FULL_GATE = {"founder_frustration": "spreadsheets everywhere", "competitor_belief": "incumbents ignore solo shops",
+             "business_model": "monthly subscription per seat", "success_sentence": "ten paying teams by spring"}
+
+def test_merge_overwrites_strings_and_unions_lists():
+    current = {"core_idea": "old idea", "target_user": "bakers", "verbatim_quotes": ["a", "b"], "problem_statement": "kept"}
+    merged = merge_extraction(current, {"core_idea": "new idea", "verbatim_quotes": ["b", "c"], "emotional_drivers": ["pride"]})
+    assert merged["core_idea"] == "new idea" and merged["target_user"] == "bakers"
+    assert merged["verbatim_quotes"] == ["a", "b", "c"] and merged["emotional_drivers"] == ["pride"]
+    assert current["verbatim_quotes"] == ["a", "b"] and current["core_idea"] == "old idea"
+
+def test_merge_ignores_empty_values_and_problem_statement():
+    current = {"core_idea": "idea", "verbatim_quotes": ["a"], "problem_statement": "derived"}
+    merged = merge_extraction(current, {"core_idea": "", "verbatim_quotes": [], "target_user": None, "problem_statement": "overwritten?"})
+    assert merged == current
+
+def test_gate_missing_lists_short_fields():
+    assert gate_missing(FULL_GATE) == []
+    assert gate_missing({**FULL_GATE, "business_model": "ads"}) == ["business model"]
+
+def test_can_skip_only_while_the_gate_is_red_and_the_founder_said_little():
+    short = [{"role": "user", "content": "ok " + " " * 40}, {"role": "assistant", "content": "x" * 200}]
+    assert can_skip({}, short)
+    assert not can_skip(FULL_GATE, short)
+    assert not can_skip({}, [{"role": "user", "content": "y" * SCRIBE_SKIP_MIN_CHARS}])
+
+def test_cursor_advances_and_resets_on_edited_history(firestore_db):
+    cursor = ScribeCursor()
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert asyncio.run(cursor.pending("p1", history)) == 0
+    asyncio.run(cursor.advance("p1", history))
+    assert asyncio.run(ScribeCursor().pending("p1", history + [{"role": "user", "content": "more"}])) == 2
+    assert asyncio.run(cursor.pending("p1", [{"role": "user", "content": "edited"}] + history[1:])) == 0
+    assert cursor.stats["resets"] == 1
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from app.agency import single_flight
+from app.agency.single_flight import flight_key, follow, lead, land, await_flight
+
+def test_flight_key_splits_on_every_input():
+    base = flight_key("p", "hi", "pm", "[]")
+    assert base == flight_key("p", "hi", "pm", "[]")
+    assert len({base, flight_key("q", "hi", "pm", "[]"), flight_key("p", "ho", "pm", "[]"), flight_key("p", "hi", "cfo", "[]"), flight_key("p", "hi", "pm", "[1]")}) == 5
+
+def test_duplicates_coalesce_onto_one_run():
+    runs = []
+
+    async def turn(key):
+        follower = follow(key)
+        if follower is not None: return await await_flight(follower)
+        flight = lead(key)
+        try:
+            runs.append(key)
+            await asyncio.sleep(0.01)
+            land(key, flight, {"answer": 42})
+            return {"answer": 42}
+        finally:
+            land(key, flight, error=RuntimeError("no result"))
+
+    async def main():
+        key = flight_key("p", "hi", None, None)
+        return await asyncio.gather(*(turn(key) for _ in range(5)))
+
+    before = dict(single_flight.STATS)
+    assert asyncio.run(main()) == [{"answer": 42}] * 5
+    assert len(runs) == 1
+    assert single_flight.STATS["coalesced"] - before["coalesced"] == 4
+    assert single_flight._flights == {}
+
+def test_leader_error_reaches_followers_and_flight_is_released():
+    async def main():
+        key = flight_key("p", "boom", None, None)
+        flight = lead(key)
+        follower = follow(key)
+        land(key, flight, error=ValueError("pipeline failed"))
+        with pytest.raises(ValueError): await await_flight(follower)
+        assert follow(key) is None
+
+    asyncio.run(main())
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    async def main():
+        key = flight_key("p", "slow", None, None)
+        flight = lead(key)
+        waiter = asyncio.ensure_future(await_flight(follow(key)))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert not flight.cancelled()
+        land(key, flight, "done")
+        assert await flight == "done"
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio, json, uuid
+import pytest
+from langchain_core.messages import AIMessage
+from app import state_writer
+from app.agency import architect
+from app.agency.departments.strategy.schemas import ScribeOutput
+from fakes import fake_async_transactional
+
+PERSISTED = {"core_idea": "Farm ledger", "target_user": "dairy farmers", "founder_frustration": "reconciling invoices by hand every week"}
+
+class FakeScribe:
+    def __init__(self, output):
+        self.output = output
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0.01)
+        return self.output
+
+class FakePM:
+    def __init__(self, scribe_output):
+        self.prompts, self.scribe = [], FakeScribe(scribe_output)
+
+    def with_structured_output(self, schema):
+        return self.scribe
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        await asyncio.sleep(0)
+        return AIMessage(content=f"pm answer #{len(self.prompts)}")
+
+@pytest.fixture
+def run_turn(firestore_db, monkeypatch):
+    monkeypatch.setattr(architect, "SPECULATIVE_PM", True)
+    monkeypatch.setattr(state_writer.firestore, "async_transactional", fake_async_transactional)
+
+    def run(extracted, whisper="Ask about pricing."):
+        project_id = f"p-{uuid.uuid4().hex[:8]}"
+        firestore_db.docs[f"cofounder_boards/{project_id}"] = {"manifest_version": 1, "vibe_manifest": {"mission_manifesto": dict(PERSISTED)}}
+        llm = FakePM(ScribeOutput(mission_manifesto=extracted, whisper=whisper))
+
+        async def agent(agent_id):
+            return {"llm": llm, "system_prompt": "You are a PM."}, {}
+
+        monkeypatch.setattr(architect, "get_agent_and_dept", agent)
+
+        async def collect():
+            return [e async for e in architect._design_pipeline("We sell it for forty dollars a month per farm.", project_id, None, json.dumps([]))]
+
+        events = asyncio.run(collect())
+        stages = {p["stage"]: p for e, p in events if e == "stage"}
+        return stages, events[-1][1], llm
+
+    return run
+
+def test_scribe_changes_the_pm_never_sees_keep_the_speculative_turn(run_turn):
+    stages, final, llm = run_turn({"verbatim_quotes": ["I want my Sunday back."], "emotional_drivers": ["pride"]})
+    assert stages["SPECULATIVE_PM"]["hit"] is True and len(llm.prompts) == 1
+    assert final["user_message"] == "pm answer #1" and final["manifesto"]["verbatim_quotes"] == ["I want my Sunday back."]
+    assert final["whisper"] == "Ask about pricing."
+
+def test_rendered_vision_change_reissues_the_pm(run_turn):
+    stages, final, llm = run_turn({"business_model": "forty dollars a month per farm"})
+    assert stages["SPECULATIVE_PM"]["hit"] is False and len(llm.prompts) == 2
+    assert "forty dollars a month per farm" in llm.prompts[1][2].content and "Ask about pricing." in llm.prompts[1][1].content
+    assert final["user_message"] == "pm answer #2"
+
+def test_missing_whisper_falls_back_to_the_default(run_turn):
+    assert run_turn({}, whisper=None)[1]["whisper"] == "Focus on the discovery."
@@ -0,0 +1,57 @@
+import asyncio
+from google.cloud import firestore
+from app import state_writer
+from app.state_writer import ManifestWriter, WRITE_STATS, field_path_diff, rebase_manifesto
+from fakes import fake_async_transactional
+
+def test_field_path_diff_recurses_into_maps_and_deletes_removed_keys():
+    before = {"a": 1, "nested": {"x": 1, "y": 2}, "gone": True, "same": [1]}
+    after = {"a": 2, "nested": {"x": 1, "y": 3, "z": 4}, "same": [1]}
+    payload = field_path_diff(before, after, ("vibe_manifest", "m"))
+    assert payload == {"vibe_manifest.m.a": 2, "vibe_manifest.m.nested.y": 3, "vibe_manifest.m.nested.z": 4, "vibe_manifest.m.gone": firestore.DELETE_FIELD}
+
+def test_field_path_diff_quotes_unsafe_keys():
+    assert list(field_path_diff({}, {"has space": 1})) == ["`has space`"]
+
+def test_field_path_diff_replaces_lists_whole():
+    assert field_path_diff({"l": [1, 2]}, {"l": [1, 2, 3]}) == {"l": [1, 2, 3]}
+
+def test_rebase_unions_lists_both_sides_grew_and_keeps_remote_only_fields():
+    baseline = {"idea": "a", "quotes": ["q1"]}
+    ours = {"idea": "b", "quotes": ["q1", "q2"]}
+    remote = {"idea": "a", "quotes": ["q1", "q3"], "target_user": "farmers"}
+    merged, conflicts = rebase_manifesto(baseline, ours, remote)
+    assert merged == {"idea": "b", "quotes": ["q1", "q3", "q2"], "target_user": "farmers"}
+    assert conflicts == ["quotes"]
+
+def test_rebase_ours_wins_on_scalar_conflict_and_deletions_apply():
+    merged, conflicts = rebase_manifesto({"a": 1, "b": 1}, {"a": 2}, {"a": 3, "b": 1})
+    assert merged == {"a": 2} and conflicts == ["a"]
+
+def _board(db, project_id="p1"):
+    return db.docs.get(f"cofounder_boards/{project_id}")
+
+def test_commit_writes_only_changed_paths_and_bumps_version(firestore_db, monkeypatch):
+    monkeypatch.setattr(state_writer.firestore, "async_transactional", fake_async_transactional)
+    firestore_db.docs["cofounder_boards/p1"] = {"manifest_version": 4, "vibe_manifest": {"mission_manifesto": {"a": 1, "b": 2}}, "project_name": "x"}
+    writer = ManifestWriter(firestore_db, "p1", {"a": 1, "b": 2}, 4)
+    stored = asyncio.run(writer.commit({"a": 1, "b": 3}))
+    assert stored == {"a": 1, "b": 3}
+    assert _board(firestore_db) == {"manifest_version": 5, "vibe_manifest": {"mission_manifesto": {"a": 1, "b": 3}}, "project_name": "x"}
+    assert writer.version == 5 and writer.metrics["fields"] == 2  # b + manifest_version
+
+def test_commit_rebases_on_concurrent_write_and_counts_conflict_once(firestore_db, monkeypatch):
+    # Two transaction attempts (the first "aborted"): the conflict must still be counted once
+    monkeypatch.setattr(state_writer.firestore, "async_transactional", lambda fn: fake_async_transactional(fn, attempts=2))
+    firestore_db.docs["cofounder_boards/p1"] = {"manifest_version": 2, "vibe_manifest": {"mission_manifesto": {"a": 1, "quotes": ["q1", "client"]}}}
+    writer = ManifestWriter(firestore_db, "p1", {"a": 1, "quotes": ["q1"]}, 1)
+    before = WRITE_STATS["conflicts"]
+    stored = asyncio.run(writer.commit({"a": 2, "quotes": ["q1", "scribe"]}))
+    assert stored == {"a": 2, "quotes": ["q1", "client", "scribe"]}
+    assert _board(firestore_db)["manifest_version"] == 3
+    assert writer.metrics["conflicts"] == 1 and WRITE_STATS["conflicts"] == before + 1
+
+def test_unchanged_commit_is_skipped(firestore_db):
+    writer = ManifestWriter(firestore_db, "p1", {"a": 1}, 1)
+    assert asyncio.run(writer.commit({"a": 1})) == {"a": 1}
+    assert _board(firestore_db) is None
@@ -0,0 +1,22 @@
+import json, uuid
+import pytest
+from app.tools import list_files, read_file, read_files, write_file, write_files
+from app.workspace import get_index
+
+@pytest.fixture
+def thread_id():
+    return f"t-{uuid.uuid4().hex[:8]}"
+
+def test_every_tool_normalizes_paths_onto_one_index_entry(thread_id, bucket):
+    for path in ("./a.md", "a.md", "docs//b.md"):
+        write_file.invoke({"thread_id": thread_id, "path": path, "content": path})
+    write_files.invoke({"thread_id": thread_id, "files": {"docs/./c.md": "c"}})
+    assert [p for p, _ in get_index(thread_id).query()] == ["a.md", "docs/b.md", "docs/c.md"]
+    assert read_file.invoke({"thread_id": thread_id, "path": "./a.md"}) == "a.md"
+    assert json.loads(read_files.invoke({"thread_id": thread_id, "paths": ["docs//b.md", "../x"]})) == {"docs//b.md": "docs//b.md", "../x": None}
+    assert list_files.invoke({"thread_id": thread_id, "path": "./docs/"}) == "docs/b.md\ndocs/c.md"
+
+def test_every_tool_rejects_escaping_paths(thread_id, bucket):
+    for tool, args in ((write_file, {"path": "../x.md", "content": "x"}), (read_file, {"path": "/etc/passwd"}), (list_files, {"path": "../"})):
+        assert tool.invoke({"thread_id": thread_id, **args}).startswith("Rejected unsafe path")
+    assert bucket.objects == {}
@@ -0,0 +1,98 @@
+import os, json, uuid
+import pytest
+from app import workspace
+from app.workspace import INDEX_NAME, WORKSPACE, WorkspaceCache, WorkspaceIndex, _commit_index, clean_path, get_index, record_writes, sync_dir, sync_down, sync_up, write_many
+
+@pytest.fixture
+def thread_id():
+    return f"t-{uuid.uuid4().hex[:8]}"
+
+def test_index_query_by_prefix_glob_and_size():
+    index = WorkspaceIndex.from_entries({"src/a.ts": {"size": 10, "hash": "h1", "updated": 5.0}, "src/b.md": {"size": 1, "hash": "h2", "updated": 1.0}, "README.md": {"size": 3, "hash": "h3", "updated": 9.0}})
+    assert [p for p, _ in index.query("src/")] == ["src/a.ts", "src/b.md"]
+    assert [p for p, _ in index.query(pattern="*.md")] == ["README.md", "src/b.md"]
+    assert [p for p, _ in index.query(changed_since=2.0, min_size=2)] == ["README.md", "src/a.ts"]
+    assert WorkspaceIndex(json.loads(index.encode())).entries() == index.entries()
+
+def test_writes_merge_into_the_index_without_listing_the_bucket(thread_id, bucket):
+    write_many(thread_id, {"a.txt": b"1", "dir/b.txt": b"22"})
+    listings = bucket.listings
+    record_writes(thread_id, [WORKSPACE.write(thread_id, "c.txt", b"333")])
+    assert [p for p, _ in get_index(thread_id).query()] == ["a.txt", "c.txt", "dir/b.txt"]
+    assert bucket.listings == listings
+
+def test_concurrent_index_commit_retries_on_generation_conflict(thread_id, bucket):
+    write_many(thread_id, {"a.txt": b"1"})
+    theirs = WORKSPACE.write(thread_id, "theirs.txt", b"2")
+    raced = []
+
+    def ours(index):
+        if not raced:
+            # Another writer commits between our read and our conditional upload
+            raced.append(True)
+            record_writes(thread_id, [theirs])
+        return index.merged({"ours.txt": {"size": 1, "hash": "x", "updated": 0.0}})
+
+    result = _commit_index(thread_id, ours)
+    assert [p for p, _ in result.query()] == ["a.txt", "ours.txt", "theirs.txt"]
+    assert [p for p, _ in get_index(thread_id).query()] == ["a.txt", "ours.txt", "theirs.txt"]
+
+def test_contended_index_is_dropped_and_rebuilt_from_the_bucket(thread_id, bucket, monkeypatch):
+    write_many(thread_id, {"a.txt": b"1"})
+    monkeypatch.setattr(workspace, "INDEX_COMMIT_RETRIES", 2)
+
+    def always_raced(index):
+        bucket.blob(f"{thread_id}/{INDEX_NAME}").upload_from_string(index.encode())
+        return index
+
+    assert _commit_index(thread_id, always_raced) is None
+    assert f"{thread_id}/{INDEX_NAME}" not in bucket.objects
+    assert [p for p, _ in get_index(thread_id).query()] == ["a.txt"]
+
+def test_cache_serves_304s_and_sees_new_generations(thread_id, bucket, tmp_path):
+    cache = WorkspaceCache(root=str(tmp_path))
+    cache.write(thread_id, "f.txt", b"v1")
+    assert cache.read(thread_id, "f.txt") == b"v1"
+    bucket.blob(f"{thread_id}/f.txt").upload_from_string(b"v2")
+    assert cache.read(thread_id, "f.txt") == b"v2"
+    assert cache.read(thread_id, "missing.txt") is None
+    assert cache.snapshot()["threads"][thread_id] == {"hits": 1, "misses": 1, "not_found": 1, "writes": 1, "bytes_saved": 2}
+
+def test_cache_stats_are_bounded(thread_id, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "WORKSPACE_STATS_THREADS", 2)
+    cache = WorkspaceCache(root=str(tmp_path))
+    for t in ("t1", "t2", "t3"): cache.write(t, "f", b"x")
+    assert list(cache.stats) == ["t2", "t3"]
+
+def test_unsafe_paths_are_rejected():
+    assert clean_path("./src/../a.txt") == "a.txt"
+    assert [clean_path(p) for p in ("../x", "/etc/passwd", "a/../../x", "", ".")] == [None] * 5
+
+def test_write_many_skips_escaping_paths(thread_id, bucket):
+    assert set(write_many(thread_id, {"ok.txt": b"1", "../other/x.txt": b"2"})) == {"ok.txt"}
+    assert not any("other" in name for name in bucket.objects)
+
+def test_sync_round_trip_is_confined_to_local_dir(thread_id, bucket, tmp_path):
+    up, down = tmp_path / "up", tmp_path / "down"
+    (up / "sub").mkdir(parents=True)
+    (up / "notes.tmp").write_text("user file")
+    (up / "sub" / "logo.png").write_bytes(b"\x89PNG\r\n")
+    (tmp_path / "secret.txt").write_text("outside")
+    os.symlink(tmp_path / "secret.txt", up / "link.txt")
+
+    assert sync_up(thread_id, str(up))["uploaded"] == ["notes.tmp", "sub/logo.png"]
+    assert bucket.objects[f"{thread_id}/sub/logo.png"][3] == "image/png"
+    assert sync_up(thread_id, str(up)) == {"uploaded": [], "unchanged": 2}
+
+    bucket.blob(f"{thread_id}/../escape.txt").upload_from_string(b"evil")
+    result = sync_down(thread_id, str(down))
+    assert result["downloaded"] == ["notes.tmp", "sub/logo.png"]
+    assert (down / "sub" / "logo.png").read_bytes() == b"\x89PNG\r\n"
+    assert not (tmp_path / "escape.txt").exists()
+
+def test_sync_dir_must_resolve_under_the_sync_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "WORKSPACE_SYNC_ROOT", str(tmp_path))
+    (tmp_path / "proj").mkdir()
+    os.symlink("/etc", tmp_path / "etc-link")
+    assert sync_dir("proj") == sync_dir(str(tmp_path / "proj")) == os.path.realpath(tmp_path / "proj")
+    assert [sync_dir(p) for p in ("../elsewhere", "/etc", "etc-link/ssl", "proj/../../x")] == [None] * 4